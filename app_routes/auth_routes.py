@@ -13,6 +13,7 @@ REQUIRED_DEPS = [
     'jsonify',
     'log_exception',
     'login_required',
+    'PasswordVerificationBusy',
     'rate_limit',
     'session',
     'url_for',
@@ -85,6 +86,13 @@ def register(app, deps):
                     'error': 'Invalid email or password'
                 }), 401
             
+        except PasswordVerificationBusy:
+            response = jsonify({
+                'success': False,
+                'error': 'Login temporarily unavailable, please try again'
+            })
+            response.headers['Retry-After'] = '2'
+            return response, 503
         except Exception as e:
             print(f"Login error: {e}")
             log_exception("request_exception", e)
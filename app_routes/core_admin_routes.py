@@ -14,6 +14,7 @@ REQUIRED_DEPS = [
     'get_json_payload',
     'get_user_allowed_restaurant_ids',
     'internal_error_response',
+    'invalidate_authorization_scope',
     'is_platform_admin_user',
     'json',
     'jsonify',
@@ -39,6 +40,7 @@ def register_routes(bp, ctx: RouteContext):
     get_json_payload = deps['get_json_payload']
     get_user_allowed_restaurant_ids = deps['get_user_allowed_restaurant_ids']
     internal_error_response = deps['internal_error_response']
+    invalidate_authorization_scope = deps['invalidate_authorization_scope']
     is_platform_admin_user = deps['is_platform_admin_user']
     json = deps['json']
     jsonify = deps['jsonify']
@@ -203,6 +205,7 @@ def register_routes(bp, ctx: RouteContext):
                     return jsonify({'success': False, 'error': 'You cannot change your own global role'}), 400
                 return jsonify({'success': False, 'error': code or 'Failed to update global role'}), 400
 
+            invalidate_authorization_scope(user_id=user_id)
             db.log_action(
                 'user.global_role_updated',
                 org_id=get_current_org_id(),
@@ -274,6 +277,7 @@ def register_routes(bp, ctx: RouteContext):
             # Delete user
             cursor.execute("DELETE FROM dashboard_users WHERE id = %s", (user_id,))
             conn.commit()
+            invalidate_authorization_scope(user_id=user_id)
             cursor.close()
             conn.close()
 
@@ -736,6 +740,7 @@ def register_routes(bp, ctx: RouteContext):
             else:
                 cursor.execute("DELETE FROM squads WHERE id = %s", (squad_id,))
             conn.commit()
+            invalidate_authorization_scope(org_id=org_id)
 
             cursor.close()
             conn.close()
@@ -788,6 +793,7 @@ def register_routes(bp, ctx: RouteContext):
                     print(f"Error adding member {user_id}: {e}")
 
             conn.commit()
+            invalidate_authorization_scope(org_id=org_id)
             cursor.close()
             conn.close()
 
@@ -830,6 +836,7 @@ def register_routes(bp, ctx: RouteContext):
                 return jsonify({'success': False, 'error': 'Membro nao encontrado no squad'}), 404
 
             conn.commit()
+            invalidate_authorization_scope(org_id=org_id)
             cursor.close()
             conn.close()
 
@@ -896,6 +903,7 @@ def register_routes(bp, ctx: RouteContext):
                     print(f"Error adding restaurant {rid}: {e}")
 
             conn.commit()
+            invalidate_authorization_scope(org_id=org_id)
             cursor.close()
             conn.close()
 
@@ -938,6 +946,7 @@ def register_routes(bp, ctx: RouteContext):
                 return jsonify({'success': False, 'error': 'Restaurante nao encontrado no squad'}), 404
 
             conn.commit()
+            invalidate_authorization_scope(org_id=org_id)
             cursor.close()
             conn.close()
 
@@ -969,7 +978,7 @@ def register_routes(bp, ctx: RouteContext):
                 })
         
             allowed_ids = get_user_allowed_restaurant_ids(user_id, user_role)
-            restaurant_ids = allowed_ids or []
+            restaurant_ids = sorted(allowed_ids or [])
         
             # If user is not in any squad, they see all restaurants (default behavior)
             if not restaurant_ids:
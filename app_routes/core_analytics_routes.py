@@ -5,6 +5,7 @@ from app_routes.route_context import RouteContext
 
 
 REQUIRED_DEPS = [
+    'ANALYTICS_SQL_ENABLED',
     'CANCELLED_RESTAURANTS',
     'RESTAURANTS_DATA',
     '_GLOBAL_STATE_LOCK',
@@ -42,6 +43,7 @@ def register_routes(bp, ctx: RouteContext):
     globals()['CANCELLED_RESTAURANTS'] = deps['CANCELLED_RESTAURANTS']
     globals()['RESTAURANTS_DATA'] = deps['RESTAURANTS_DATA']
     # Explicit aliases keep IDE/static analysis happy.
+    ANALYTICS_SQL_ENABLED = deps['ANALYTICS_SQL_ENABLED']
     _GLOBAL_STATE_LOCK = deps['_GLOBAL_STATE_LOCK']
     _aggregate_daily = deps['_aggregate_daily']
     _calculate_period_metrics = deps['_calculate_period_metrics']
@@ -68,6 +70,29 @@ def register_routes(bp, ctx: RouteContext):
     sanitize_merchant_name = deps['sanitize_merchant_name']
     timedelta = deps['timedelta']
 
+    def _daily_rollup_aggregates(restaurants, periods, by_day=False):
+        """store_daily_metrics aggregates for the restaurants, or None to use order caches."""
+        org_id = get_current_org_id()
+        if not ANALYTICS_SQL_ENABLED or not org_id or not restaurants:
+            return None
+        merchant_ids = [
+            core_analytics_service.restaurant_merchant_id(r, normalize_merchant_id)
+            for r in restaurants
+        ]
+        return db.aggregate_store_daily_metrics(
+            org_id,
+            periods,
+            merchant_ids=[m for m in merchant_ids if m],
+            by_day=by_day,
+        )
+
+    def _uses_daily_rollup_aggregates(restaurant, rows):
+        # Stores with no rollup history yet (fresh deploy) keep using their cache.
+        merchant_id = core_analytics_service.restaurant_merchant_id(restaurant, normalize_merchant_id)
+        if any(row.get('merchant_id') == merchant_id for row in rows):
+            return True
+        return not restaurant.get('_orders_cache')
+
     @bp.route('/api/analytics/compare')
     @login_required
     @require_feature('analytics')
@@ -95,6 +120,23 @@ def register_routes(bp, ctx: RouteContext):
             if not targets:
                 return jsonify({'success': False, 'error': 'Restaurant not found'}), 404
 
+            aggregate_rows = _daily_rollup_aggregates(
+                targets,
+                {'a': (period_a_start, period_a_end), 'b': (period_b_start, period_b_end)},
+            )
+            period_metrics = None
+            if aggregate_rows is not None:
+                indexed = core_analytics_service.index_aggregate_rows(aggregate_rows)
+
+                def period_metrics(restaurant):
+                    if not _uses_daily_rollup_aggregates(restaurant, aggregate_rows):
+                        return None
+                    merchant_id = core_analytics_service.restaurant_merchant_id(restaurant, normalize_merchant_id)
+                    return (
+                        core_analytics_service.metrics_from_aggregate(indexed.get(('a', merchant_id))),
+                        core_analytics_service.metrics_from_aggregate(indexed.get(('b', merchant_id))),
+                    )
+
             comparisons, totals_a, totals_b, overall_deltas = core_analytics_service.build_period_comparison(
                 targets=targets,
                 period_a_start=period_a_start,
@@ -103,6 +145,7 @@ def register_routes(bp, ctx: RouteContext):
                 period_b_end=period_b_end,
                 filter_orders_by_date=_filter_orders_by_date,
                 calculate_period_metrics=_calculate_period_metrics,
+                period_metrics=period_metrics,
             )
         
             return jsonify({
@@ -138,16 +181,34 @@ def register_routes(bp, ctx: RouteContext):
                 datetime_mod=datetime,
             )
 
-            all_orders = core_analytics_service.collect_orders(
-                restaurants=get_current_org_restaurants(),
-                restaurant_id=restaurant_id,
+            targets = core_analytics_service.select_restaurants(get_current_org_restaurants(), restaurant_id)
+            aggregate_rows = _daily_rollup_aggregates(
+                targets,
+                {'a': (period_a_start, period_a_end), 'b': (period_b_start, period_b_end)},
+                by_day=True,
             )
+            sql_targets = []
+            if aggregate_rows is not None:
+                sql_targets = [r for r in targets if _uses_daily_rollup_aggregates(r, aggregate_rows)]
+
+            if aggregate_rows is not None and len(sql_targets) == len(targets):
+                daily_a = core_analytics_service.build_daily_from_aggregates(
+                    [row for row in aggregate_rows if row['period'] == 'a'], period_a_start, period_a_end
+                )
+                daily_b = core_analytics_service.build_daily_from_aggregates(
+                    [row for row in aggregate_rows if row['period'] == 'b'], period_b_start, period_b_end
+                )
+            else:
+                all_orders = core_analytics_service.collect_orders(
+                    restaurants=get_current_org_restaurants(),
+                    restaurant_id=restaurant_id,
+                )
 
-            orders_a = _filter_orders_by_date(all_orders, period_a_start, period_a_end)
-            orders_b = _filter_orders_by_date(all_orders, period_b_start, period_b_end)
+                orders_a = _filter_orders_by_date(all_orders, period_a_start, period_a_end)
+                orders_b = _filter_orders_by_date(all_orders, period_b_start, period_b_end)
 
-            daily_a = _aggregate_daily(orders_a, period_a_start, period_a_end)
-            daily_b = _aggregate_daily(orders_b, period_b_start, period_b_end)
+                daily_a = _aggregate_daily(orders_a, period_a_start, period_a_end)
+                daily_b = _aggregate_daily(orders_b, period_b_start, period_b_end)
         
             return jsonify({
                 'success': True,
@@ -54,6 +54,7 @@ REQUIRED_DEPS = [
     'get_org_data',
     'get_redis_client',
     'get_refresh_status',
+    'get_user_allowed_restaurant_ids',
     'internal_error_response',
     'invalidate_cache',
     'json',
@@ -67,6 +68,7 @@ REQUIRED_DEPS = [
     'platform_admin_required',
     'queue',
     'rate_limit',
+    'record_org_activity',
     'request',
     'session',
     'set_cached_dashboard_summary',
@@ -129,6 +131,7 @@ def register_routes(bp, ctx: RouteContext):
     get_org_data = deps['get_org_data']
     get_redis_client = deps['get_redis_client']
     get_refresh_status = deps['get_refresh_status']
+    get_user_allowed_restaurant_ids = deps['get_user_allowed_restaurant_ids']
     internal_error_response = deps['internal_error_response']
     invalidate_cache = deps['invalidate_cache']
     json = deps['json']
@@ -142,6 +145,7 @@ def register_routes(bp, ctx: RouteContext):
     platform_admin_required = deps['platform_admin_required']
     queue = deps['queue']
     rate_limit = deps['rate_limit']
+    record_org_activity = deps['record_org_activity']
     request = deps['request']
     session = deps['session']
     set_cached_dashboard_summary = deps['set_cached_dashboard_summary']
@@ -167,7 +171,7 @@ def register_routes(bp, ctx: RouteContext):
                 return jsonify({'success': False, 'error': 'iFood API not configured'}), 400
 
             if USE_REDIS_QUEUE and get_redis_client():
-                job_id = enqueue_refresh_job(trigger='api')
+                job_id = enqueue_refresh_job(trigger='api', org_id=org_id)
                 if not job_id:
                     return jsonify({'success': False, 'error': 'Failed to enqueue refresh job'}), 500
                 return jsonify({
@@ -181,8 +185,12 @@ def register_routes(bp, ctx: RouteContext):
             if bg_refresher.is_refreshing:
                 return jsonify({'success': True, 'message': 'Refresh already in progress', 'status': 'refreshing'})
 
-            # Fallback: trigger in-process refresh.
-            threading.Thread(target=bg_refresher.refresh_now, daemon=True).start()
+            # Fallback: trigger in-process refresh of the requesting org.
+            threading.Thread(
+                target=bg_refresher.refresh_now,
+                kwargs={'org_ids': [org_id] if org_id else None},
+                daemon=True,
+            ).start()
 
             return jsonify({
                 'success': True,
@@ -432,24 +440,55 @@ def register_routes(bp, ctx: RouteContext):
     @login_required
     def sse_stream():
         """SSE endpoint for real-time order tracking and data updates"""
-        def event_stream(client_queue):
+        def event_stream(client_queue, replay_messages, viewer_org_id):
             # Send initial connection event
             yield f"event: connected\ndata: {json.dumps({'timestamp': datetime.now().isoformat(), 'restaurants': len(RESTAURANTS_DATA)})}\n\n"
         
             try:
+                replayed_ids = set()
+                for message in replay_messages:
+                    if message.startswith('id: '):
+                        replayed_ids.add(message[4:message.find('\n')])
+                    yield message
                 while True:
                     try:
                         message = client_queue.get(timeout=30)
+                        # Events queued while the replay was read are sent once.
+                        if replayed_ids and message.startswith('id: ') and message[4:message.find('\n')] in replayed_ids:
+                            continue
                         yield message
                     except queue.Empty:
-                        # Send keepalive
+                        # Send keepalive; the heartbeat tells the refresh scheduler
+                        # this org has live viewers.
+                        record_org_activity(viewer_org_id, 'viewer')
                         yield f": keepalive {datetime.now().isoformat()}\n\n"
             except GeneratorExit:
                 sse_manager.unregister(client_queue)
     
-        client_queue = sse_manager.register()
+        # Subscribe to the session org; restaurant-scoped events are further
+        # narrowed to ?restaurant_ids=a,b and to the user's squad restaurants.
+        user = session.get('user', {})
+        restaurant_ids = None
+        requested_ids = [
+            normalize_merchant_id(value)
+            for value in str(request.args.get('restaurant_ids') or '').split(',')
+        ]
+        requested_ids = [value for value in requested_ids if value]
+        if requested_ids:
+            restaurant_ids = set(requested_ids)
+        allowed_ids = get_user_allowed_restaurant_ids(user.get('id'), user.get('role'))
+        if allowed_ids is not None:
+            allowed_ids = {normalize_merchant_id(value) for value in allowed_ids}
+            restaurant_ids = (restaurant_ids & allowed_ids) if restaurant_ids is not None else allowed_ids
+        viewer_org_id = get_current_org_id()
+        client_queue = sse_manager.register(org_id=viewer_org_id, restaurant_ids=restaurant_ids)
+        record_org_activity(viewer_org_id, 'viewer')
+        # Browsers resend Last-Event-ID on automatic reconnects; the dashboard
+        # passes it as ?last_event_id= when it recreates the EventSource.
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        replay_messages = sse_manager.replay(client_queue, last_event_id) if last_event_id else []
         response = Response(
-            stream_with_context(event_stream(client_queue)),
+            stream_with_context(event_stream(client_queue, replay_messages, viewer_org_id)),
             mimetype='text/event-stream',
             headers={
                 'Cache-Control': 'no-cache',
@@ -463,7 +502,7 @@ def register_routes(bp, ctx: RouteContext):
     @login_required
     def api_refresh_status():
         """Get current refresh status and system info"""
-        refresh_payload = get_refresh_status()
+        refresh_payload = get_refresh_status(get_current_org_id())
         refresh_status = refresh_payload.get('status')
         last_refresh = get_current_org_last_refresh()
         return jsonify({
@@ -1,11 +1,12 @@
 """Group and public sharing route registrations."""
 
 from flask import Blueprint
-from app_services import groups_service, restaurants_service
+from app_services import core_analytics_service, groups_service, restaurants_service
 from app_routes.dependencies import bind_dependencies
 
 
 REQUIRED_DEPS = [
+    'ANALYTICS_SQL_ENABLED',
     'DASHBOARD_OUTPUT',
     'IFoodDataProcessor',
     'ORG_DATA',
@@ -18,6 +19,7 @@ REQUIRED_DEPS = [
     'db',
     'ensure_restaurant_financial_sales_cache',
     'ensure_restaurant_orders_cache',
+    'get_restaurant_time_cube',
     'escape_html_text',
     'find_restaurant_by_identifier',
     'find_restaurant_in_org',
@@ -25,12 +27,14 @@ REQUIRED_DEPS = [
     'get_current_org_restaurants',
     'get_json_payload',
     'get_public_base_url',
+    'get_order_status',
     'get_user_allowed_restaurant_ids',
     'internal_error_response',
     'is_platform_admin_user',
     'jsonify',
     'log_exception',
     'login_required',
+    'normalize_merchant_id',
     'normalize_order_payload',
     'rate_limit',
     'redirect',
@@ -341,7 +345,13 @@ def register(app, deps):
 
             if orders_for_charts:
                 if hasattr(IFoodDataProcessor, 'generate_charts_data_with_interruptions'):
-                    chart_data = IFoodDataProcessor.generate_charts_data_with_interruptions(orders_for_charts, [])
+                    chart_data = IFoodDataProcessor.generate_charts_data_with_interruptions(
+                        orders_for_charts,
+                        [],
+                        time_cube=get_restaurant_time_cube(restaurant, all_orders),
+                        start_date=start_date,
+                        end_date=end_date,
+                    )
                 else:
                     chart_data = IFoodDataProcessor.generate_charts_data(orders_for_charts)
                     chart_data['interruptions'] = []
@@ -763,6 +773,25 @@ def register(app, deps):
             restaurants_map = {r.get('id'): r for r in get_current_org_restaurants()}
             comparison_rows = []
             group_orders = []
+            group_aggregate = core_analytics_service.empty_aggregate()
+
+            # One grouped query over the daily rollup for every visible store.
+            aggregate_rows = None
+            if ANALYTICS_SQL_ENABLED:
+                visible_stores = [
+                    restaurants_map[store_id] for store_id, _ in store_rows
+                    if store_id in restaurants_map and (allowed_ids is None or store_id in allowed_ids)
+                ]
+                if visible_stores:
+                    aggregate_rows = db.aggregate_store_daily_metrics(
+                        org_id,
+                        {'range': (start_dt, end_dt)},
+                        merchant_ids=[
+                            core_analytics_service.restaurant_merchant_id(r, normalize_merchant_id)
+                            for r in visible_stores
+                        ],
+                    )
+            indexed_aggregates = core_analytics_service.index_aggregate_rows(aggregate_rows)
 
             for store_id, store_name in store_rows:
                 if allowed_ids is not None and store_id not in allowed_ids:
@@ -779,10 +808,17 @@ def register(app, deps):
                     })
                     continue
 
-                orders = r.get('_orders_cache', [])
-                filtered_orders = _filter_orders_by_date(orders, start_dt, end_dt)
-                metrics = _calculate_period_metrics(filtered_orders)
-                group_orders.extend(filtered_orders)
+                merchant_id = core_analytics_service.restaurant_merchant_id(r, normalize_merchant_id)
+                store_aggregate = indexed_aggregates.get(('range', merchant_id))
+                if aggregate_rows is not None and (store_aggregate is not None or not r.get('_orders_cache')):
+                    store_aggregate = store_aggregate or core_analytics_service.empty_aggregate()
+                    metrics = core_analytics_service.metrics_from_aggregate(store_aggregate)
+                    core_analytics_service.add_aggregate(group_aggregate, store_aggregate)
+                else:
+                    orders = r.get('_orders_cache', [])
+                    filtered_orders = _filter_orders_by_date(orders, start_dt, end_dt)
+                    metrics = _calculate_period_metrics(filtered_orders)
+                    group_orders.extend(filtered_orders)
 
                 comparison_rows.append({
                     'store_id': store_id,
@@ -826,7 +862,14 @@ def register(app, deps):
                 rev = row['metrics'].get('revenue', 0)
                 row['metrics']['revenue_share'] = round((rev / total_revenue * 100) if total_revenue > 0 else 0, 2)
 
-            summary = _calculate_period_metrics(group_orders)
+            if group_aggregate['total_orders']:
+                core_analytics_service.add_aggregate(
+                    group_aggregate,
+                    core_analytics_service.aggregate_orders(group_orders, get_order_status),
+                )
+                summary = core_analytics_service.metrics_from_aggregate(group_aggregate)
+            else:
+                summary = _calculate_period_metrics(group_orders)
             best_revenue = max(comparison_rows, key=lambda x: x['metrics'].get('revenue', 0))
             best_orders = max(comparison_rows, key=lambda x: x['metrics'].get('orders', 0))
             lowest_cancel = min(comparison_rows, key=lambda x: x['metrics'].get('cancel_rate', 100))
@@ -9,8 +9,8 @@ REQUIRED_DEPS = [
     'APP_STARTED_AT',
     'LAST_DATA_REFRESH',
     'ORG_DATA',
-    'REDIS_INSTANCE_ID',
     'REDIS_REFRESH_LOCK_KEY',
+    'REDIS_REFRESH_PENDING_KEY',
     'REDIS_REFRESH_QUEUE',
     'USE_REDIS_CACHE',
     'USE_REDIS_PUBSUB',
@@ -23,7 +23,9 @@ REQUIRED_DEPS = [
     'get_current_org_id',
     'get_current_org_restaurants',
     'get_redis_client',
+    'get_redis_instance_id',
     'get_refresh_status',
+    'get_worker_lane_metrics',
     'jsonify',
     'platform_admin_required',
     'sse_manager',
@@ -47,12 +49,13 @@ def register(app, deps):
             get_refresh_status=get_refresh_status,
             get_redis_client=get_redis_client,
             redis_refresh_queue=REDIS_REFRESH_QUEUE,
+            redis_refresh_pending_key=REDIS_REFRESH_PENDING_KEY,
             redis_refresh_lock_key=REDIS_REFRESH_LOCK_KEY,
             org_data=ORG_DATA,
             last_data_refresh=LAST_DATA_REFRESH,
             get_current_org_restaurants=get_current_org_restaurants,
             build_data_quality_payload=build_data_quality_payload,
-            instance_id=REDIS_INSTANCE_ID,
+            instance_id=get_redis_instance_id(),
             app_started_at=APP_STARTED_AT,
             datetime_mod=datetime,
             bg_refresher=bg_refresher,
@@ -61,6 +64,7 @@ def register(app, deps):
             use_redis_pubsub=USE_REDIS_PUBSUB,
             api_cache=_api_cache,
             sse_manager=sse_manager,
+            get_worker_lane_metrics=get_worker_lane_metrics,
         )
         return jsonify(payload)
 
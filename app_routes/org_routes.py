@@ -18,6 +18,7 @@ REQUIRED_DEPS = [
     'get_json_payload',
     'get_org_data',
     'get_public_base_url',
+    'invalidate_authorization_scope',
     'is_platform_admin_user',
     'invalidate_cache',
     'json',
@@ -452,6 +453,7 @@ def register(app, deps):
             if code == 'invite_already_accepted':
                 return jsonify({'success': False, 'error': 'Convite já foi utilizado'}), 409
             return jsonify({'success': False, 'error': 'Convite inválido ou expirado'}), 400
+        invalidate_authorization_scope(org_id=result['org_id'], user_id=session['user']['id'])
         session['org_id'] = result['org_id']
         return jsonify({'success': True, 'org_id': result['org_id'], 'redirect': url_for('dashboard')})
 
@@ -614,6 +616,7 @@ def register(app, deps):
                 status = 400
             return jsonify(result), status
 
+        invalidate_authorization_scope(org_id=org_id, user_id=user_id)
         db.log_action(
             'org.member_assigned',
             org_id=org_id,
@@ -662,6 +665,7 @@ def register(app, deps):
             status = 404 if code == 'member_not_found' else 400
             return jsonify(result), status
 
+        invalidate_authorization_scope(org_id=org_id, user_id=user_id)
         db.log_action(
             'org.member_role_updated',
             org_id=org_id,
@@ -697,6 +701,7 @@ def register(app, deps):
             status = 404 if code == 'member_not_found' else 400
             return jsonify(result), status
 
+        invalidate_authorization_scope(org_id=org_id, user_id=user_id)
         db.log_action(
             'org.member_removed',
             org_id=org_id,
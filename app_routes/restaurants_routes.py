@@ -19,6 +19,7 @@ REQUIRED_DEPS = [
     'detect_restaurant_closure',
     'ensure_restaurant_financial_sales_cache',
     'ensure_restaurant_orders_cache',
+    'get_restaurant_time_cube',
     'evaluate_restaurant_quality',
     'filter_orders_by_month',
     'find_restaurant_by_identifier',
@@ -939,7 +940,10 @@ def register(app, deps):
                 if hasattr(IFoodDataProcessor, 'generate_charts_data_with_interruptions'):
                     chart_data = IFoodDataProcessor.generate_charts_data_with_interruptions(
                         orders_for_charts,
-                        interruptions
+                        interruptions,
+                        time_cube=get_restaurant_time_cube(restaurant, all_orders),
+                        start_date=start_date,
+                        end_date=end_date,
                     )
                 else:
                     chart_data = IFoodDataProcessor.generate_charts_data(orders_for_charts)
@@ -78,20 +78,134 @@ def _compute_delta(old_val, new_val):
     }
 
 
+def restaurant_merchant_id(restaurant, normalize_merchant_id=None):
+    """Return the merchant id order snapshots are stored under for a restaurant."""
+    restaurant = restaurant or {}
+    raw = (
+        restaurant.get('_resolved_merchant_id')
+        or restaurant.get('merchant_id')
+        or restaurant.get('merchantId')
+        or restaurant.get('id')
+    )
+    if normalize_merchant_id:
+        return normalize_merchant_id(raw)
+    return str(raw or '').strip()
+
+
+def empty_aggregate():
+    return {
+        'total_orders': 0,
+        'orders': 0,
+        'revenue': 0.0,
+        'cancelled': 0,
+        'new_customers': 0,
+        'rating_sum': 0.0,
+        'rating_count': 0,
+    }
+
+
+def add_aggregate(target, row):
+    """Accumulate raw counters from an aggregate row into ``target``."""
+    for key in ('total_orders', 'orders', 'revenue', 'cancelled', 'new_customers', 'rating_sum', 'rating_count'):
+        target[key] += (row or {}).get(key, 0) or 0
+    return target
+
+
+def aggregate_orders(orders, get_order_status):
+    """Raw counters for in-memory orders, matching the SQL aggregate rows."""
+    agg = empty_aggregate()
+    for order in orders or []:
+        agg['total_orders'] += 1
+        status = get_order_status(order)
+        if status == 'CANCELLED':
+            agg['cancelled'] += 1
+        if status != 'CONCLUDED':
+            continue
+        agg['orders'] += 1
+        agg['revenue'] += float(order.get('totalPrice', 0) or 0)
+        if (order.get('customer') or {}).get('isNewCustomer', False):
+            agg['new_customers'] += 1
+        rating = (order.get('feedback') or {}).get('rating')
+        if rating:
+            agg['rating_sum'] += rating
+            agg['rating_count'] += 1
+    return agg
+
+
+def metrics_from_aggregate(agg):
+    """Turn raw counters into the payload shape of _calculate_period_metrics."""
+    agg = agg or empty_aggregate()
+    revenue = float(agg.get('revenue') or 0)
+    order_count = int(agg.get('orders') or 0)
+    total_orders = int(agg.get('total_orders') or 0)
+    cancelled = int(agg.get('cancelled') or 0)
+    rating_count = int(agg.get('rating_count') or 0)
+    return {
+        'revenue': round(revenue, 2),
+        'orders': order_count,
+        'ticket': round(revenue / order_count, 2) if order_count > 0 else 0,
+        'cancelled': cancelled,
+        'cancel_rate': round(cancelled / total_orders * 100, 1) if total_orders else 0,
+        'new_customers': int(agg.get('new_customers') or 0),
+        'avg_rating': round(float(agg.get('rating_sum') or 0) / rating_count, 2) if rating_count else 0,
+        'total_orders': total_orders,
+    }
+
+
+def index_aggregate_rows(rows):
+    """Index SQL aggregate rows by (period, merchant_id)."""
+    indexed = {}
+    for row in rows or []:
+        key = (row.get('period'), row.get('merchant_id'))
+        add_aggregate(indexed.setdefault(key, empty_aggregate()), row)
+    return indexed
+
+
+def build_daily_from_aggregates(rows, start_dt, end_dt):
+    """Build the _aggregate_daily payload from SQL per-day aggregate rows."""
+    start_d = start_dt.date() if hasattr(start_dt, 'date') else start_dt
+    end_d = end_dt.date() if hasattr(end_dt, 'date') else end_dt
+    days = {}
+    current = start_d
+    while current <= end_d:
+        days[current.isoformat()] = {'date': current.isoformat(), 'revenue': 0, 'orders': 0, 'cancelled': 0}
+        current += timedelta(days=1)
+    for row in rows or []:
+        bucket = days.get(row.get('day'))
+        if bucket is None:
+            continue
+        bucket['revenue'] += float(row.get('revenue') or 0)
+        bucket['orders'] += int(row.get('orders') or 0)
+        bucket['cancelled'] += int(row.get('cancelled') or 0)
+    result = sorted(days.values(), key=lambda x: x['date'])
+    for day in result:
+        day['revenue'] = round(day['revenue'], 2)
+    return result
+
+
 def build_period_comparison(targets, period_a_start, period_a_end, period_b_start, period_b_end,
-                            filter_orders_by_date, calculate_period_metrics):
-    """Build per-restaurant and aggregate period comparison payloads."""
+                            filter_orders_by_date, calculate_period_metrics, period_metrics=None):
+    """Build per-restaurant and aggregate period comparison payloads.
+
+    ``period_metrics(restaurant)`` may return precomputed ``(metrics_a,
+    metrics_b)`` (e.g. from SQL aggregates); when it returns None the
+    restaurant's in-memory order cache is used.
+    """
     comparisons = []
     totals_a = {'revenue': 0, 'orders': 0, 'cancelled': 0, 'new_customers': 0, 'ticket_sum': 0}
     totals_b = {'revenue': 0, 'orders': 0, 'cancelled': 0, 'new_customers': 0, 'ticket_sum': 0}
 
     for restaurant in targets:
-        orders = restaurant.get('_orders_cache', [])
-        orders_a = filter_orders_by_date(orders, period_a_start, period_a_end)
-        orders_b = filter_orders_by_date(orders, period_b_start, period_b_end)
+        precomputed = period_metrics(restaurant) if period_metrics else None
+        if precomputed is not None:
+            metrics_a, metrics_b = precomputed
+        else:
+            orders = restaurant.get('_orders_cache', [])
+            orders_a = filter_orders_by_date(orders, period_a_start, period_a_end)
+            orders_b = filter_orders_by_date(orders, period_b_start, period_b_end)
 
-        metrics_a = calculate_period_metrics(orders_a)
-        metrics_b = calculate_period_metrics(orders_b)
+            metrics_a = calculate_period_metrics(orders_a)
+            metrics_b = calculate_period_metrics(orders_b)
 
         deltas = {}
         for key in metrics_a:
@@ -0,0 +1,32 @@
+"""Keepalive polling shard assignment helpers."""
+
+import hashlib
+
+
+def _shard_weight(worker_id, key):
+    digest = hashlib.sha1(f"{worker_id}|{key}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def shard_owner(key, workers):
+    """Worker that owns ``key`` by rendezvous hashing (None without workers).
+
+    Adding or removing a worker only moves the keys that worker gains or
+    owned; every other key keeps its owner.
+    """
+    best = None
+    best_weight = -1
+    for worker_id in workers or ():
+        weight = _shard_weight(worker_id, key)
+        if weight > best_weight or (weight == best_weight and str(worker_id) < str(best)):
+            best, best_weight = worker_id, weight
+    return best
+
+
+def live_workers(heartbeats, *, now, ttl):
+    """Worker ids whose last heartbeat is within ``ttl`` seconds, sorted."""
+    return sorted(
+        str(worker_id)
+        for worker_id, seen_at in (heartbeats or {}).items()
+        if float(seen_at or 0) >= now - ttl
+    )
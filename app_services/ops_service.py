@@ -7,6 +7,7 @@ def build_ops_summary(*,
                       get_refresh_status,
                       get_redis_client,
                       redis_refresh_queue,
+                      redis_refresh_pending_key,
                       redis_refresh_lock_key,
                       org_data,
                       last_data_refresh,
@@ -20,16 +21,22 @@ def build_ops_summary(*,
                       use_redis_cache,
                       use_redis_pubsub,
                       api_cache,
-                      sse_manager):
+                      sse_manager,
+                      get_worker_lane_metrics=None):
     """Build response payload for /api/ops/summary."""
-    refresh_payload = get_refresh_status()
+    refresh_payload = get_refresh_status(org_id)
     redis_client = get_redis_client()
     queue_depth = 0
     lock_present = False
     redis_ok = bool(redis_client)
     if redis_client:
         try:
-            queue_depth = int(redis_client.llen(redis_refresh_queue) or 0)
+            pipe = redis_client.pipeline()
+            pipe.zcard(redis_refresh_pending_key)
+            # Legacy list: still drained for instances that have not upgraded.
+            pipe.llen(redis_refresh_queue)
+            pending, legacy_pending = pipe.execute()
+            queue_depth = int(pending or 0) + int(legacy_pending or 0)
             lock_present = bool(redis_client.get(redis_refresh_lock_key))
         except Exception:
             redis_ok = False
@@ -63,7 +70,11 @@ def build_ops_summary(*,
                 'enabled': bool(use_redis_queue),
                 'redis_connected': redis_ok,
                 'pending_jobs': queue_depth,
-                'lock_present': lock_present
+                'lock_present': lock_present,
+                'worker_lanes': get_worker_lane_metrics() if get_worker_lane_metrics else {}
+            },
+            'database': {
+                'pool': db.pool_stats()
             },
             'cache': {
                 'redis_cache_enabled': bool(use_redis_cache),
@@ -71,7 +82,8 @@ def build_ops_summary(*,
             },
             'realtime': {
                 'redis_pubsub_enabled': bool(use_redis_pubsub),
-                'connected_clients': sse_manager.client_count
+                'connected_clients': sse_manager.client_count,
+                'client_lag': sse_manager.lag_summary()
             },
             'stores': {
                 'count': len(restaurants),
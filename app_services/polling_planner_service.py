@@ -0,0 +1,29 @@
+"""Event polling request planning helpers."""
+
+
+def chunk_merchant_ids(merchant_ids, *, max_merchants=100, max_header_chars=4000):
+    """Split merchant ids into ``x-polling-merchants`` sized chunks.
+
+    Ids are normalized and de-duplicated in order. A chunk closes when it
+    reaches ``max_merchants`` ids or when the comma-joined header value would
+    exceed ``max_header_chars``; an id longer than the limit still gets its
+    own chunk.
+    """
+    max_merchants = max(1, int(max_merchants or 1))
+    chunks = []
+    current = []
+    current_chars = 0
+    for merchant_id in dict.fromkeys(str(mid).strip() for mid in (merchant_ids or [])):
+        if not merchant_id:
+            continue
+        added_chars = len(merchant_id) + (1 if current else 0)
+        if current and (len(current) >= max_merchants or current_chars + added_chars > max_header_chars):
+            chunks.append(current)
+            current = []
+            current_chars = 0
+            added_chars = len(merchant_id)
+        current.append(merchant_id)
+        current_chars += added_chars
+    if current:
+        chunks.append(current)
+    return chunks
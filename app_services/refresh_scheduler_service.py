@@ -0,0 +1,63 @@
+"""Staleness-driven refresh scheduling helpers."""
+
+PLAN_REFRESH_INTERVAL_SECONDS = {
+    'free': 3600,
+    'starter': 1800,
+    'pro': 900,
+    'enterprise': 600,
+}
+DEFAULT_REFRESH_INTERVAL_SECONDS = 1800
+
+
+def refresh_interval_seconds(plan_name, *, viewers=0, last_event_age=None,
+                             min_interval=300, max_interval=7200):
+    """Target refresh interval for one org.
+
+    The plan tier sets the base interval. Orgs with live dashboard viewers are
+    refreshed twice as often. Orgs whose webhooks/polling delivered events
+    within the interval are refreshed half as often, since events already
+    keep their orders current.
+    """
+    interval = float(PLAN_REFRESH_INTERVAL_SECONDS.get(str(plan_name or '').lower(), DEFAULT_REFRESH_INTERVAL_SECONDS))
+    if viewers:
+        interval /= 2
+    if last_event_age is not None and last_event_age < interval:
+        interval *= 2
+    return max(float(min_interval), min(float(max_interval), interval))
+
+
+def next_due_at(*, last_success_at, interval, failures=0, last_attempt_at=None,
+                base_backoff=60, max_backoff=3600):
+    """Epoch seconds when the org is due; 0 when it was never refreshed.
+
+    Consecutive upstream failures push the due time out exponentially from the
+    last attempt.
+    """
+    due_at = (float(last_success_at) + float(interval)) if last_success_at else 0.0
+    if failures and last_attempt_at:
+        backoff = min(float(max_backoff), float(base_backoff) * (2 ** (int(failures) - 1)))
+        due_at = max(due_at, float(last_attempt_at) + backoff)
+    return due_at
+
+
+def pick_due_orgs(candidates, *, now, budget):
+    """Pick the most overdue orgs whose estimated API cost fits ``budget``.
+
+    ``candidates`` are dicts with ``org_id``, ``due_at`` and ``cost``. The most
+    overdue org is always picked so a large tenant cannot be starved by the
+    budget; cheaper orgs may still fill the remaining budget after an org that
+    did not fit.
+    """
+    due = sorted(
+        (candidate for candidate in candidates if candidate.get('due_at', 0) <= now),
+        key=lambda candidate: candidate.get('due_at', 0),
+    )
+    picked = []
+    spent = 0
+    for candidate in due:
+        cost = max(1, int(candidate.get('cost') or 1))
+        if picked and spent + cost > budget:
+            continue
+        picked.append(candidate['org_id'])
+        spent += cost
+    return picked
@@ -4,11 +4,16 @@ Integrated with iFood Merchant API instead of Excel files
 Features: Real-time SSE, Background Refresh, Comparative Analytics, Data Caching
 """
 
+# Installed before any other import so the import-time tree is complete.
+import startup_profiler
+startup_profiler.install_from_environment()
+
 from flask import Flask, request, jsonify, session, redirect, url_for, send_file, Response, stream_with_context
 from werkzeug.middleware.proxy_fix import ProxyFix
-from dashboarddb import DashboardDatabase
+from dashboarddb import DashboardDatabase, PasswordVerificationBusy
 from ifood_api import IFoodAPI
 from ifood_data_processor import IFoodDataProcessor
+from app_services import keepalive_shard_service, polling_planner_service, refresh_scheduler_service
 import os
 from pathlib import Path
 import json
@@ -24,12 +29,14 @@ import threading
 import time
 import queue
 import copy
+import gc
 import sys
 import signal
 import logging
 import hmac
 from urllib.parse import urlparse
-from collections import deque
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Try to enable gzip compression
 try:
@@ -47,13 +54,16 @@ try:
 except Exception:
     pass
 
-# Optional Redis integration for distributed queue/cache/pubsub
-try:
-    import redis
-    _HAS_REDIS = True
-except ImportError:
-    redis = None
-    _HAS_REDIS = False
+# Optional Redis integration for distributed queue/cache/pubsub.
+# Only imported when REDIS_URL is configured (the client package is slow to import).
+redis = None
+_HAS_REDIS = False
+if os.environ.get('REDIS_URL', '').strip():
+    try:
+        import redis
+        _HAS_REDIS = True
+    except ImportError:
+        redis = None
 
 logging.basicConfig(
     level=getattr(logging, str(os.environ.get('LOG_LEVEL', 'INFO')).upper(), logging.INFO),
@@ -132,6 +142,41 @@ if IFOOD_STRICT_30S_POLLING and _ifood_poll_interval_requested != 30:
         f"iFood keepalive polling interval overridden to 30s "
         f"(requested={_ifood_poll_interval_requested}s, strict_30s=enabled)"
     )
+# Orgs polled in parallel by one keepalive shard.
+try:
+    IFOOD_KEEPALIVE_MAX_PARALLEL_ORGS = int(os.environ.get('IFOOD_KEEPALIVE_MAX_PARALLEL_ORGS', '8') or 8)
+except Exception:
+    IFOOD_KEEPALIVE_MAX_PARALLEL_ORGS = 8
+IFOOD_KEEPALIVE_MAX_PARALLEL_ORGS = max(1, min(IFOOD_KEEPALIVE_MAX_PARALLEL_ORGS, 64))
+# Polling requests are split into chunks of at most this many merchants / header chars,
+# and at most IFOOD_POLL_MAX_IN_FLIGHT chunks are polled at once per worker.
+try:
+    IFOOD_POLL_MAX_MERCHANTS_PER_REQUEST = int(os.environ.get('IFOOD_POLL_MAX_MERCHANTS_PER_REQUEST', '100') or 100)
+except Exception:
+    IFOOD_POLL_MAX_MERCHANTS_PER_REQUEST = 100
+IFOOD_POLL_MAX_MERCHANTS_PER_REQUEST = max(1, min(IFOOD_POLL_MAX_MERCHANTS_PER_REQUEST, 500))
+try:
+    IFOOD_POLL_MAX_HEADER_CHARS = int(os.environ.get('IFOOD_POLL_MAX_HEADER_CHARS', '4000') or 4000)
+except Exception:
+    IFOOD_POLL_MAX_HEADER_CHARS = 4000
+IFOOD_POLL_MAX_HEADER_CHARS = max(64, IFOOD_POLL_MAX_HEADER_CHARS)
+try:
+    IFOOD_POLL_MAX_IN_FLIGHT = int(os.environ.get('IFOOD_POLL_MAX_IN_FLIGHT', '16') or 16)
+except Exception:
+    IFOOD_POLL_MAX_IN_FLIGHT = 16
+IFOOD_POLL_MAX_IN_FLIGHT = max(1, min(IFOOD_POLL_MAX_IN_FLIGHT, 128))
+# Processed events are acknowledged in background batches (see IFoodAckBuffer).
+IFOOD_ACK_BUFFER_ENABLED = str(os.environ.get('IFOOD_ACK_BUFFER_ENABLED', '1')).strip().lower() in ('1', 'true', 'yes', 'on')
+try:
+    IFOOD_ACK_BATCH_SIZE = int(os.environ.get('IFOOD_ACK_BATCH_SIZE', '2000') or 2000)
+except Exception:
+    IFOOD_ACK_BATCH_SIZE = 2000
+IFOOD_ACK_BATCH_SIZE = max(1, min(IFOOD_ACK_BATCH_SIZE, 2000))
+try:
+    IFOOD_ACK_FLUSH_INTERVAL_MS = int(os.environ.get('IFOOD_ACK_FLUSH_INTERVAL_MS', '1000') or 1000)
+except Exception:
+    IFOOD_ACK_FLUSH_INTERVAL_MS = 1000
+IFOOD_ACK_FLUSH_INTERVAL_MS = max(50, min(IFOOD_ACK_FLUSH_INTERVAL_MS, 30000))
 IFOOD_EVIDENCE_ENABLED = str(os.environ.get('IFOOD_EVIDENCE_ENABLED', '1')).strip().lower() in ('1', 'true', 'yes', 'on')
 try:
     IFOOD_EVIDENCE_MAX_ENTRIES = int(os.environ.get('IFOOD_EVIDENCE_MAX_ENTRIES', '2000') or 2000)
@@ -147,6 +192,64 @@ IFOOD_WEBHOOK_TOKEN = str(os.environ.get('IFOOD_WEBHOOK_TOKEN') or '').strip()
 IFOOD_WEBHOOK_ALLOW_UNSIGNED = str(
     os.environ.get('IFOOD_WEBHOOK_ALLOW_UNSIGNED', '0')
 ).strip().lower() in ('1', 'true', 'yes', 'on')
+# Analytics endpoints aggregate ifood_order_snapshots in SQL (full history)
+# instead of the capped in-memory _orders_cache when enabled.
+ANALYTICS_SQL_ENABLED = str(os.environ.get('ANALYTICS_SQL_ENABLED', '1')).strip().lower() in ('1', 'true', 'yes', 'on')
+# Set by gunicorn_config.py when preload_app is on: the master loads org state
+# once and background threads start per worker in post_fork_worker().
+PRELOAD_APP = str(os.environ.get('TIMO_PRELOAD_APP', '0')).strip().lower() in ('1', 'true', 'yes', 'on')
+# Lazy org hydration: web boot registers orgs only; restaurant state loads on
+# first access and a background warmer prefetches recently active orgs.
+ORG_LAZY_HYDRATION = str(os.environ.get('ORG_LAZY_HYDRATION', '0')).strip().lower() in ('1', 'true', 'yes', 'on')
+try:
+    ORG_WARM_ACTIVE_HOURS = int(os.environ.get('ORG_WARM_ACTIVE_HOURS', '24') or 24)
+except Exception:
+    ORG_WARM_ACTIVE_HOURS = 24
+ORG_WARM_ACTIVE_HOURS = max(1, min(ORG_WARM_ACTIVE_HOURS, 24 * 30))
+try:
+    ORG_WARM_LIMIT = int(os.environ.get('ORG_WARM_LIMIT', '50') or 0)
+except Exception:
+    ORG_WARM_LIMIT = 50
+ORG_WARM_LIMIT = max(0, min(ORG_WARM_LIMIT, 1000))
+STARTUP_PROFILE_PATH = str(
+    os.environ.get('STARTUP_PROFILE_PATH')
+    or (DASHBOARD_OUTPUT / 'startup_profile.json')
+).strip()
+# Per-org SSE replay buffer (events kept for Last-Event-ID resume).
+try:
+    SSE_REPLAY_BUFFER_SIZE = int(os.environ.get('SSE_REPLAY_BUFFER_SIZE', '200') or 200)
+except Exception:
+    SSE_REPLAY_BUFFER_SIZE = 200
+SSE_REPLAY_BUFFER_SIZE = max(10, min(SSE_REPLAY_BUFFER_SIZE, 5000))
+# SSE broadcasts are batched per topic within this window (0 disables).
+try:
+    SSE_COALESCE_WINDOW_MS = int(os.environ.get('SSE_COALESCE_WINDOW_MS', '250') or 0)
+except Exception:
+    SSE_COALESCE_WINDOW_MS = 250
+SSE_COALESCE_WINDOW_MS = max(0, min(SSE_COALESCE_WINDOW_MS, 5000))
+# Staleness-driven refresh scheduling (replaces the fixed full sweep).
+REFRESH_SCHEDULER_ENABLED = str(os.environ.get('REFRESH_SCHEDULER_ENABLED', '1')).strip().lower() in ('1', 'true', 'yes', 'on')
+try:
+    REFRESH_SCHEDULER_TICK_SECONDS = int(os.environ.get('REFRESH_SCHEDULER_TICK_SECONDS', '60') or 60)
+except Exception:
+    REFRESH_SCHEDULER_TICK_SECONDS = 60
+REFRESH_SCHEDULER_TICK_SECONDS = max(10, min(REFRESH_SCHEDULER_TICK_SECONDS, 900))
+try:
+    REFRESH_CYCLE_API_BUDGET = int(os.environ.get('REFRESH_CYCLE_API_BUDGET', '120') or 120)
+except Exception:
+    REFRESH_CYCLE_API_BUDGET = 120
+REFRESH_CYCLE_API_BUDGET = max(1, REFRESH_CYCLE_API_BUDGET)
+# Rough upstream calls per merchant in one org refresh (orders, details, closure, financial).
+REFRESH_CALLS_PER_MERCHANT = 4
+# Worker lanes: the lag (seconds) that raises an alarm.
+try:
+    WORKER_KEEPALIVE_LAG_ALARM_SECONDS = float(os.environ.get('WORKER_KEEPALIVE_LAG_ALARM_SECONDS', '10') or 10)
+except Exception:
+    WORKER_KEEPALIVE_LAG_ALARM_SECONDS = 10.0
+try:
+    WORKER_REFRESH_LAG_ALARM_SECONDS = float(os.environ.get('WORKER_REFRESH_LAG_ALARM_SECONDS', '600') or 600)
+except Exception:
+    WORKER_REFRESH_LAG_ALARM_SECONDS = 600.0
 
 # Enable gzip compression if available
 if _HAS_COMPRESS:
@@ -224,15 +327,48 @@ def add_cache_headers(response):
 
 # Database configuration
 db = DashboardDatabase()
+# One pooled connection per request instead of one checkout per db call. Off by
+# default: the connection stays bound for the whole view (including slow iFood
+# calls), so with gevent it caps concurrent DB-touching requests at DB_POOL_MAX.
+DB_REQUEST_SCOPE_ENABLED = str(os.environ.get('DB_REQUEST_SCOPE_ENABLED', '0')).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+@app.before_request
+def bind_request_db_scope():
+    if DB_REQUEST_SCOPE_ENABLED:
+        db.begin_request_scope()
+
+
+@app.after_request
+def release_request_db_scope(response):
+    # Released before the body is sent so SSE streams do not pin a connection.
+    db.end_request_scope()
+    return response
+
+
+@app.teardown_request
+def teardown_request_db_scope(exc=None):
+    db.end_request_scope()
 
 _REDIS_CLIENT = None
 REDIS_INSTANCE_ID = str(uuid.uuid4())
 REDIS_EVENTS_CHANNEL = 'timo:events'
+REDIS_EVENTS_STREAM_PREFIX = 'timo:events:stream'
 REDIS_REFRESH_QUEUE = 'timo:jobs:refresh'
 REDIS_REFRESH_STATUS_KEY = 'timo:refresh:status'
+# Pending refresh requests: sorted set of org ids ('*' = every org) scored by
+# earliest request time, plus a hash of the job metadata shared by duplicates.
+REDIS_REFRESH_PENDING_KEY = 'timo:jobs:refresh:pending'
+REDIS_REFRESH_PENDING_JOBS_KEY = 'timo:jobs:refresh:pending:jobs'
+REDIS_REFRESH_ALL_ORGS = '*'
+REDIS_REFRESH_ACTIVITY_KEY = 'timo:refresh:activity'
 REDIS_REFRESH_LOCK_KEY = 'timo:refresh:lock'
-REDIS_KEEPALIVE_LOCK_KEY = 'timo:ifood:keepalive:lock'
+REDIS_KEEPALIVE_WORKERS_KEY = 'timo:ifood:keepalive:workers'
+REDIS_KEEPALIVE_ORG_LEASE_PREFIX = 'timo:ifood:keepalive:org'
+REDIS_IFOOD_ACK_PENDING_PREFIX = 'timo:ifood:ack:pending'
+REDIS_WORKER_LANES_KEY = 'timo:worker:lanes'
 REDIS_CACHE_PREFIX = 'timo:cache:restaurants'
+REDIS_AUTHZ_SCOPE_PREFIX = 'timo:authz:scope'
 try:
     REDIS_SOCKET_TIMEOUT_SECONDS = float(os.environ.get('REDIS_SOCKET_TIMEOUT_SECONDS', '35') or 35)
 except Exception:
@@ -245,6 +381,11 @@ except Exception:
 REDIS_CONNECT_TIMEOUT_SECONDS = max(1.0, REDIS_CONNECT_TIMEOUT_SECONDS)
 
 
+def get_redis_instance_id():
+    """This process's instance id; post_fork_worker gives each worker its own."""
+    return REDIS_INSTANCE_ID
+
+
 def get_redis_client():
     """Lazy Redis client initializer (returns None when unavailable)."""
     global _REDIS_CLIENT
@@ -276,6 +417,21 @@ try:
 except Exception:
     _DASHBOARD_SUMMARY_CACHE_TTL = 20
 _DASHBOARD_SUMMARY_CACHE_TTL = max(5, _DASHBOARD_SUMMARY_CACHE_TTL)
+# Restaurant visibility per (org_id, user_id): frozenset of ids, or None for all.
+# Redis holds the shared copy; the local copy is short-lived so invalidations
+# made on another instance are picked up within AUTHZ_SCOPE_LOCAL_TTL_SECONDS.
+_AUTHZ_SCOPE_CACHE = {}  # key: (org_id, user_id) -> (expires_at, scope)
+_AUTHZ_SCOPE_CACHE_LOCK = threading.Lock()
+try:
+    AUTHZ_SCOPE_CACHE_TTL_SECONDS = int(os.environ.get('AUTHZ_SCOPE_CACHE_TTL_SECONDS', '300') or 300)
+except Exception:
+    AUTHZ_SCOPE_CACHE_TTL_SECONDS = 300
+AUTHZ_SCOPE_CACHE_TTL_SECONDS = max(0, min(AUTHZ_SCOPE_CACHE_TTL_SECONDS, 3600))
+try:
+    AUTHZ_SCOPE_LOCAL_TTL_SECONDS = int(os.environ.get('AUTHZ_SCOPE_LOCAL_TTL_SECONDS', '15') or 15)
+except Exception:
+    AUTHZ_SCOPE_LOCAL_TTL_SECONDS = 15
+AUTHZ_SCOPE_LOCAL_TTL_SECONDS = max(0, min(AUTHZ_SCOPE_LOCAL_TTL_SECONDS, AUTHZ_SCOPE_CACHE_TTL_SECONDS))
 
 
 def _restaurants_cache_key(org_id, month_filter):
@@ -404,11 +560,23 @@ LAST_DATA_REFRESH = None
 APP_STARTED_AT = datetime.utcnow()
 APP_INITIALIZED = False
 _INIT_LOCK = threading.Lock()
+_DEFERRED_ORG_REFRESH = []  # org ids whose API init/refresh waits for post_fork_worker()
+_BACKGROUND_SERVICES_STARTED = False
 _ORG_DATA_LOCK = threading.RLock()
+_ORG_HYDRATION_INFLIGHT = {}  # org_id -> threading.Event set when the leader's load finishes
 _GLOBAL_STATE_LOCK = threading.RLock()
 
-_RATE_LIMIT_LOCAL = {}
+# Local fallback when Redis is unavailable: key -> (window, count, previous
+# count, expires_at), least recently used first and capped so a scan across
+# many client IPs cannot grow it without bound.
+_RATE_LIMIT_LOCAL = OrderedDict()
 _RATE_LIMIT_LOCK = threading.Lock()
+_RATE_LIMIT_SCRIPT = None  # (redis client, registered Lua script)
+try:
+    RATE_LIMIT_LOCAL_MAX_KEYS = int(os.environ.get('RATE_LIMIT_LOCAL_MAX_KEYS', '10000') or 10000)
+except Exception:
+    RATE_LIMIT_LOCAL_MAX_KEYS = 10000
+RATE_LIMIT_LOCAL_MAX_KEYS = max(100, RATE_LIMIT_LOCAL_MAX_KEYS)
 _TABLE_COLUMNS_CACHE = {}
 _TABLE_COLUMNS_CACHE_LOCK = threading.Lock()
 _INGESTION_METRICS_LOCK = threading.Lock()
@@ -421,6 +589,11 @@ _IFOOD_INGESTION_METRICS = {
     'orders_persisted': 0,
     'orders_cached': 0,
     'orders_updated': 0,
+    'events_acknowledged': 0,
+    'ack_failures': 0,
+    'ack_pending': 0,
+    'ack_lag_seconds': 0.0,
+    'ack_last_flush_at': None,
     'webhook_last_received_at': None,
     'polling_last_run_at': None,
     'webhook_last_error_at': None,
@@ -452,6 +625,14 @@ def _update_ifood_ingestion_metrics(**updates):
             _IFOOD_INGESTION_METRICS['polling_last_run_at'] = now_iso
 
 
+def _set_ifood_ingestion_gauges(**values):
+    """Overwrite gauge-style ingestion metrics (counters use _update_ifood_ingestion_metrics)."""
+    with _INGESTION_METRICS_LOCK:
+        for key, value in values.items():
+            if key in _IFOOD_INGESTION_METRICS:
+                _IFOOD_INGESTION_METRICS[key] = value
+
+
 def _snapshot_ifood_ingestion_metrics():
     with _INGESTION_METRICS_LOCK:
         return dict(_IFOOD_INGESTION_METRICS)
@@ -970,6 +1151,8 @@ def get_current_org_restaurants():
     """Get restaurant data for the current session's org"""
     org_id = get_current_org_id()
     if org_id:
+        if ORG_LAZY_HYDRATION:
+            ensure_org_hydrated(org_id)
         org = get_org_data(org_id)
         _sync_org_restaurants_from_cache(org_id, org, max_age_hours=12)
         org_config = org.get('config')
@@ -1257,39 +1440,75 @@ def _rate_limit_key(scope):
     return f"rl:{scope}:{client_ip}"
 
 
+# Sliding-window counter: the previous fixed window's count is weighted by how
+# much of it still overlaps the sliding window. Both window keys are passed in
+# KEYS (sharing a hash tag) so the script stays cluster-safe.
+_RATE_LIMIT_LUA = """
+local limit = tonumber(ARGV[1])
+local weight = tonumber(ARGV[2])
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if previous * weight + current >= limit then
+    return 0
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+return 1
+"""
+
+
+def _rate_limit_script(redis_client):
+    global _RATE_LIMIT_SCRIPT
+    cached = _RATE_LIMIT_SCRIPT
+    if cached is not None and cached[0] is redis_client:
+        return cached[1]
+    # register_script runs EVALSHA and only falls back to EVAL on NOSCRIPT.
+    script = redis_client.register_script(_RATE_LIMIT_LUA)
+    _RATE_LIMIT_SCRIPT = (redis_client, script)
+    return script
+
+
+def _check_local_rate_limit(key, limit, window_seconds, now):
+    window = int(now // window_seconds)
+    weight = 1.0 - (now - window * window_seconds) / window_seconds
+    with _RATE_LIMIT_LOCK:
+        entry = _RATE_LIMIT_LOCAL.pop(key, None)
+        while _RATE_LIMIT_LOCAL:
+            oldest = next(iter(_RATE_LIMIT_LOCAL.values()))
+            if oldest[3] > now and len(_RATE_LIMIT_LOCAL) < RATE_LIMIT_LOCAL_MAX_KEYS:
+                break
+            _RATE_LIMIT_LOCAL.popitem(last=False)
+        if entry is None or entry[0] < window - 1:
+            count, previous = 0, 0
+        elif entry[0] == window - 1:
+            count, previous = 0, entry[1]
+        else:
+            count, previous = entry[1], entry[2]
+        allowed = previous * weight + count < limit
+        if allowed:
+            count += 1
+        _RATE_LIMIT_LOCAL[key] = (window, count, previous, (window + 2) * window_seconds)
+        return allowed
+
+
 def _check_rate_limit(scope, limit, window_seconds):
-    now = int(time.time())
+    now = time.time()
     key = _rate_limit_key(scope)
     redis_client = get_redis_client()
 
     if redis_client:
-        cutoff = now - window_seconds
+        window = int(now // window_seconds)
+        weight = 1.0 - (now - window * window_seconds) / window_seconds
         try:
-            pipe = redis_client.pipeline()
-            pipe.zremrangebyscore(key, 0, cutoff)
-            pipe.zcard(key)
-            pipe.expire(key, window_seconds + 5)
-            _, count, _ = pipe.execute()
-            if int(count or 0) >= limit:
-                return False
-            redis_client.zadd(key, {f"{now}:{uuid.uuid4().hex}": now})
-            redis_client.expire(key, window_seconds + 5)
-            return True
+            allowed = _rate_limit_script(redis_client)(
+                keys=[f"{{{key}}}:{window}", f"{{{key}}}:{window - 1}"],
+                args=[limit, f"{weight:.6f}", window_seconds * 2 + 5],
+            )
+            return bool(int(allowed or 0))
         except Exception:
             pass
 
-    with _RATE_LIMIT_LOCK:
-        bucket = _RATE_LIMIT_LOCAL.get(key)
-        if bucket is None:
-            bucket = deque()
-            _RATE_LIMIT_LOCAL[key] = bucket
-        cutoff = now - window_seconds
-        while bucket and bucket[0] <= cutoff:
-            bucket.popleft()
-        if len(bucket) >= limit:
-            return False
-        bucket.append(now)
-        return True
+    return _check_local_rate_limit(key, limit, window_seconds, now)
 
 
 def rate_limit(limit, window_seconds, scope):
@@ -1843,6 +2062,25 @@ def _set_restaurant_resolved_merchant_id(restaurant: dict, resolved_merchant_id)
         restaurant['merchant_id'] = str(normalized)
 
 
+def _bump_restaurant_orders_version(restaurant: dict) -> int:
+    """Mark the restaurant's order cache as changed so its chart cube reads as stale."""
+    version = int(restaurant.get('_orders_version') or 0) + 1
+    restaurant['_orders_version'] = version
+    return version
+
+
+def _set_restaurant_orders(restaurant: dict, orders: list, changed: bool = True) -> list:
+    """Store ``orders`` as the restaurant's order cache.
+
+    Pass ``changed=False`` when ``orders`` is the cached list re-normalized;
+    otherwise the orders version is bumped (see get_restaurant_time_cube).
+    """
+    restaurant['_orders_cache'] = orders
+    if changed:
+        _bump_restaurant_orders_version(restaurant)
+    return orders
+
+
 def _maybe_enrich_restaurant_orders(restaurant: dict, api, orders_payload: list, merchant_hint: str):
     if not isinstance(orders_payload, list) or not orders_payload or not api:
         return orders_payload
@@ -1866,6 +2104,8 @@ def _maybe_enrich_restaurant_orders(restaurant: dict, api, orders_payload: list,
     )
     if isinstance(restaurant, dict):
         restaurant['_orders_enriched_at'] = now_ts
+        # Enrichment rewrites amounts/status in place; rebuild the chart cube lazily.
+        _bump_restaurant_orders_version(restaurant)
     return enriched_orders if isinstance(enriched_orders, list) else orders_payload
 
 
@@ -2229,7 +2469,7 @@ def ensure_restaurant_orders_cache(restaurant: dict, restaurant_id: str, org_id_
         normalized_existing = _maybe_enrich_restaurant_orders(
             restaurant, api, normalized_existing, current_merchant_hint
         )
-        restaurant['_orders_cache'] = normalized_existing
+        _set_restaurant_orders(restaurant, normalized_existing, changed=False)
 
         # Detail pages can request a throttled remote sync to catch newly-created
         # orders when keepalive polling missed recent events.
@@ -2286,7 +2526,10 @@ def ensure_restaurant_orders_cache(restaurant: dict, restaurant_id: str, org_id_
                                 merged_orders[fetched_key] = normalize_order_payload(
                                     _merge_order_payload_for_cache(previous_payload, normalized_fetched_order)
                                 )
-                        restaurant['_orders_cache'] = list(merged_orders.values()) if merged_orders else normalized_fetched
+                        _set_restaurant_orders(
+                            restaurant,
+                            list(merged_orders.values()) if merged_orders else normalized_fetched,
+                        )
                         _set_restaurant_resolved_merchant_id(restaurant, resolved_merchant_id)
                 except Exception:
                     pass
@@ -2301,14 +2544,15 @@ def ensure_restaurant_orders_cache(restaurant: dict, restaurant_id: str, org_id_
         if _orders_have_identifiable_ids(cached_orders):
             cache_hint = normalize_merchant_id(resolved_from_cache) or str(restaurant_id or '').strip()
             cached_orders = _maybe_enrich_restaurant_orders(restaurant, api, cached_orders, cache_hint)
-            restaurant['_orders_cache'] = cached_orders
+            _set_restaurant_orders(restaurant, cached_orders)
             _set_restaurant_resolved_merchant_id(restaurant, resolved_from_cache)
             _refresh_metrics_from_cached_orders()
             return cached_orders
 
     if not api or not restaurant_id:
-        restaurant['_orders_cache'] = normalized_existing if normalized_existing else []
-        return restaurant['_orders_cache']
+        return _set_restaurant_orders(
+            restaurant, normalized_existing if normalized_existing else [], changed=False
+        )
 
     days = resolve_current_org_fetch_days(default_days=30)
     end_date = datetime.now().strftime('%Y-%m-%d')
@@ -2333,17 +2577,16 @@ def ensure_restaurant_orders_cache(restaurant: dict, restaurant_id: str, org_id_
     _set_restaurant_resolved_merchant_id(restaurant, resolved_merchant_id)
 
     if normalized_fetched:
-        restaurant['_orders_cache'] = normalized_fetched
+        _set_restaurant_orders(restaurant, normalized_fetched)
         _refresh_metrics_from_cached_orders()
         return normalized_fetched
 
     if normalized_existing:
-        restaurant['_orders_cache'] = normalized_existing
+        _set_restaurant_orders(restaurant, normalized_existing, changed=False)
         _refresh_metrics_from_cached_orders()
         return normalized_existing
 
-    restaurant['_orders_cache'] = normalized_fetched
-    return normalized_fetched
+    return _set_restaurant_orders(restaurant, normalized_fetched)
 
 
 def build_restaurant_cache_record(restaurant: Dict, max_orders: int = 300):
@@ -2360,6 +2603,11 @@ def build_restaurant_cache_record(restaurant: Dict, max_orders: int = 300):
         orders = orders[-max_orders:]
     if orders:
         clean['_orders_cache'] = orders
+        time_cube = restaurant.get('_time_cube')
+        # Truncation changes the count, so a cube for the full list is rebuilt here.
+        if not IFoodDataProcessor.is_time_cube_current(time_cube, orders, restaurant.get('_orders_version')):
+            time_cube = IFoodDataProcessor.build_time_cube(orders)
+        clean['_time_cube'] = IFoodDataProcessor.persistable_time_cube(time_cube)
     financial_sales = [
         sale
         for sale in _extract_financial_sales_records(restaurant.get('_financial_sales_cache'))
@@ -2380,6 +2628,29 @@ def build_restaurant_cache_record(restaurant: Dict, max_orders: int = 300):
     return clean
 
 
+def get_restaurant_time_cube(restaurant: Dict, orders: List[Dict]):
+    """Return the chart time cube for ``orders``, rebuilding it when stale.
+
+    The cube is persisted with the org cache (see build_restaurant_cache_record)
+    and updated incrementally by _merge_orders_into_restaurant_cache. Writers of
+    ``_orders_cache`` bump ``_orders_version`` (see _set_restaurant_orders), so
+    the staleness check never has to read the orders themselves.
+    """
+    if not isinstance(restaurant, dict):
+        return None
+    orders_version = restaurant.get('_orders_version')
+    time_cube = restaurant.get('_time_cube')
+    if IFoodDataProcessor.is_time_cube_current(time_cube, orders, orders_version):
+        return time_cube
+    try:
+        time_cube = IFoodDataProcessor.build_time_cube(orders, orders_version)
+    except Exception as e:
+        print(f"WARN time cube build failed: {e}")
+        return None
+    restaurant['_time_cube'] = time_cube
+    return time_cube
+
+
 def aggregate_dashboard_summary(restaurants):
     total_orders = 0
     gross_revenue = 0.0
@@ -2843,44 +3114,351 @@ def build_data_quality_payload(restaurants, reference_last_refresh=None):
 # REAL-TIME SSE (Server-Sent Events) INFRASTRUCTURE
 # ============================================================================
 
+def _parse_sse_event_id(value):
+    """Parse ``<ms>-<seq>`` event ids (Redis stream id format) into a sortable tuple."""
+    text = str(value or '').strip()
+    if not text:
+        return None
+    head, _, tail = text.partition('-')
+    try:
+        return (int(head), int(tail or 0))
+    except (TypeError, ValueError):
+        return None
+
+
+def _format_sse_message(event_type: str, data_json: str, event_id=None) -> str:
+    id_line = f"id: {event_id}\n" if event_id else ''
+    return f"{id_line}event: {event_type}\ndata: {data_json}\n\n"
+
+
+def _sse_org_key(org_id):
+    text = str(org_id if org_id is not None else '').strip()
+    return text or None
+
+
+def _sse_restaurant_key(restaurant_id):
+    return normalize_merchant_id(restaurant_id) or None
+
+
+class _SSESubscriber:
+    """One connected SSE client: its scope and a bounded outbound ring.
+
+    When the browser falls behind, the ring overwrites its oldest message and
+    flags the client for a resync instead of unregistering it. ``get`` and
+    ``get_nowait`` mirror queue.Queue so the stream loop reads it the same way.
+    """
+
+    def __init__(self, org_key, restaurant_ids=None, ring_size: int = 50):
+        self.org_key = org_key
+        self.restaurant_ids = restaurant_ids
+        self._ring = deque(maxlen=max(1, int(ring_size)))
+        self._wakeup = threading.Event()
+        self.resync_needed = False
+        self.connected_at = time.time()
+        self.last_read_at = None
+        self.delivered = 0
+        self.dropped = 0
+
+    def accepts(self, restaurant_key) -> bool:
+        if not restaurant_key or self.restaurant_ids is None:
+            return True
+        return restaurant_key in self.restaurant_ids
+
+    def push(self, message: str):
+        """Enqueue without blocking; overwrite the oldest message when full."""
+        if len(self._ring) >= self._ring.maxlen:
+            self.dropped += 1
+            self.resync_needed = True
+        self._ring.append((time.monotonic(), message))
+        self._wakeup.set()
+
+    def get(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + max(0.0, timeout)
+        while True:
+            if self.resync_needed:
+                self.resync_needed = False
+                return _format_sse_message('resync', json.dumps({'reason': 'slow_consumer'}))
+            try:
+                _, message = self._ring.popleft()
+            except IndexError:
+                message = None
+            if message is not None:
+                self.delivered += 1
+                self.last_read_at = time.time()
+                return message
+            self._wakeup.clear()
+            if self._ring or self.resync_needed:
+                continue
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                raise queue.Empty
+            if not self._wakeup.wait(remaining):
+                raise queue.Empty
+
+    def get_nowait(self):
+        return self.get(timeout=0)
+
+    def metrics(self) -> dict:
+        ring = self._ring
+        try:
+            oldest_at = ring[0][0] if ring else None
+        except IndexError:
+            oldest_at = None
+        return {
+            'org_id': self.org_key,
+            'restaurant_scoped': self.restaurant_ids is not None,
+            'queued': len(ring),
+            'lag_seconds': round(time.monotonic() - oldest_at, 3) if oldest_at is not None else 0.0,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'resync_pending': bool(self.resync_needed),
+            'connected_seconds': int(time.time() - self.connected_at),
+        }
+
+
 class SSEManager:
-    """Manages Server-Sent Events for real-time order tracking"""
+    """Manages Server-Sent Events for real-time order tracking
+
+    Clients subscribe to an org topic (optionally narrowed to restaurant ids).
+    Org-scoped events only reach that org's subscribers; events broadcast
+    without an org (global refresh status) reach every client. With Redis
+    pub/sub each instance only subscribes to the org channels it has local
+    subscribers for, plus the global channel.
+
+    Every event carries a monotonically increasing ``<ms>-<seq>`` id and is
+    kept in a bounded per-org replay buffer (a Redis stream when available,
+    an in-process ring otherwise) so reconnecting clients can resume from
+    ``Last-Event-ID``.
+
+    Broadcasts are coalesced per (org, event type, restaurant) for
+    ``coalesce_ms``: state events (``data_updated``/``refresh_status``) keep
+    only the latest payload, other events are sent as one array payload when
+    more than one arrived in the window.
+
+    Subscribers live in copy-on-write tuples: register/unregister rebuild
+    them under a lock, broadcasts read the current snapshot without locking
+    and only append to each client's ring, so one slow browser never blocks
+    a broadcast or the Redis listener.
+    """
+
+    LATEST_ONLY_EVENTS = ('data_updated', 'refresh_status')
     
-    def __init__(self):
-        self._clients = []  # List of queue objects, one per connected client
+    def __init__(self, replay_size: int = None, coalesce_ms: int = None, client_buffer: int = 50):
+        self._subscribers = ()  # snapshot of every _SSESubscriber
+        self._org_index = {}  # org_key -> tuple of subscribers (replaced, never mutated)
+        self._client_buffer = client_buffer
         self._lock = threading.Lock()
+        self._replay_lock = threading.Lock()
         self._stop_event = threading.Event()
+        self._replay_size = int(replay_size or SSE_REPLAY_BUFFER_SIZE)
+        self._replay = {}  # org_key ('' for global) -> deque of replay entries
+        self._last_event_id = (0, 0)
+        self._coalesce_seconds = max(0, SSE_COALESCE_WINDOW_MS if coalesce_ms is None else int(coalesce_ms)) / 1000.0
+        self._pending = {}  # (org_key, event_type, restaurant_key) -> {'due': monotonic, 'items': [...]}
+        self._pending_cond = threading.Condition()
+        self._flush_thread = None
         self._redis_thread = None
+        if not PRELOAD_APP:
+            self.start_redis_listener()
+
+    def start_redis_listener(self):
+        """Start the cross-instance pub/sub listener (no-op when running or disabled)."""
+        if self._redis_thread is not None and self._redis_thread.is_alive():
+            return
         if USE_REDIS_PUBSUB and get_redis_client():
             self._redis_thread = threading.Thread(target=self._redis_listener_loop, daemon=True, name="sse-redis-sub")
             self._redis_thread.start()
     
-    def register(self):
-        """Register a new SSE client, returns a queue for that client"""
-        q = queue.Queue(maxsize=50)
+    def register(self, org_id=None, restaurant_ids=None):
+        """Register a new SSE client, returns its subscriber (queue-like ``get``)
+
+        ``restaurant_ids`` (iterable or None for all) narrows restaurant-scoped
+        events within the org.
+        """
+        org_key = _sse_org_key(org_id)
+        if restaurant_ids is not None:
+            restaurant_ids = frozenset(
+                key for key in (_sse_restaurant_key(rid) for rid in restaurant_ids) if key
+            )
+        subscriber = _SSESubscriber(org_key, restaurant_ids, ring_size=self._client_buffer)
         with self._lock:
-            self._clients.append(q)
-        return q
+            self._subscribers = self._subscribers + (subscriber,)
+            if org_key:
+                org_index = dict(self._org_index)
+                org_index[org_key] = org_index.get(org_key, ()) + (subscriber,)
+                self._org_index = org_index
+        return subscriber
     
-    def unregister(self, q):
-        """Remove a client queue"""
+    def unregister(self, subscriber):
+        """Remove a client"""
         with self._lock:
-            if q in self._clients:
-                self._clients.remove(q)
+            if subscriber not in self._subscribers:
+                return
+            self._subscribers = tuple(s for s in self._subscribers if s is not subscriber)
+            org_key = subscriber.org_key
+            if org_key:
+                org_index = dict(self._org_index)
+                remaining = tuple(s for s in org_index.get(org_key, ()) if s is not subscriber)
+                if remaining:
+                    org_index[org_key] = remaining
+                else:
+                    org_index.pop(org_key, None)
+                self._org_index = org_index
 
-    def _broadcast_local(self, event_type: str, data: dict):
-        message = f"event: {event_type}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
-        dead_clients = []
-        with self._lock:
-            for q in self._clients:
-                try:
-                    q.put_nowait(message)
-                except queue.Full:
-                    dead_clients.append(q)
-            for q in dead_clients:
-                self._clients.remove(q)
+    def subscribed_org_keys(self):
+        return set(self._org_index.keys())
+
+    def org_subscriber_count(self, org_id) -> int:
+        return len(self._org_index.get(_sse_org_key(org_id), ()))
+
+    def client_metrics(self):
+        return [subscriber.metrics() for subscriber in self._subscribers]
+
+    def lag_summary(self, top_n: int = 5) -> dict:
+        """Aggregate per-client lag for ops views."""
+        metrics = self.client_metrics()
+        slowest = sorted(metrics, key=lambda m: (m['lag_seconds'], m['queued']), reverse=True)[:max(0, top_n)]
+        return {
+            'clients': len(metrics),
+            'max_lag_seconds': max((m['lag_seconds'] for m in metrics), default=0.0),
+            'max_queued': max((m['queued'] for m in metrics), default=0),
+            'dropped_total': sum(m['dropped'] for m in metrics),
+            'resync_pending': sum(1 for m in metrics if m['resync_pending']),
+            'slowest': slowest,
+        }
+
+    @staticmethod
+    def _redis_channel(org_key):
+        return f"{REDIS_EVENTS_CHANNEL}:org:{org_key}" if org_key else REDIS_EVENTS_CHANNEL
 
-    def _publish_redis(self, event_type: str, data: dict):
+    @staticmethod
+    def _redis_stream(org_key):
+        return f"{REDIS_EVENTS_STREAM_PREFIX}:org:{org_key}" if org_key else REDIS_EVENTS_STREAM_PREFIX
+
+    def _next_event_id(self) -> str:
+        now_ms = int(time.time() * 1000)
+        with self._replay_lock:
+            last_ms, last_seq = self._last_event_id
+            if now_ms > last_ms:
+                self._last_event_id = (now_ms, 0)
+            else:
+                self._last_event_id = (last_ms, last_seq + 1)
+            event_ms, event_seq = self._last_event_id
+        return f"{event_ms}-{event_seq}"
+
+    def _remember(self, org_key, event_id: str, event_type: str, data_json: str, restaurant_key):
+        parsed_id = _parse_sse_event_id(event_id)
+        if parsed_id is None:
+            return
+        with self._replay_lock:
+            ring = self._replay.get(org_key or '')
+            if ring is None:
+                ring = deque(maxlen=self._replay_size)
+                self._replay[org_key or ''] = ring
+            if ring and ring[-1][0] >= parsed_id:
+                return
+            ring.append((parsed_id, event_id, event_type, data_json, restaurant_key))
+            if parsed_id > self._last_event_id:
+                # Keep local ids ahead of ids learned from other instances.
+                self._last_event_id = parsed_id
+
+    def _append_redis_stream(self, org_key, event_type: str, data_json: str, restaurant_key):
+        r = get_redis_client()
+        if not (USE_REDIS_PUBSUB and r):
+            return None
+        try:
+            event_id = r.xadd(
+                self._redis_stream(org_key),
+                {
+                    'event_type': event_type,
+                    'data': data_json,
+                    'restaurant_id': restaurant_key or '',
+                },
+                maxlen=self._replay_size,
+                approximate=True,
+            )
+            return str(event_id) if event_id else None
+        except Exception:
+            return None
+
+    def _read_redis_stream(self, org_key, after_id):
+        """Return (entries newer than ``after_id``, gap) or None when Redis is unavailable.
+
+        ``gap`` is True when the stream was trimmed past ``after_id``.
+        """
+        r = get_redis_client()
+        if not (USE_REDIS_PUBSUB and r):
+            return None
+        stream_key = self._redis_stream(org_key)
+        try:
+            oldest = r.xrange(stream_key, min='-', max='+', count=1)
+            rows = r.xrange(
+                stream_key,
+                min=f"{after_id[0]}-{after_id[1]}",
+                max='+',
+                count=self._replay_size + 1,
+            )
+            trimmed = bool(oldest) and r.xlen(stream_key) >= self._replay_size
+        except Exception:
+            return None
+        oldest_id = _parse_sse_event_id(oldest[0][0]) if oldest else None
+        gap = bool(trimmed and oldest_id and oldest_id > after_id)
+        entries = []
+        for event_id, fields in rows or []:
+            parsed_id = _parse_sse_event_id(event_id)
+            if parsed_id is None or parsed_id <= after_id:
+                continue
+            entries.append((
+                parsed_id,
+                str(event_id),
+                fields.get('event_type') or '',
+                fields.get('data') or '{}',
+                fields.get('restaurant_id') or None,
+            ))
+        return entries, gap
+
+    def replay(self, subscriber, last_event_id):
+        """Return SSE messages ``subscriber`` missed after ``last_event_id``.
+
+        When the buffer no longer reaches back to ``last_event_id`` a single
+        ``resync`` event is emitted first so the client reloads its data.
+        """
+        after_id = _parse_sse_event_id(last_event_id)
+        if after_id is None or subscriber is None:
+            return []
+        entries = []
+        resync = False
+        for org_key in ([subscriber.org_key, None] if subscriber.org_key else [None]):
+            stream_result = self._read_redis_stream(org_key, after_id)
+            if stream_result is None:
+                with self._replay_lock:
+                    ring = self._replay.get(org_key or '') or ()
+                    stream_entries = [entry for entry in ring if entry[0] > after_id]
+                    gap = bool(ring) and len(ring) >= ring.maxlen and ring[0][0] > after_id
+            else:
+                stream_entries, gap = stream_result
+            entries.extend(stream_entries)
+            resync = resync or gap
+        entries.sort(key=lambda entry: entry[0])
+        messages = [
+            _format_sse_message(event_type, data_json, event_id)
+            for _, event_id, event_type, data_json, restaurant_key in entries
+            if event_type and subscriber.accepts(restaurant_key)
+        ]
+        if resync:
+            messages.insert(0, _format_sse_message('resync', json.dumps({'reason': 'replay_buffer_exceeded'})))
+        return messages
+
+    def _broadcast_local(self, event_type: str, data_json: str, org_id=None, restaurant_id=None, event_id=None):
+        message = _format_sse_message(event_type, data_json, event_id)
+        org_key = _sse_org_key(org_id)
+        restaurant_key = _sse_restaurant_key(restaurant_id)
+        targets = self._org_index.get(org_key, ()) if org_key else self._subscribers
+        for subscriber in targets:
+            if subscriber.accepts(restaurant_key):
+                subscriber.push(message)
+
+    def _publish_redis(self, event_type: str, data_json: str, org_id=None, restaurant_id=None, event_id=None):
         r = get_redis_client()
         if not (USE_REDIS_PUBSUB and r):
             return
@@ -2888,14 +3466,21 @@ class SSEManager:
             payload = {
                 'source': REDIS_INSTANCE_ID,
                 'event_type': event_type,
-                'data': data
+                'data_json': data_json,
+                'org_id': _sse_org_key(org_id),
+                'restaurant_id': _sse_restaurant_key(restaurant_id),
+                'event_id': event_id,
             }
-            r.publish(REDIS_EVENTS_CHANNEL, json.dumps(payload, ensure_ascii=False, default=str))
+            r.publish(self._redis_channel(_sse_org_key(org_id)), json.dumps(payload, ensure_ascii=False, default=str))
         except Exception:
             pass
 
     def _redis_listener_loop(self):
-        """Subscribe to distributed SSE events and relay to local clients."""
+        """Subscribe to distributed SSE events and relay to local clients.
+
+        Org channel subscriptions follow local subscribers; they are synced from
+        this thread between reads so the pubsub connection is never shared.
+        """
         r = get_redis_client()
         if not r:
             return
@@ -2904,9 +3489,18 @@ class SSEManager:
             try:
                 pubsub = r.pubsub(ignore_subscribe_messages=True)
                 pubsub.subscribe(REDIS_EVENTS_CHANNEL)
-                for message in pubsub.listen():
-                    if self._stop_event.is_set():
-                        break
+                subscribed_orgs = set()
+                while not self._stop_event.is_set():
+                    wanted_orgs = self.subscribed_org_keys()
+                    joined = wanted_orgs - subscribed_orgs
+                    left = subscribed_orgs - wanted_orgs
+                    if joined:
+                        pubsub.subscribe(*[self._redis_channel(key) for key in joined])
+                    if left:
+                        pubsub.unsubscribe(*[self._redis_channel(key) for key in left])
+                    subscribed_orgs = wanted_orgs
+
+                    message = pubsub.get_message(timeout=1.0)
                     if not message or message.get('type') != 'message':
                         continue
                     raw = message.get('data')
@@ -2919,9 +3513,22 @@ class SSEManager:
                     if payload.get('source') == REDIS_INSTANCE_ID:
                         continue
                     event_type = payload.get('event_type')
-                    event_data = payload.get('data', {})
+                    data_json = payload.get('data_json')
+                    if data_json is None:
+                        data_json = json.dumps(payload.get('data', {}), ensure_ascii=False, default=str)
                     if event_type:
-                        self._broadcast_local(event_type, event_data)
+                        org_key = _sse_org_key(payload.get('org_id'))
+                        restaurant_key = payload.get('restaurant_id') or None
+                        event_id = payload.get('event_id')
+                        if event_id:
+                            self._remember(org_key, event_id, event_type, data_json, restaurant_key)
+                        self._broadcast_local(
+                            event_type,
+                            data_json,
+                            org_id=org_key,
+                            restaurant_id=restaurant_key,
+                            event_id=event_id,
+                        )
             except Exception:
                 time.sleep(2)
             finally:
@@ -2931,15 +3538,71 @@ class SSEManager:
                 except Exception:
                     pass
     
-    def broadcast(self, event_type: str, data: dict):
-        """Send an event to all connected clients"""
-        self._broadcast_local(event_type, data)
-        self._publish_redis(event_type, data)
+    def broadcast(self, event_type: str, data: dict, org_id=None, restaurant_id=None):
+        """Send an event to the org's subscribers (every client when org_id is None)"""
+        org_key = _sse_org_key(org_id)
+        restaurant_key = _sse_restaurant_key(restaurant_id)
+        if self._coalesce_seconds <= 0:
+            self._emit(event_type, data, org_key, restaurant_key)
+            return
+        batch_key = (org_key, event_type, restaurant_key)
+        with self._pending_cond:
+            batch = self._pending.get(batch_key)
+            if batch is None:
+                batch = {'due': time.monotonic() + self._coalesce_seconds, 'items': []}
+                self._pending[batch_key] = batch
+            if event_type in self.LATEST_ONLY_EVENTS:
+                batch['items'] = [data]
+            else:
+                batch['items'].append(data)
+            if self._flush_thread is None or not self._flush_thread.is_alive():
+                self._flush_thread = threading.Thread(target=self._flush_loop, daemon=True, name="sse-coalesce")
+                self._flush_thread.start()
+            self._pending_cond.notify()
+
+    def flush(self):
+        """Emit every pending coalesced batch now."""
+        with self._pending_cond:
+            batches = list(self._pending.items())
+            self._pending.clear()
+        self._emit_batches(batches)
+
+    def _flush_loop(self):
+        while not self._stop_event.is_set():
+            with self._pending_cond:
+                if not self._pending:
+                    self._pending_cond.wait(timeout=1.0)
+                    continue
+                now = time.monotonic()
+                next_due = min(batch['due'] for batch in self._pending.values())
+                if next_due > now:
+                    self._pending_cond.wait(timeout=next_due - now)
+                    continue
+                due_keys = [key for key, batch in self._pending.items() if batch['due'] <= now]
+                batches = [(key, self._pending.pop(key)) for key in due_keys]
+            try:
+                self._emit_batches(batches)
+            except Exception as e:
+                print(f"SSE coalesced flush failed: {e}")
+
+    def _emit_batches(self, batches):
+        for (org_key, event_type, restaurant_key), batch in batches:
+            items = batch.get('items') or []
+            if not items:
+                continue
+            payload = items[0] if len(items) == 1 else items
+            self._emit(event_type, payload, org_key, restaurant_key)
+
+    def _emit(self, event_type: str, data, org_key, restaurant_key):
+        data_json = json.dumps(data, ensure_ascii=False, default=str)
+        event_id = self._append_redis_stream(org_key, event_type, data_json, restaurant_key) or self._next_event_id()
+        self._remember(org_key, event_id, event_type, data_json, restaurant_key)
+        self._broadcast_local(event_type, data_json, org_id=org_key, restaurant_id=restaurant_key, event_id=event_id)
+        self._publish_redis(event_type, data_json, org_id=org_key, restaurant_id=restaurant_key, event_id=event_id)
     
     @property
     def client_count(self):
-        with self._lock:
-            return len(self._clients)
+        return len(self._subscribers)
 
 sse_manager = SSEManager()
 
@@ -2973,38 +3636,78 @@ class BackgroundRefresher:
             self._thread.join(timeout=5)
     
     def _run(self):
+        if not REFRESH_SCHEDULER_ENABLED:
+            while not self._stop_event.is_set():
+                self._stop_event.wait(self.interval)
+                if self._stop_event.is_set():
+                    break
+                self.refresh_now()
+            return
+
+        next_maintenance = time.time() + self.interval
         while not self._stop_event.is_set():
-            self._stop_event.wait(self.interval)
+            self._stop_event.wait(REFRESH_SCHEDULER_TICK_SECONDS)
             if self._stop_event.is_set():
                 break
-            self.refresh_now()
+            try:
+                due_org_ids = plan_due_refreshes()
+                if due_org_ids:
+                    self.refresh_now(org_ids=due_org_ids)
+                if time.time() >= next_maintenance:
+                    _run_refresh_maintenance()
+                    next_maintenance = time.time() + self.interval
+            except Exception as e:
+                print(f"Refresh scheduler error: {e}")
     
-    def refresh_now(self):
-        """Perform a data refresh (thread-safe)"""
+    @staticmethod
+    def _publish_status(payload: dict, org_ids=None):
+        if not org_ids:
+            set_refresh_status(payload)
+            sse_manager.broadcast('refresh_status', payload)
+            return
+        for org_id in org_ids:
+            set_refresh_status(payload, org_id=org_id)
+            sse_manager.broadcast('refresh_status', payload, org_id=org_id)
+
+    def refresh_now(self, org_ids=None, job_id=None):
+        """Perform a data refresh (thread-safe)
+
+        ``org_ids`` limits the refresh to those orgs; status and SSE events are
+        then reported per org instead of globally.
+        """
         if not self._refresh_lock.acquire(blocking=False):
             return False  # Already refreshing
         lock_token = None
+        org_ids = [org_id for org_id in (org_ids or []) if org_id is not None] or None
+        job_fields = {'job_id': job_id} if job_id else {}
         try:
             lock_token = acquire_refresh_lock()
             if USE_REDIS_QUEUE and not lock_token:
                 return False
             self._is_refreshing = True
-            status_payload = {'status': 'refreshing', 'timestamp': datetime.now().isoformat()}
-            set_refresh_status(status_payload)
-            sse_manager.broadcast('refresh_status', status_payload)
+            status_payload = {'status': 'refreshing', 'timestamp': datetime.now().isoformat(), **job_fields}
+            self._publish_status(status_payload, org_ids)
             
-            _do_data_refresh()
+            _do_data_refresh(org_ids=org_ids)
             
-            complete_payload = {'status': 'complete', 'timestamp': datetime.now().isoformat(), 'count': len(RESTAURANTS_DATA)}
+            if org_ids:
+                for org_id in org_ids:
+                    org_count = len(get_org_data(org_id).get('restaurants') or [])
+                    complete_payload = {'status': 'complete', 'timestamp': datetime.now().isoformat(), 'count': org_count, **job_fields}
+                    set_refresh_status(complete_payload, org_id=org_id)
+                    sse_manager.broadcast('refresh_status', complete_payload, org_id=org_id)
+                    sse_manager.broadcast('data_updated', {'restaurant_count': org_count, 'timestamp': datetime.now().isoformat()}, org_id=org_id)
+                return True
+
+            complete_payload = {'status': 'complete', 'timestamp': datetime.now().isoformat(), 'count': len(RESTAURANTS_DATA), **job_fields}
             set_refresh_status(complete_payload)
             sse_manager.broadcast('refresh_status', complete_payload)
             sse_manager.broadcast('data_updated', {'restaurant_count': len(RESTAURANTS_DATA), 'timestamp': datetime.now().isoformat()})
             return True
         except Exception as e:
             print(f"Ã¢ÂÅ’ Background refresh error: {e}")
-            error_payload = {'status': 'error', 'error': str(e), 'timestamp': datetime.now().isoformat()}
-            set_refresh_status(error_payload)
-            sse_manager.broadcast('refresh_status', error_payload)
+            error_payload = {'status': 'error', 'error': str(e), 'timestamp': datetime.now().isoformat(), **job_fields}
+            self._publish_status(error_payload, org_ids)
             return False
         finally:
             self._is_refreshing = False
@@ -3068,118 +3771,532 @@ def release_refresh_lock(token):
     _release_redis_lock(REDIS_REFRESH_LOCK_KEY, token)
 
 
-def acquire_keepalive_lock():
-    """Acquire keepalive polling lock to avoid duplicate polling across instances."""
-    ttl_seconds = max(20, int(IFOOD_POLL_INTERVAL_SECONDS or 30) * 2)
+def keepalive_shard_workers():
+    """Heartbeat this instance and return the live keepalive workers.
+
+    Workers that miss heartbeats for a few poll intervals drop out, and their
+    orgs move to the remaining workers on the next cycle.
+    """
+    r = get_redis_client()
+    if not r:
+        return [REDIS_INSTANCE_ID]
+    now_ts = time.time()
+    ttl_seconds = max(30, int(IFOOD_POLL_INTERVAL_SECONDS or 30) * 3)
+    try:
+        pipe = r.pipeline()
+        pipe.zadd(REDIS_KEEPALIVE_WORKERS_KEY, {REDIS_INSTANCE_ID: now_ts})
+        pipe.zremrangebyscore(REDIS_KEEPALIVE_WORKERS_KEY, '-inf', now_ts - ttl_seconds)
+        pipe.zrange(REDIS_KEEPALIVE_WORKERS_KEY, 0, -1, withscores=True)
+        _, _, members = pipe.execute()
+        workers = keepalive_shard_service.live_workers(dict(members or []), now=now_ts, ttl=ttl_seconds)
+        return workers or [REDIS_INSTANCE_ID]
+    except Exception:
+        return [REDIS_INSTANCE_ID]
+
+
+def _keepalive_shard_key(org_id):
+    return str(org_id) if org_id is not None else 'legacy'
+
+
+def acquire_keepalive_org_lease(org_id):
+    """Lease one org's keepalive poll for (almost) one interval.
+
+    The lease is not released after polling, so workers whose views of the
+    shard membership briefly disagree still poll each org once per interval.
+    """
+    ttl_seconds = max(5, int(IFOOD_POLL_INTERVAL_SECONDS or 30) - 5)
     return _acquire_redis_lock(
-        REDIS_KEEPALIVE_LOCK_KEY,
+        f"{REDIS_KEEPALIVE_ORG_LEASE_PREFIX}:{_keepalive_shard_key(org_id)}",
         ttl_seconds,
         fallback_token=REDIS_INSTANCE_ID,
         require_redis=False,
     )
 
 
-def release_keepalive_lock(token):
-    """Release keepalive polling lock owned by token."""
-    _release_redis_lock(REDIS_KEEPALIVE_LOCK_KEY, token, ignored_tokens={REDIS_INSTANCE_ID})
+def _refresh_status_key(org_id=None):
+    return f"{REDIS_REFRESH_STATUS_KEY}:org:{org_id}" if org_id is not None else REDIS_REFRESH_STATUS_KEY
 
 
-def set_refresh_status(status_payload: dict):
-    """Persist refresh status for all instances."""
+def set_refresh_status(status_payload: dict, org_id=None):
+    """Persist refresh status for all instances (per org when ``org_id`` is set)."""
     if not isinstance(status_payload, dict):
         return
     r = get_redis_client()
     if USE_REDIS_QUEUE and r:
         try:
-            r.set(REDIS_REFRESH_STATUS_KEY, json.dumps(status_payload, ensure_ascii=False, default=str), ex=86400)
+            r.set(_refresh_status_key(org_id), json.dumps(status_payload, ensure_ascii=False, default=str), ex=86400)
         except Exception:
             pass
 
 
-def get_refresh_status():
-    """Read shared refresh status when available."""
+def get_refresh_status(org_id=None):
+    """Read shared refresh status when available.
+
+    With ``org_id`` the org's own job status is preferred over the global one.
+    """
     r = get_redis_client()
     if USE_REDIS_QUEUE and r:
-        try:
-            raw = r.get(REDIS_REFRESH_STATUS_KEY)
-            if raw:
-                payload = json.loads(raw)
-                if isinstance(payload, dict):
-                    return payload
-        except Exception:
-            pass
+        keys = [_refresh_status_key(org_id), REDIS_REFRESH_STATUS_KEY] if org_id is not None else [REDIS_REFRESH_STATUS_KEY]
+        for key in keys:
+            try:
+                raw = r.get(key)
+                if raw:
+                    payload = json.loads(raw)
+                    if isinstance(payload, dict):
+                        return payload
+            except Exception:
+                pass
     return {
         'status': 'refreshing' if bg_refresher.is_refreshing else 'idle',
         'timestamp': datetime.now().isoformat()
     }
 
 
-def enqueue_refresh_job(trigger='api'):
-    """Enqueue a refresh request for worker processing."""
+def enqueue_refresh_job(trigger='api', org_id=None):
+    """Enqueue a refresh request for worker processing.
+
+    Requests are coalesced per org: while an org (or the all-orgs marker when
+    ``org_id`` is None) is pending, further requests return the pending job id
+    and keep the earliest requested time.
+    """
     r = get_redis_client()
     if not (USE_REDIS_QUEUE and r):
         return None
+    member = str(org_id) if org_id is not None else REDIS_REFRESH_ALL_ORGS
     job_id = str(uuid.uuid4())
     payload = {
         'job_id': job_id,
         'trigger': trigger,
+        'org_id': org_id,
         'requested_at': datetime.now().isoformat(),
         'requested_by_instance': REDIS_INSTANCE_ID
     }
     try:
-        r.lpush(REDIS_REFRESH_QUEUE, json.dumps(payload, ensure_ascii=False, default=str))
-        set_refresh_status({'status': 'queued', 'timestamp': datetime.now().isoformat(), 'job_id': job_id, 'trigger': trigger})
+        pipe = r.pipeline()
+        pipe.hsetnx(REDIS_REFRESH_PENDING_JOBS_KEY, member, json.dumps(payload, ensure_ascii=False, default=str))
+        pipe.zadd(REDIS_REFRESH_PENDING_KEY, {member: time.time()}, nx=True)
+        pipe.hget(REDIS_REFRESH_PENDING_JOBS_KEY, member)
+        _, _, stored = pipe.execute()
+        try:
+            job_id = (json.loads(stored) or {}).get('job_id') or job_id
+        except Exception:
+            pass
+        set_refresh_status(
+            {'status': 'queued', 'timestamp': datetime.now().isoformat(), 'job_id': job_id, 'trigger': trigger},
+            org_id=org_id,
+        )
         return job_id
     except Exception:
         return None
 
 
-_KEEPALIVE_POLL_CYCLE = 0
-
+# Pop the oldest pending member and take its payload in one step, so an
+# enqueue cannot re-add the member between the pop and the payload delete.
+_CLAIM_REFRESH_LUA = """
+local popped = redis.call('ZPOPMIN', KEYS[1])
+if #popped == 0 then
+    return false
+end
+local raw = redis.call('HGET', KEYS[2], popped[1])
+redis.call('HDEL', KEYS[2], popped[1])
+return {popped[1], popped[2], raw}
+"""
+_CLAIM_REFRESH_SCRIPT = None  # (redis client, registered Lua script)
+_CLAIM_REFRESH_POLL_SECONDS = 0.2
 
-def _extract_org_merchant_ids(org_config):
-    """Collect normalized merchant ids from org iFood config payload."""
-    if not isinstance(org_config, dict):
-        return []
-    merchants = org_config.get('merchants') or []
-    if isinstance(merchants, str):
-        try:
-            merchants = json.loads(merchants)
-        except Exception:
-            merchants = []
-    if not isinstance(merchants, list):
-        return []
 
-    ids = []
-    for m in merchants:
-        if isinstance(m, str):
-            merchant_id = normalize_merchant_id(m)
-            if merchant_id:
-                ids.append(str(merchant_id))
-            continue
-        if not isinstance(m, dict):
-            continue
-        merchant_id = normalize_merchant_id(m.get('merchant_id') or m.get('id'))
-        if merchant_id:
-            ids.append(str(merchant_id))
-    # preserve insertion order, drop duplicates
-    return list(dict.fromkeys(ids))
+def _claim_refresh_script(redis_client):
+    global _CLAIM_REFRESH_SCRIPT
+    cached = _CLAIM_REFRESH_SCRIPT
+    if cached is not None and cached[0] is redis_client:
+        return cached[1]
+    script = redis_client.register_script(_CLAIM_REFRESH_LUA)
+    _CLAIM_REFRESH_SCRIPT = (redis_client, script)
+    return script
 
 
-def _order_cache_key(order: dict) -> str:
-    if not isinstance(order, dict):
-        return ''
-    order_id = _extract_order_identifier(order)
-    if order_id:
-        return str(order_id)
+def claim_refresh_job(timeout_seconds: int = 1):
+    """Pop the oldest pending refresh request (waiting up to ``timeout_seconds``).
 
-    created_at = str(order.get('createdAt') or '').strip()
-    merchant_payload = order.get('merchant')
-    merchant_candidate = order.get('merchantId') or order.get('merchant_id')
-    if not merchant_candidate and isinstance(merchant_payload, dict):
-        merchant_candidate = (
-            (merchant_payload or {}).get('id')
-            or (merchant_payload or {}).get('merchantId')
+    Scripts cannot block, so an empty queue is polled until the timeout.
+    Returns the job payload with ``org_ids`` (None for every org) or None.
+    """
+    r = get_redis_client()
+    if not (USE_REDIS_QUEUE and r):
+        return None
+    script = _claim_refresh_script(r)
+    deadline = time.time() + max(0.0, float(timeout_seconds))
+    while True:
+        claimed = script(keys=[REDIS_REFRESH_PENDING_KEY, REDIS_REFRESH_PENDING_JOBS_KEY])
+        if claimed:
+            break
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return None
+        time.sleep(min(_CLAIM_REFRESH_POLL_SECONDS, remaining))
+    member, score, raw = claimed
+    score = float(score)
+    try:
+        payload = json.loads(raw) if raw else {}
+    except Exception:
+        payload = {}
+    if not isinstance(payload, dict):
+        payload = {}
+    payload.setdefault('job_id', str(uuid.uuid4()))
+    payload.setdefault('trigger', 'queue')
+    payload['pending_since'] = score
+    if member == REDIS_REFRESH_ALL_ORGS:
+        payload['org_ids'] = None
+    else:
+        payload['org_ids'] = [int(member) if str(member).isdigit() else member]
+    return payload
+
+
+# Per-org scheduling state kept by the process that runs refreshes.
+_REFRESH_ORG_STATE = {}
+_REFRESH_ORG_STATE_LOCK = threading.Lock()
+_REFRESH_ORG_ACTIVITY = {}  # "<org_id>:<kind>" -> epoch seconds (local fallback)
+_REFRESH_PLAN_CACHE_SECONDS = 600
+
+
+def record_org_activity(org_id, kind: str):
+    """Note webhook/polling events ('event') or live viewers ('viewer') for an org.
+
+    Shared through Redis so the worker process sees activity from web instances.
+    """
+    if org_id is None:
+        return
+    field = f"{org_id}:{kind}"
+    now_ts = time.time()
+    _REFRESH_ORG_ACTIVITY[field] = now_ts
+    r = get_redis_client()
+    if USE_REDIS_QUEUE and r:
+        try:
+            r.hset(REDIS_REFRESH_ACTIVITY_KEY, field, now_ts)
+        except Exception:
+            pass
+
+
+def _org_activity_snapshot() -> dict:
+    activity = dict(_REFRESH_ORG_ACTIVITY)
+    r = get_redis_client()
+    if USE_REDIS_QUEUE and r:
+        try:
+            for field, value in (r.hgetall(REDIS_REFRESH_ACTIVITY_KEY) or {}).items():
+                try:
+                    activity[field] = max(float(value), activity.get(field, 0.0))
+                except (TypeError, ValueError):
+                    continue
+        except Exception:
+            pass
+    return activity
+
+
+def record_org_refresh_result(org_id, success: bool):
+    now_ts = time.time()
+    with _REFRESH_ORG_STATE_LOCK:
+        state = _REFRESH_ORG_STATE.setdefault(org_id, {})
+        state['last_attempt_at'] = now_ts
+        if success:
+            state['failures'] = 0
+            state['last_success_at'] = now_ts
+        else:
+            state['failures'] = int(state.get('failures') or 0) + 1
+
+
+def _org_plan_name(org_id, state: dict):
+    now_ts = time.time()
+    if state.get('plan_checked_at') and (now_ts - state['plan_checked_at']) < _REFRESH_PLAN_CACHE_SECONDS:
+        return state.get('plan_name')
+    try:
+        subscription = db.get_org_subscription(org_id) or {}
+    except Exception:
+        subscription = {}
+    state['plan_name'] = subscription.get('plan_name')
+    state['plan_checked_at'] = now_ts
+    return state['plan_name']
+
+
+def plan_due_refreshes(now_ts=None):
+    """Return org ids due for refresh this cycle, most overdue first, within budget."""
+    now_ts = time.time() if now_ts is None else now_ts
+    activity = _org_activity_snapshot()
+    candidates = []
+    for org_id, od in _org_data_items_snapshot():
+        if not (od.get('api') or od.get('config')):
+            continue
+        with _REFRESH_ORG_STATE_LOCK:
+            state = _REFRESH_ORG_STATE.setdefault(org_id, {})
+        last_success_at = state.get('last_success_at')
+        last_refresh = od.get('last_refresh')
+        if isinstance(last_refresh, datetime):
+            # Cache loads and other instances' refreshes also count as fresh data.
+            last_success_at = max(last_success_at or 0.0, last_refresh.timestamp())
+        viewer_seen_at = activity.get(f"{org_id}:viewer")
+        viewers = sse_manager.org_subscriber_count(org_id)
+        if viewer_seen_at and (now_ts - viewer_seen_at) < 120:
+            viewers += 1
+        event_seen_at = activity.get(f"{org_id}:event")
+        interval = refresh_scheduler_service.refresh_interval_seconds(
+            _org_plan_name(org_id, state),
+            viewers=viewers,
+            last_event_age=(now_ts - event_seen_at) if event_seen_at else None,
+        )
+        merchant_count = len(_extract_org_merchant_ids(od.get('config') or {})) or len(od.get('restaurants') or []) or 1
+        candidates.append({
+            'org_id': org_id,
+            'due_at': refresh_scheduler_service.next_due_at(
+                last_success_at=last_success_at,
+                interval=interval,
+                failures=state.get('failures') or 0,
+                last_attempt_at=state.get('last_attempt_at'),
+            ),
+            'cost': merchant_count * REFRESH_CALLS_PER_MERCHANT,
+        })
+    return refresh_scheduler_service.pick_due_orgs(candidates, now=now_ts, budget=REFRESH_CYCLE_API_BUDGET)
+
+
+class IFoodAckBuffer:
+    """Acknowledge processed iFood events in background batches.
+
+    Event ids are grouped per iFood credential, so orgs sharing a client id
+    are acked together. A flush thread sends full batches as soon as they fill
+    and everything else every ``flush_interval`` seconds. A failed batch is
+    retried with exponential backoff. Pending ids are mirrored to Redis, so
+    after a crash the next process acks them instead of reprocessing the
+    redelivered backlog.
+    """
+
+    def __init__(self, batch_size=2000, flush_interval=1.0, max_backoff=300):
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.05, float(flush_interval))
+        self.max_backoff = float(max_backoff)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._clients = {}
+        self._pending = {}
+        self._retry = {}
+        self._restored = set()
+        self._thread = None
+
+    @staticmethod
+    def credential_key(api):
+        client_id = str(getattr(api, 'client_id', '') or '')
+        return hashlib.sha1(client_id.encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def _redis_key(credential):
+        return f"{REDIS_IFOOD_ACK_PENDING_PREFIX}:{credential}"
+
+    def add(self, api, events):
+        """Queue the ids of processed ``events``; returns how many were new."""
+        event_ids = []
+        for event in (events or []):
+            event_id = _extract_event_id_from_payload(event)
+            if event_id:
+                event_ids.append(str(event_id))
+        if not event_ids:
+            return 0
+        credential = self.credential_key(api)
+        now_ts = time.time()
+        with self._lock:
+            self._clients[credential] = api
+            pending = self._pending.setdefault(credential, {})
+            new_ids = [event_id for event_id in dict.fromkeys(event_ids) if event_id not in pending]
+            for event_id in new_ids:
+                pending[event_id] = now_ts
+            needs_restore = credential not in self._restored
+            self._restored.add(credential)
+            full = len(pending) >= self.batch_size
+        if needs_restore:
+            self._restore(credential)
+        self._persist(credential, new_ids, now_ts)
+        self._ensure_thread()
+        if full:
+            self._wake.set()
+        self._report()
+        return len(new_ids)
+
+    def _restore(self, credential):
+        r = get_redis_client()
+        if not r:
+            return
+        try:
+            stored = r.hgetall(self._redis_key(credential)) or {}
+        except Exception:
+            return
+        with self._lock:
+            pending = self._pending.setdefault(credential, {})
+            for event_id, enqueued_at in stored.items():
+                try:
+                    pending.setdefault(str(event_id), float(enqueued_at))
+                except Exception:
+                    pending.setdefault(str(event_id), time.time())
+
+    def _persist(self, credential, event_ids, enqueued_at):
+        r = get_redis_client()
+        if not r or not event_ids:
+            return
+        try:
+            pipe = r.pipeline()
+            pipe.hset(self._redis_key(credential), mapping={event_id: enqueued_at for event_id in event_ids})
+            pipe.expire(self._redis_key(credential), 86400)
+            pipe.execute()
+        except Exception:
+            pass
+
+    def _forget(self, credential, event_ids):
+        r = get_redis_client()
+        if not r or not event_ids:
+            return
+        try:
+            r.hdel(self._redis_key(credential), *event_ids)
+        except Exception:
+            pass
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='ifood-ack-flush', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"iFood ack flush error: {e}")
+
+    def _next_batch(self, credential, now_ts, force):
+        with self._lock:
+            pending = self._pending.get(credential) or {}
+            retry = self._retry.get(credential) or {}
+            if not pending or (not force and retry.get('next_at', 0) > now_ts):
+                return None, None
+            batch = list(pending)[:self.batch_size]
+            oldest = min(pending[event_id] for event_id in batch)
+            return self._clients.get(credential), (batch, oldest)
+
+    def flush(self, force=False):
+        """Send every due batch; returns the number of ids acknowledged."""
+        acknowledged = 0
+        with self._lock:
+            credentials = list(self._pending)
+        for credential in credentials:
+            while True:
+                now_ts = time.time()
+                api, work = self._next_batch(credential, now_ts, force)
+                if not work or api is None:
+                    break
+                batch, oldest = work
+                try:
+                    result = api.acknowledge_events([{'id': event_id} for event_id in batch])
+                except Exception as e:
+                    result = {'success': False, 'error': str(e)}
+                success = isinstance(result, dict) and bool(result.get('success'))
+                with self._lock:
+                    pending = self._pending.get(credential) or {}
+                    if success:
+                        for event_id in batch:
+                            pending.pop(event_id, None)
+                        self._retry.pop(credential, None)
+                    else:
+                        retry = self._retry.setdefault(credential, {'attempts': 0})
+                        retry['attempts'] += 1
+                        retry['next_at'] = now_ts + min(self.max_backoff, 2 ** retry['attempts'])
+                _append_ifood_evidence_entry({
+                    'type': 'ifood_ack_batch',
+                    'credential': credential,
+                    'requested': len(batch),
+                    'success': success,
+                    'lag_seconds': round(now_ts - oldest, 3),
+                    'trace': result.get('trace') if isinstance(result, dict) else None,
+                })
+                if not success:
+                    _update_ifood_ingestion_metrics(ack_failures=1)
+                    break
+                acknowledged += len(batch)
+                self._forget(credential, batch)
+                _update_ifood_ingestion_metrics(events_acknowledged=len(batch))
+        _set_ifood_ingestion_gauges(ack_last_flush_at=datetime.now().isoformat())
+        self._report()
+        return acknowledged
+
+    def pending_count(self):
+        with self._lock:
+            return sum(len(pending) for pending in self._pending.values())
+
+    def _report(self):
+        with self._lock:
+            oldest = min(
+                (enqueued_at for pending in self._pending.values() for enqueued_at in pending.values()),
+                default=None,
+            )
+            pending_total = sum(len(pending) for pending in self._pending.values())
+        _set_ifood_ingestion_gauges(
+            ack_pending=pending_total,
+            ack_lag_seconds=round(time.time() - oldest, 3) if oldest is not None else 0.0,
+        )
+
+
+ifood_ack_buffer = IFoodAckBuffer(
+    batch_size=IFOOD_ACK_BATCH_SIZE,
+    flush_interval=IFOOD_ACK_FLUSH_INTERVAL_MS / 1000.0,
+)
+
+
+_KEEPALIVE_POLL_CYCLE = 0
+_KEEPALIVE_SHARD_WORKERS = ()
+
+
+def _extract_org_merchant_ids(org_config):
+    """Collect normalized merchant ids from org iFood config payload."""
+    if not isinstance(org_config, dict):
+        return []
+    merchants = org_config.get('merchants') or []
+    if isinstance(merchants, str):
+        try:
+            merchants = json.loads(merchants)
+        except Exception:
+            merchants = []
+    if not isinstance(merchants, list):
+        return []
+
+    ids = []
+    for m in merchants:
+        if isinstance(m, str):
+            merchant_id = normalize_merchant_id(m)
+            if merchant_id:
+                ids.append(str(merchant_id))
+            continue
+        if not isinstance(m, dict):
+            continue
+        merchant_id = normalize_merchant_id(m.get('merchant_id') or m.get('id'))
+        if merchant_id:
+            ids.append(str(merchant_id))
+    # preserve insertion order, drop duplicates
+    return list(dict.fromkeys(ids))
+
+
+def _order_cache_key(order: dict) -> str:
+    if not isinstance(order, dict):
+        return ''
+    order_id = _extract_order_identifier(order)
+    if order_id:
+        return str(order_id)
+
+    created_at = str(order.get('createdAt') or '').strip()
+    merchant_payload = order.get('merchant')
+    merchant_candidate = order.get('merchantId') or order.get('merchant_id')
+    if not merchant_candidate and isinstance(merchant_payload, dict):
+        merchant_candidate = (
+            (merchant_payload or {}).get('id')
+            or (merchant_payload or {}).get('merchantId')
             or (merchant_payload or {}).get('merchant_id')
         )
     merchant_id = normalize_merchant_id(merchant_candidate)
@@ -3698,6 +4815,7 @@ def _process_ifood_events_for_merchant(org_id, org_data: dict, api_client, merch
 
     result['events_new'] = len(accepted_events)
     if accepted_events:
+        record_org_activity(org_id, 'event')
         try:
             incoming_orders = _resolve_orders_from_event_batch(
                 api_client,
@@ -3743,14 +4861,15 @@ def _process_ifood_events_for_merchant(org_id, org_data: dict, api_client, merch
                             normalized_cache,
                             normalized_merchant_id
                         )
-                        restaurant_record['_orders_cache'] = normalized_cache
+                        _set_restaurant_orders(restaurant_record, normalized_cache, changed=False)
                         if _refresh_restaurant_metrics_from_cache(restaurant_record, normalized_merchant_id):
                             result['metrics_refreshed'] += 1
                             result['org_data_changed'] = True
                         _detect_and_broadcast_new_orders(
                             normalized_merchant_id,
                             restaurant_record.get('name', f"Restaurant {normalized_merchant_id[:8]}"),
-                            restaurant_record.get('_orders_cache') or []
+                            restaurant_record.get('_orders_cache') or [],
+                            org_id=org_id,
                         )
             except Exception:
                 result['errors'] += 1
@@ -3771,7 +4890,7 @@ def _process_ifood_events_for_merchant(org_id, org_data: dict, api_client, merch
                     'event_type': event_type,
                     'event': event,
                     'timestamp': _iso_utc_now(),
-                })
+                }, org_id=org_id, restaurant_id=normalized_merchant_id)
             except Exception:
                 pass
 
@@ -3979,6 +5098,15 @@ def _merge_orders_into_restaurant_cache(restaurant: dict, incoming_orders: list)
         if key:
             merged[key] = normalized_existing
 
+    time_cube = restaurant.get('_time_cube')
+    if not IFoodDataProcessor.is_time_cube_current(
+        time_cube, restaurant.get('_orders_cache') or [], restaurant.get('_orders_version')
+    ):
+        time_cube = None
+    elif len(merged) != len(restaurant.get('_orders_cache') or []):
+        # Duplicated/unkeyed cached orders collapse here; the cube cannot follow.
+        time_cube = None
+    changed_orders = []
     added = 0
     updated = 0
     for order in (incoming_orders or []):
@@ -3992,12 +5120,25 @@ def _merge_orders_into_restaurant_cache(restaurant: dict, incoming_orders: list)
                 merged_order = normalize_order_payload(merged_order)
                 if merged.get(key) != merged_order:
                     updated += 1
+                    changed_orders.append(merged_order)
                 merged[key] = merged_order
             else:
                 added += 1
                 merged[key] = normalized_order
+                changed_orders.append(normalized_order)
 
-    restaurant['_orders_cache'] = list(merged.values())
+    _set_restaurant_orders(restaurant, list(merged.values()))
+    if time_cube is not None and any(
+        not IFoodDataProcessor._extract_order_identifier(order) for order in changed_orders
+    ):
+        time_cube = None
+    if time_cube is not None:
+        # Move only the touched orders between cube buckets instead of rebuilding.
+        IFoodDataProcessor.update_time_cube(
+            time_cube, changed_orders, restaurant['_orders_cache'], restaurant['_orders_version']
+        )
+    else:
+        restaurant.pop('_time_cube', None)
     return {
         'added': max(0, int(added)),
         'updated': max(0, int(updated)),
@@ -4057,7 +5198,7 @@ def _refresh_restaurant_metrics_from_cache(restaurant: dict, merchant_id: str) -
         if str(key).startswith('_'):
             continue
         restaurant[key] = value
-    restaurant['_orders_cache'] = orders
+    _set_restaurant_orders(restaurant, orders, changed=False)
     if financial_sales:
         restaurant['_financial_sales_cache'] = financial_sales
     restaurant['_resolved_merchant_id'] = merchant_lookup_id
@@ -4084,22 +5225,14 @@ def _refresh_restaurant_closure(org_data: dict, api_client, merchant_id: str) ->
     return True
 
 
-def run_ifood_keepalive_poll_once():
-    """Poll iFood order events to keep test merchants marked as connected/open."""
-    global _KEEPALIVE_POLL_CYCLE
-    cycle_record = {
-        'type': 'ifood_keepalive_cycle',
-        'cycle_started_at': _iso_utc_now(),
-        'poll_interval_seconds': int(IFOOD_POLL_INTERVAL_SECONDS or 30),
-        'keepalive_enabled': bool(IFOOD_KEEPALIVE_POLLING),
-        'orgs': [],
-    }
-    summary = {
+def _new_keepalive_summary():
+    return {
         'orgs_checked': 0,
         'merchants_polled': 0,
         'events_received': 0,
         'events_deduplicated': 0,
         'events_acknowledged': 0,
+        'events_ack_queued': 0,
         'orders_persisted': 0,
         'orders_cached': 0,
         'orders_updated': 0,
@@ -4107,273 +5240,383 @@ def run_ifood_keepalive_poll_once():
         'errors': 0
     }
 
-    if not IFOOD_KEEPALIVE_POLLING:
-        cycle_record['skipped'] = True
-        cycle_record['skip_reason'] = 'keepalive_disabled'
-        cycle_record['summary'] = dict(summary)
-        cycle_record['cycle_finished_at'] = _iso_utc_now()
-        _append_ifood_evidence_entry(cycle_record)
-        return summary
 
-    lock_token = acquire_keepalive_lock()
-    if lock_token is None:
-        cycle_record['skipped'] = True
-        cycle_record['skip_reason'] = 'lock_busy'
-        cycle_record['summary'] = dict(summary)
-        cycle_record['cycle_finished_at'] = _iso_utc_now()
-        _append_ifood_evidence_entry(cycle_record)
-        return summary
+def _keepalive_org_merchants(org_id, org_data):
+    """Return ``(api, merchant_ids)`` for an org keepalive should poll, else None."""
+    if not isinstance(org_data, dict):
+        return None
+    api = org_data.get('api')
+    if not api:
+        return None
 
-    try:
-        org_items = _org_data_items_snapshot()
-        has_org_api = any(
-            isinstance(org_data, dict) and org_data.get('api')
-            for _, org_data in org_items
-        )
-        # Keepalive may start before org API clients are initialized (or after a cold
-        # worker boot with empty in-memory org state). Lazily discover/init active orgs
-        # so polling does not spin with orgs=[] despite valid DB config.
-        if not has_org_api:
-            try:
-                now_ts = time.time()
-                for org_row in db.get_all_active_orgs():
-                    candidate_org_id = org_row.get('id')
-                    if candidate_org_id is None:
-                        continue
-                    org_container = get_org_data(candidate_org_id)
-                    if not isinstance(org_container.get('config'), dict) or not org_container.get('config'):
-                        org_container['config'] = db.get_org_ifood_config(candidate_org_id) or {}
-                    if org_container.get('api'):
-                        has_org_api = True
-                        continue
-                    attempted_at = org_container.get('init_attempted_at')
-                    if attempted_at and (now_ts - attempted_at) < 300:
-                        continue
-                    org_container['init_attempted_at'] = now_ts
-                    if _init_org_ifood(candidate_org_id):
-                        has_org_api = True
-                org_items = _org_data_items_snapshot()
-            except Exception:
-                pass
-        # Legacy single-tenant fallback: keepalive must still run when no org API is initialized.
-        if IFOOD_API and not has_org_api:
-            org_items.append((
-                None,
-                {
-                    'api': IFOOD_API,
-                    'config': IFOOD_CONFIG or {},
-                    'restaurants': RESTAURANTS_DATA,
-                }
-            ))
+    config = org_data.get('config') or {}
+    merchant_ids = _extract_org_merchant_ids(config)
+    if not merchant_ids:
+        # Refresh config lazily in worker mode when in-memory config is stale.
+        if org_id is not None:
+            db_config = db.get_org_ifood_config(org_id) or {}
+            if isinstance(db_config, dict):
+                org_data['config'] = db_config
+                merchant_ids = _extract_org_merchant_ids(db_config)
+
+    if not merchant_ids:
+        return None
+    return api, merchant_ids
 
-        for org_id, org_data in org_items:
-            if not isinstance(org_data, dict):
-                continue
-            api = org_data.get('api')
-            if not api:
-                continue
 
-            config = org_data.get('config') or {}
-            merchant_ids = _extract_org_merchant_ids(config)
-            if not merchant_ids:
-                # Refresh config lazily in worker mode when in-memory config is stale.
-                if org_id is not None:
-                    db_config = db.get_org_ifood_config(org_id) or {}
-                    if isinstance(db_config, dict):
-                        org_data['config'] = db_config
-                        merchant_ids = _extract_org_merchant_ids(db_config)
-
-            if not merchant_ids:
-                continue
+def _poll_keepalive_chunk(api, merchant_ids):
+    """Poll events for one chunk of an org's merchants.
 
-            summary['orgs_checked'] += 1
-            summary['merchants_polled'] += len(merchant_ids)
-            merchant_ids_text = [str(mid).strip() for mid in merchant_ids if str(mid).strip()]
-            merchant_set = set(merchant_ids_text)
-            events = []
-            org_data_changed = False
-            org_record = {
-                'org_id': org_id,
-                'merchant_ids': merchant_ids_text,
-                'poll': {},
-                'ack': {},
-                'errors': 0,
+    Returns ``(events, poll_trace, failed)``.
+    """
+    events = []
+    failed = False
+    poll_requested_at = _iso_utc_now()
+    poll_trace = None
+
+    try:
+        if hasattr(api, 'poll_events'):
+            events = api.poll_events(merchant_ids) or []
+            candidate_trace = getattr(api, '_last_poll_trace', None)
+            if isinstance(candidate_trace, dict):
+                poll_trace = dict(candidate_trace)
+        elif hasattr(api, '_request'):
+            headers = {'x-polling-merchants': ','.join(merchant_ids)}
+            payload = None
+            manual_trace = {
+                'requested_at': poll_requested_at,
+                'merchant_scope': headers.get('x-polling-merchants'),
+                'request_headers': {'x-polling-merchants': headers.get('x-polling-merchants')},
+                'attempts': [],
+                'success': False,
             }
-            cycle_record['orgs'].append(org_record)
-            poll_requested_at = _iso_utc_now()
-            poll_trace = None
+            for endpoint in ('/events/v1.0/events:polling', '/order/v1.0/events:polling'):
+                attempt_started_at = _iso_utc_now()
+                payload_candidate = api._request('GET', endpoint, headers=headers)
+                if payload_candidate is not None:
+                    manual_trace['attempts'].append({
+                        'endpoint': endpoint,
+                        'method': 'GET',
+                        'requested_at': attempt_started_at,
+                        'responded_at': _iso_utc_now(),
+                        'status': 200,
+                        'success': True,
+                    })
+                    manual_trace['success'] = True
+                    manual_trace['endpoint'] = endpoint
+                    payload = payload_candidate
+                    break
+                last_error = getattr(api, '_last_http_error', None)
+                if not isinstance(last_error, dict):
+                    last_error = {}
+                manual_trace['attempts'].append({
+                    'endpoint': endpoint,
+                    'method': 'GET',
+                    'requested_at': attempt_started_at,
+                    'responded_at': _iso_utc_now(),
+                    'status': int(last_error.get('status') or 0),
+                    'success': False,
+                    'detail': _truncate_text(last_error.get('detail') or '', 180),
+                })
+            manual_trace['completed_at'] = _iso_utc_now()
+            poll_trace = manual_trace
+            if isinstance(payload, list):
+                events = [e for e in payload if isinstance(e, dict)]
+            elif isinstance(payload, dict):
+                for key in ('events', 'data', 'items'):
+                    nested = payload.get(key)
+                    if isinstance(nested, list):
+                        events = [e for e in nested if isinstance(e, dict)]
+                        break
+                if not events:
+                    events = [payload]
+    except Exception as poll_err:
+        failed = True
+        events = []
+        if not isinstance(poll_trace, dict):
+            poll_trace = {}
+        poll_trace['success'] = False
+        poll_trace['error'] = _truncate_text(poll_err, 240)
+
+    if not isinstance(poll_trace, dict):
+        poll_trace = {}
+    poll_trace.setdefault('requested_at', poll_requested_at)
+    poll_trace.setdefault('completed_at', _iso_utc_now())
+    poll_trace['events_received'] = len(events)
+    return events, poll_trace, failed
+
+
+def _merge_keepalive_poll_traces(traces):
+    """Single-chunk traces are kept as-is; chunked polls report every chunk."""
+    if len(traces) == 1:
+        return traces[0]
+    return {
+        'requested_at': min(trace.get('requested_at') or '' for trace in traces),
+        'completed_at': max(trace.get('completed_at') or '' for trace in traces),
+        'success': all(trace.get('success') for trace in traces),
+        'events_received': sum(int(trace.get('events_received') or 0) for trace in traces),
+        'chunks': traces,
+    }
 
-            try:
-                if hasattr(api, 'poll_events'):
-                    events = api.poll_events(merchant_ids) or []
-                    candidate_trace = getattr(api, '_last_poll_trace', None)
-                    if isinstance(candidate_trace, dict):
-                        poll_trace = dict(candidate_trace)
-                elif hasattr(api, '_request'):
-                    headers = {'x-polling-merchants': ','.join(merchant_ids)}
-                    payload = None
-                    manual_trace = {
-                        'requested_at': poll_requested_at,
-                        'merchant_scope': headers.get('x-polling-merchants'),
-                        'request_headers': {'x-polling-merchants': headers.get('x-polling-merchants')},
-                        'attempts': [],
-                        'success': False,
-                    }
-                    for endpoint in ('/events/v1.0/events:polling', '/order/v1.0/events:polling'):
-                        attempt_started_at = _iso_utc_now()
-                        payload_candidate = api._request('GET', endpoint, headers=headers)
-                        if payload_candidate is not None:
-                            manual_trace['attempts'].append({
-                                'endpoint': endpoint,
-                                'method': 'GET',
-                                'requested_at': attempt_started_at,
-                                'responded_at': _iso_utc_now(),
-                                'status': 200,
-                                'success': True,
-                            })
-                            manual_trace['success'] = True
-                            manual_trace['endpoint'] = endpoint
-                            payload = payload_candidate
-                            break
-                        last_error = getattr(api, '_last_http_error', None)
-                        if not isinstance(last_error, dict):
-                            last_error = {}
-                        manual_trace['attempts'].append({
-                            'endpoint': endpoint,
-                            'method': 'GET',
-                            'requested_at': attempt_started_at,
-                            'responded_at': _iso_utc_now(),
-                            'status': int(last_error.get('status') or 0),
-                            'success': False,
-                            'detail': _truncate_text(last_error.get('detail') or '', 180),
-                        })
-                    manual_trace['completed_at'] = _iso_utc_now()
-                    poll_trace = manual_trace
-                    if isinstance(payload, list):
-                        events = [e for e in payload if isinstance(e, dict)]
-                    elif isinstance(payload, dict):
-                        for key in ('events', 'data', 'items'):
-                            nested = payload.get(key)
-                            if isinstance(nested, list):
-                                events = [e for e in nested if isinstance(e, dict)]
-                                break
-                        if not events:
-                            events = [payload]
-                summary['events_received'] += len(events)
-            except Exception as poll_err:
-                summary['errors'] += 1
-                org_record['errors'] += 1
-                events = []
-                if not isinstance(poll_trace, dict):
-                    poll_trace = {}
-                poll_trace['success'] = False
-                poll_trace['error'] = _truncate_text(poll_err, 240)
-
-            if not isinstance(poll_trace, dict):
-                poll_trace = {}
-            poll_trace.setdefault('requested_at', poll_requested_at)
-            poll_trace.setdefault('completed_at', _iso_utc_now())
-            poll_trace['events_received'] = len(events)
-            org_record['poll'] = poll_trace
-
-            events_by_merchant, _ = _group_events_by_merchant(
-                events,
-                allowed_merchant_ids=list(merchant_set)
-            )
 
-            for merchant_id in merchant_ids:
-                try:
-                    merchant_events = events_by_merchant.get(str(merchant_id), [])
-                    ingest_result = _process_ifood_events_for_merchant(
-                        org_id=org_id,
-                        org_data=org_data,
-                        api_client=api,
-                        merchant_id=str(merchant_id),
-                        merchant_events=merchant_events,
-                        source='polling'
-                    )
-                    summary['events_deduplicated'] += int(ingest_result.get('events_deduplicated') or 0)
-                    summary['orders_persisted'] += int(ingest_result.get('orders_persisted') or 0)
-                    summary['orders_cached'] += int(ingest_result.get('orders_cached') or 0)
-                    summary['orders_updated'] += int(ingest_result.get('orders_updated') or 0)
-                    summary['metrics_refreshed'] += int(ingest_result.get('metrics_refreshed') or 0)
-                    summary['errors'] += int(ingest_result.get('errors') or 0)
-                    if ingest_result.get('org_data_changed'):
-                        org_data_changed = True
-                except Exception:
-                    summary['errors'] += 1
-                    org_record['errors'] += 1
+def _keepalive_ingest_org(org_id, org_data, api, merchant_ids, polls):
+    """Ingest and acknowledge the events polled for one org.
 
-            if org_data_changed and org_id is not None:
-                try:
-                    _persist_org_restaurants_cache(org_id, org_data)
-                except Exception:
-                    summary['errors'] += 1
-                    org_record['errors'] += 1
+    ``polls`` holds ``(events, poll_trace, failed)`` for each of the org's
+    chunks. Returns ``(org_record, summary)``.
+    """
+    summary = _new_keepalive_summary()
+    summary['orgs_checked'] += 1
+    summary['merchants_polled'] += len(merchant_ids)
+    merchant_ids_text = [str(mid).strip() for mid in merchant_ids if str(mid).strip()]
+    merchant_set = set(merchant_ids_text)
+    org_data_changed = False
+    org_record = {
+        'org_id': org_id,
+        'merchant_ids': merchant_ids_text,
+        'poll': {},
+        'ack': {},
+        'errors': 0,
+    }
+    events = []
+    for chunk_events, _, failed in polls:
+        events.extend(chunk_events)
+        if failed:
+            summary['errors'] += 1
+            org_record['errors'] += 1
+    summary['events_received'] += len(events)
+    org_record['poll'] = _merge_keepalive_poll_traces([trace for _, trace, _ in polls])
+
+    events_by_merchant, _ = _group_events_by_merchant(
+        events,
+        allowed_merchant_ids=list(merchant_set)
+    )
 
+    for merchant_id in merchant_ids:
+        try:
+            merchant_events = events_by_merchant.get(str(merchant_id), [])
+            ingest_result = _process_ifood_events_for_merchant(
+                org_id=org_id,
+                org_data=org_data,
+                api_client=api,
+                merchant_id=str(merchant_id),
+                merchant_events=merchant_events,
+                source='polling'
+            )
+            summary['events_deduplicated'] += int(ingest_result.get('events_deduplicated') or 0)
+            summary['orders_persisted'] += int(ingest_result.get('orders_persisted') or 0)
+            summary['orders_cached'] += int(ingest_result.get('orders_cached') or 0)
+            summary['orders_updated'] += int(ingest_result.get('orders_updated') or 0)
+            summary['metrics_refreshed'] += int(ingest_result.get('metrics_refreshed') or 0)
+            summary['errors'] += int(ingest_result.get('errors') or 0)
+            if ingest_result.get('org_data_changed'):
+                org_data_changed = True
+        except Exception:
+            summary['errors'] += 1
+            org_record['errors'] += 1
+
+    if org_data_changed and org_id is not None:
+        try:
+            _persist_org_restaurants_cache(org_id, org_data)
+        except Exception:
+            summary['errors'] += 1
+            org_record['errors'] += 1
+
+    ack_trace = {
+        'requested_at': None,
+        'completed_at': _iso_utc_now(),
+        'success': False,
+        'skipped': True,
+        'reason': 'no_events',
+        'events_input_count': len(events),
+    }
+    if events and IFOOD_ACK_BUFFER_ENABLED and hasattr(api, 'acknowledge_events'):
+        # Acked off the polling path; batches are logged as ifood_ack_batch entries.
+        queued = ifood_ack_buffer.add(api, events)
+        summary['events_ack_queued'] += queued
+        ack_trace = {
+            'requested_at': _iso_utc_now(),
+            'completed_at': None,
+            'success': True,
+            'skipped': False,
+            'mode': 'buffered',
+            'queued': queued,
+            'events_input_count': len(events),
+        }
+    elif events and hasattr(api, 'acknowledge_events'):
+        ack_requested_at = _iso_utc_now()
+        try:
+            ack_result = api.acknowledge_events(events)
+            ack_success = isinstance(ack_result, dict) and ack_result.get('success')
+            if isinstance(ack_result, dict) and ack_result.get('success'):
+                summary['events_acknowledged'] += int(ack_result.get('acknowledged') or 0)
+            else:
+                summary['errors'] += 1
+                org_record['errors'] += 1
+
+            candidate_ack_trace = None
+            if isinstance(ack_result, dict):
+                candidate_ack_trace = ack_result.get('trace')
+            if not isinstance(candidate_ack_trace, dict):
+                fallback_ack_trace = getattr(api, '_last_ack_trace', None)
+                candidate_ack_trace = fallback_ack_trace if isinstance(fallback_ack_trace, dict) else None
+            if isinstance(candidate_ack_trace, dict):
+                ack_trace = dict(candidate_ack_trace)
+            else:
+                ack_trace = {}
+            ack_trace['requested_at'] = ack_trace.get('requested_at') or ack_requested_at
+            ack_trace['completed_at'] = ack_trace.get('completed_at') or _iso_utc_now()
+            ack_trace['success'] = bool(ack_success)
+            ack_trace['skipped'] = False
+            ack_trace['events_input_count'] = len(events)
+            if isinstance(ack_result, dict):
+                ack_trace['requested'] = int(ack_result.get('requested') or ack_trace.get('requested') or 0)
+                ack_trace['acknowledged'] = int(ack_result.get('acknowledged') or ack_trace.get('acknowledged') or 0)
+                endpoint = ack_result.get('endpoint')
+                if endpoint:
+                    ack_trace['endpoint'] = endpoint
+        except Exception as ack_err:
+            summary['errors'] += 1
+            org_record['errors'] += 1
             ack_trace = {
-                'requested_at': None,
+                'requested_at': ack_requested_at,
                 'completed_at': _iso_utc_now(),
                 'success': False,
-                'skipped': True,
-                'reason': 'no_events',
+                'skipped': False,
                 'events_input_count': len(events),
+                'error': _truncate_text(ack_err, 240),
             }
-            if events and hasattr(api, 'acknowledge_events'):
-                ack_requested_at = _iso_utc_now()
-                try:
-                    ack_result = api.acknowledge_events(events)
-                    ack_success = isinstance(ack_result, dict) and ack_result.get('success')
-                    if isinstance(ack_result, dict) and ack_result.get('success'):
-                        summary['events_acknowledged'] += int(ack_result.get('acknowledged') or 0)
-                    else:
-                        summary['errors'] += 1
-                        org_record['errors'] += 1
-
-                    candidate_ack_trace = None
-                    if isinstance(ack_result, dict):
-                        candidate_ack_trace = ack_result.get('trace')
-                    if not isinstance(candidate_ack_trace, dict):
-                        fallback_ack_trace = getattr(api, '_last_ack_trace', None)
-                        candidate_ack_trace = fallback_ack_trace if isinstance(fallback_ack_trace, dict) else None
-                    if isinstance(candidate_ack_trace, dict):
-                        ack_trace = dict(candidate_ack_trace)
-                    else:
-                        ack_trace = {}
-                    ack_trace['requested_at'] = ack_trace.get('requested_at') or ack_requested_at
-                    ack_trace['completed_at'] = ack_trace.get('completed_at') or _iso_utc_now()
-                    ack_trace['success'] = bool(ack_success)
-                    ack_trace['skipped'] = False
-                    ack_trace['events_input_count'] = len(events)
-                    if isinstance(ack_result, dict):
-                        ack_trace['requested'] = int(ack_result.get('requested') or ack_trace.get('requested') or 0)
-                        ack_trace['acknowledged'] = int(ack_result.get('acknowledged') or ack_trace.get('acknowledged') or 0)
-                        endpoint = ack_result.get('endpoint')
-                        if endpoint:
-                            ack_trace['endpoint'] = endpoint
-                except Exception as ack_err:
-                    summary['errors'] += 1
-                    org_record['errors'] += 1
-                    ack_trace = {
-                        'requested_at': ack_requested_at,
-                        'completed_at': _iso_utc_now(),
-                        'success': False,
-                        'skipped': False,
-                        'events_input_count': len(events),
-                        'error': _truncate_text(ack_err, 240),
-                    }
-            elif events:
-                ack_trace = {
-                    'requested_at': None,
-                    'completed_at': _iso_utc_now(),
-                    'success': False,
-                    'skipped': True,
-                    'reason': 'ack_not_supported',
-                    'events_input_count': len(events),
-                }
-            org_record['ack'] = ack_trace
-    finally:
-        release_keepalive_lock(lock_token)
+    elif events:
+        ack_trace = {
+            'requested_at': None,
+            'completed_at': _iso_utc_now(),
+            'success': False,
+            'skipped': True,
+            'reason': 'ack_not_supported',
+            'events_input_count': len(events),
+        }
+    org_record['ack'] = ack_trace
+    return org_record, summary
+
+
+def run_ifood_keepalive_poll_once():
+    """Poll iFood order events to keep test merchants marked as connected/open."""
+    global _KEEPALIVE_POLL_CYCLE, _KEEPALIVE_SHARD_WORKERS
+    cycle_record = {
+        'type': 'ifood_keepalive_cycle',
+        'cycle_started_at': _iso_utc_now(),
+        'poll_interval_seconds': int(IFOOD_POLL_INTERVAL_SECONDS or 30),
+        'keepalive_enabled': bool(IFOOD_KEEPALIVE_POLLING),
+        'orgs': [],
+    }
+    summary = _new_keepalive_summary()
+
+    if not IFOOD_KEEPALIVE_POLLING:
+        cycle_record['skipped'] = True
+        cycle_record['skip_reason'] = 'keepalive_disabled'
+        cycle_record['summary'] = dict(summary)
+        cycle_record['cycle_finished_at'] = _iso_utc_now()
+        _append_ifood_evidence_entry(cycle_record)
+        return summary
+
+    # Each worker polls the orgs its shard owns; see keepalive_shard_workers.
+    shard_workers = tuple(keepalive_shard_workers())
+    shard_changed = shard_workers != _KEEPALIVE_SHARD_WORKERS
+    _KEEPALIVE_SHARD_WORKERS = shard_workers
+    cycle_record['shard'] = {'worker_id': REDIS_INSTANCE_ID, 'workers': len(shard_workers)}
+
+    def _owns(org_id):
+        return keepalive_shard_service.shard_owner(_keepalive_shard_key(org_id), shard_workers) == REDIS_INSTANCE_ID
+
+    org_items = _org_data_items_snapshot()
+    has_org_api = any(
+        isinstance(org_data, dict) and org_data.get('api')
+        for _, org_data in org_items
+    )
+    has_shard_api = any(
+        isinstance(org_data, dict) and org_data.get('api') and _owns(org_id)
+        for org_id, org_data in org_items
+    )
+    # Keepalive may start before org API clients are initialized (or after a cold
+    # worker boot with empty in-memory org state, or after a rebalance handed this
+    # worker new orgs). Lazily discover/init the shard's active orgs so polling
+    # does not spin with orgs=[] despite valid DB config.
+    if not has_shard_api or shard_changed:
+        try:
+            now_ts = time.time()
+            for org_row in db.get_all_active_orgs():
+                candidate_org_id = org_row.get('id')
+                if candidate_org_id is None or not _owns(candidate_org_id):
+                    continue
+                org_container = get_org_data(candidate_org_id)
+                if not isinstance(org_container.get('config'), dict) or not org_container.get('config'):
+                    org_container['config'] = db.get_org_ifood_config(candidate_org_id) or {}
+                if org_container.get('api'):
+                    has_org_api = True
+                    continue
+                attempted_at = org_container.get('init_attempted_at')
+                if attempted_at and (now_ts - attempted_at) < 300:
+                    continue
+                org_container['init_attempted_at'] = now_ts
+                if _init_org_ifood(candidate_org_id):
+                    has_org_api = True
+            org_items = _org_data_items_snapshot()
+        except Exception:
+            pass
+    # Legacy single-tenant fallback: keepalive must still run when no org API is initialized.
+    if IFOOD_API and not has_org_api:
+        org_items.append((
+            None,
+            {
+                'api': IFOOD_API,
+                'config': IFOOD_CONFIG or {},
+                'restaurants': RESTAURANTS_DATA,
+            }
+        ))
+
+    shard_items = [
+        (org_id, org_data) for org_id, org_data in org_items
+        if _owns(org_id) and acquire_keepalive_org_lease(org_id)
+    ]
+    cycle_record['shard']['orgs_leased'] = len(shard_items)
+    targets = []
+    for org_id, org_data in shard_items:
+        target = _keepalive_org_merchants(org_id, org_data)
+        if target is not None:
+            targets.append((org_id, org_data) + target)
+    # Every chunk of every org is polled concurrently (bounded by the in-flight
+    # limit), so a large org costs one round trip rather than one per chunk.
+    plan = [
+        (index, chunk)
+        for index, (_, _, _, merchant_ids) in enumerate(targets)
+        for chunk in polling_planner_service.chunk_merchant_ids(
+            merchant_ids,
+            max_merchants=IFOOD_POLL_MAX_MERCHANTS_PER_REQUEST,
+            max_header_chars=IFOOD_POLL_MAX_HEADER_CHARS,
+        )
+    ]
+    cycle_record['shard']['poll_requests'] = len(plan)
+    if plan:
+        with ThreadPoolExecutor(
+            max_workers=min(IFOOD_POLL_MAX_IN_FLIGHT, len(plan)),
+            thread_name_prefix='ifood-poll',
+        ) as pool:
+            chunk_results = list(pool.map(lambda item: _poll_keepalive_chunk(targets[item[0]][2], item[1]), plan))
+        polls_by_target = {}
+        for (index, _), chunk_result in zip(plan, chunk_results):
+            polls_by_target.setdefault(index, []).append(chunk_result)
+        with ThreadPoolExecutor(
+            max_workers=min(IFOOD_KEEPALIVE_MAX_PARALLEL_ORGS, len(polls_by_target)),
+            thread_name_prefix='ifood-keepalive',
+        ) as pool:
+            results = list(pool.map(
+                lambda index: _keepalive_ingest_org(*targets[index], polls_by_target[index]),
+                sorted(polls_by_target),
+            ))
+        for org_record, org_summary in results:
+            cycle_record['orgs'].append(org_record)
+            for key, value in org_summary.items():
+                summary[key] += value
 
     _update_ifood_ingestion_metrics(
         polling_cycles=1,
@@ -4454,8 +5697,303 @@ def start_keepalive_poller():
         print(f"iFood keepalive poller started (every {IFOOD_POLL_INTERVAL_SECONDS}s)")
 
 
+class WorkerLane:
+    """One independent loop of the refresh worker.
+
+    Periodic lanes (``interval`` set) run ``task`` on fixed deadlines: a slow
+    run does not shift later deadlines, and deadlines missed while it ran are
+    skipped instead of replayed back to back. Queue lanes (``interval`` None)
+    call ``task`` continuously; the task blocks on its own queue and returns
+    how long the claimed item waited, or None when it found nothing.
+    """
+
+    def __init__(self, name, task, *, interval=None, start_delay=0.0,
+                 concurrency=1, lag_alarm_seconds=None, priority=0):
+        self.name = name
+        self.task = task
+        self.interval = float(interval) if interval else None
+        self.concurrency = max(1, int(concurrency or 1))
+        self.lag_alarm_seconds = float(lag_alarm_seconds) if lag_alarm_seconds else None
+        self.priority = int(priority or 0)
+        self.next_deadline = (time.time() + float(start_delay or 0)) if self.interval else None
+        self._lock = threading.Lock()
+        self._running = 0
+        self._stats = {
+            'runs': 0,
+            'errors': 0,
+            'skipped_deadlines': 0,
+            'lag_alarms': 0,
+            'last_started_at': None,
+            'last_duration_ms': None,
+            'max_duration_ms': 0,
+            'last_lag_ms': 0,
+            'max_lag_ms': 0,
+            'last_error': None,
+        }
+
+    def seconds_until_due(self, now=None):
+        if self.next_deadline is None:
+            return None
+        return self.next_deadline - (time.time() if now is None else now)
+
+    def claim_deadline(self, now=None):
+        """Reserve the current deadline; returns its lag in seconds or None if not due."""
+        now = time.time() if now is None else now
+        with self._lock:
+            if self.next_deadline is None or now < self.next_deadline:
+                return None
+            lag = now - self.next_deadline
+            missed = int(lag // self.interval)
+            self.next_deadline += (missed + 1) * self.interval
+            self._stats['skipped_deadlines'] += missed
+            return lag
+
+    def run_once(self, lag=None):
+        """Run ``task`` once and record timing; returns False when a queue lane was idle."""
+        started = time.time()
+        with self._lock:
+            self._running += 1
+        error = None
+        result = None
+        try:
+            result = self.task()
+        except Exception as e:
+            error = e
+        finally:
+            duration_ms = int((time.time() - started) * 1000)
+            with self._lock:
+                self._running -= 1
+        if self.interval is None:
+            if result is None and error is None:
+                return False
+            lag = result if isinstance(result, (int, float)) else None
+        lag_ms = int(max(0.0, float(lag or 0)) * 1000)
+        alarm = None
+        if self.lag_alarm_seconds and lag_ms > self.lag_alarm_seconds * 1000:
+            alarm = f"started {lag_ms / 1000:.1f}s late"
+        elif self.interval and duration_ms > self.interval * 1000:
+            alarm = f"run took {duration_ms / 1000:.1f}s (interval {self.interval:.0f}s)"
+        with self._lock:
+            stats = self._stats
+            stats['runs'] += 1
+            stats['last_started_at'] = datetime.fromtimestamp(started).isoformat()
+            stats['last_duration_ms'] = duration_ms
+            stats['max_duration_ms'] = max(stats['max_duration_ms'], duration_ms)
+            stats['last_lag_ms'] = lag_ms
+            stats['max_lag_ms'] = max(stats['max_lag_ms'], lag_ms)
+            if error is not None:
+                stats['errors'] += 1
+                stats['last_error'] = str(error)[:200]
+            if alarm:
+                stats['lag_alarms'] += 1
+        if error is not None:
+            print(f"Worker lane {self.name} error: {error}")
+        if alarm:
+            print(f"Worker lane {self.name} lag alarm: {alarm}")
+        return True
+
+    def metrics(self):
+        with self._lock:
+            payload = dict(self._stats)
+            payload['running'] = self._running
+        payload['concurrency'] = self.concurrency
+        payload['interval_seconds'] = self.interval
+        due_in = self.seconds_until_due()
+        payload['due_in_seconds'] = round(due_in, 1) if due_in is not None else None
+        return payload
+
+
+class WorkerLaneScheduler:
+    """Run worker lanes on their own threads with deadline-aware admission.
+
+    Lanes never share a thread, so a long refresh cannot block a keepalive
+    poll. In addition, a lane does not start new work while a higher
+    priority lane is due within ``guard_seconds`` (keepalive gets the upstream
+    API first), for at most ``max_defer_seconds`` at a time.
+    """
+
+    def __init__(self, lanes, *, guard_seconds=5.0, max_defer_seconds=60.0,
+                 publish=None, publish_interval=30.0):
+        self.lanes = list(lanes)
+        self.guard_seconds = float(guard_seconds)
+        self.max_defer_seconds = float(max_defer_seconds)
+        self.publish = publish
+        self.publish_interval = float(publish_interval)
+        self._stop = threading.Event()
+        self._threads = []
+
+    def should_defer(self, lane, now=None):
+        now = time.time() if now is None else now
+        for other in self.lanes:
+            if other is lane or other.priority <= lane.priority:
+                continue
+            due_in = other.seconds_until_due(now)
+            if due_in is not None and due_in <= self.guard_seconds:
+                return True
+        return False
+
+    def _lane_loop(self, lane):
+        deferred_since = None
+        while not self._stop.is_set():
+            try:
+                now = time.time()
+                if self.should_defer(lane, now):
+                    if deferred_since is None:
+                        deferred_since = now
+                    if now - deferred_since < self.max_defer_seconds:
+                        self._stop.wait(0.2)
+                        continue
+                deferred_since = None
+                if lane.interval is None:
+                    lane.run_once()
+                    continue
+                lag = lane.claim_deadline(now)
+                if lag is None:
+                    self._stop.wait(max(0.05, min(1.0, lane.seconds_until_due(now))))
+                    continue
+                lane.run_once(lag)
+            except Exception as e:
+                print(f"Worker lane {lane.name} loop error: {e}")
+                self._stop.wait(2)
+
+    def metrics(self):
+        return {lane.name: lane.metrics() for lane in self.lanes}
+
+    def start(self):
+        for lane in self.lanes:
+            for index in range(lane.concurrency):
+                thread = threading.Thread(
+                    target=self._lane_loop,
+                    args=(lane,),
+                    name=f"worker-{lane.name}-{index}",
+                    daemon=True,
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+
+    def run_until(self, should_stop):
+        """Start the lanes and publish metrics until ``should_stop()`` is true."""
+        self.start()
+        next_publish = 0.0
+        while not should_stop():
+            if self.publish and time.time() >= next_publish:
+                try:
+                    self.publish(self.metrics())
+                except Exception:
+                    pass
+                next_publish = time.time() + self.publish_interval
+            self._stop.wait(1.0)
+        self.stop()
+        for thread in self._threads:
+            thread.join(timeout=5)
+
+
+def _publish_worker_lane_metrics(lanes_metrics):
+    r = get_redis_client()
+    if not r:
+        return
+    payload = {
+        'instance_id': REDIS_INSTANCE_ID,
+        'updated_at': datetime.now().isoformat(),
+        'lanes': lanes_metrics,
+    }
+    r.set(REDIS_WORKER_LANES_KEY, json.dumps(payload, ensure_ascii=False, default=str), ex=300)
+
+
+def get_worker_lane_metrics():
+    """Latest lane metrics published by the refresh worker (empty when none)."""
+    r = get_redis_client()
+    if not r:
+        return {}
+    try:
+        raw = r.get(REDIS_WORKER_LANES_KEY)
+        return json.loads(raw) if raw else {}
+    except Exception:
+        return {}
+
+
+def _run_refresh_job_step(claim_timeout=5):
+    """Claim and run one refresh job; returns its queue wait in seconds or None."""
+    payload = claim_refresh_job(timeout_seconds=claim_timeout)
+    if payload is None:
+        # Jobs pushed on the legacy list by instances not yet upgraded.
+        r = get_redis_client()
+        raw = r.rpop(REDIS_REFRESH_QUEUE) if r else None
+        if not raw:
+            return None
+        try:
+            payload = json.loads(raw)
+        except Exception:
+            payload = {}
+        payload['org_ids'] = None
+    org_ids = payload.get('org_ids')
+    pending_since = payload.get('pending_since')
+    waited = max(0.0, time.time() - float(pending_since)) if pending_since else 0.0
+    refreshed = bg_refresher.refresh_now(org_ids=org_ids, job_id=payload.get('job_id'))
+    done_payload = {
+        'status': 'done' if refreshed else 'busy',
+        'timestamp': datetime.now().isoformat(),
+        'job_id': payload.get('job_id'),
+        'trigger': payload.get('trigger', 'queue')
+    }
+    for org_id in (org_ids or [None]):
+        set_refresh_status(done_payload, org_id=org_id)
+    if not refreshed and org_ids:
+        # Another refresh held the lock; keep the org pending.
+        for org_id in org_ids:
+            enqueue_refresh_job(trigger=payload.get('trigger', 'queue'), org_id=org_id)
+        time.sleep(2)
+    return waited
+
+
+def _run_scheduler_tick():
+    # Due orgs join the same coalescing queue as user requests.
+    for org_id in plan_due_refreshes(time.time()):
+        enqueue_refresh_job(trigger='scheduled', org_id=org_id)
+
+
+def _run_periodic_step():
+    if REFRESH_SCHEDULER_ENABLED:
+        _run_refresh_maintenance()
+    else:
+        # The refresh lane runs the sweep; a pending full refresh absorbs this one.
+        enqueue_refresh_job(trigger='periodic')
+
+
+def build_refresh_worker_lanes(interval_seconds=1800):
+    """Lanes run by the refresh worker: keepalive, refresh jobs, scheduling."""
+    lanes = []
+    if IFOOD_KEEPALIVE_POLLING:
+        lanes.append(WorkerLane(
+            'keepalive',
+            run_ifood_keepalive_poll_once,
+            interval=max(10, int(IFOOD_POLL_INTERVAL_SECONDS or 30)),
+            lag_alarm_seconds=WORKER_KEEPALIVE_LAG_ALARM_SECONDS,
+            priority=1,
+        ))
+    # One thread: refresh_now serializes on the refresh lock (and the Redis
+    # refresh lock), so more claimers would only requeue busy jobs.
+    lanes.append(WorkerLane(
+        'refresh',
+        _run_refresh_job_step,
+        lag_alarm_seconds=WORKER_REFRESH_LAG_ALARM_SECONDS,
+    ))
+    if REFRESH_SCHEDULER_ENABLED:
+        lanes.append(WorkerLane('scheduler', _run_scheduler_tick, interval=REFRESH_SCHEDULER_TICK_SECONDS))
+    lanes.append(WorkerLane('periodic', _run_periodic_step, interval=interval_seconds, start_delay=interval_seconds))
+    return lanes
+
+
 def run_refresh_worker_loop(interval_seconds=1800):
-    """Redis-backed worker loop for reliable background refresh."""
+    """Redis-backed worker loop for reliable background refresh.
+
+    Keepalive polling, refresh jobs and scheduling run as independent lanes
+    (see ``WorkerLaneScheduler``) so a long org refresh never delays the
+    keepalive poll iFood expects every 30 seconds.
+    """
     print(f"Refresh worker started (interval={interval_seconds}s)")
     r = get_redis_client()
     if not r:
@@ -4463,10 +6001,8 @@ def run_refresh_worker_loop(interval_seconds=1800):
         return
 
     stop_flag = {'stop': False}
-    keepalive_enabled = bool(IFOOD_KEEPALIVE_POLLING)
-    keepalive_interval = max(10, int(IFOOD_POLL_INTERVAL_SECONDS or 30))
-    if keepalive_enabled:
-        print(f"iFood keepalive polling enabled (every {keepalive_interval}s)")
+    if IFOOD_KEEPALIVE_POLLING:
+        print(f"iFood keepalive polling enabled (every {max(10, int(IFOOD_POLL_INTERVAL_SECONDS or 30))}s)")
 
     def _handle_stop(signum, frame):
         stop_flag['stop'] = True
@@ -4480,64 +6016,41 @@ def run_refresh_worker_loop(interval_seconds=1800):
     except Exception:
         pass
 
-    next_periodic = time.time() + interval_seconds
-    next_keepalive = time.time() + keepalive_interval
-    if keepalive_enabled:
-        run_ifood_keepalive_poll_once()
-    while not stop_flag['stop']:
-        try:
-            deadlines = [next_periodic]
-            if keepalive_enabled:
-                deadlines.append(next_keepalive)
-            timeout = max(1, int(min(deadlines) - time.time()))
-            item = r.brpop(REDIS_REFRESH_QUEUE, timeout=timeout)
-            now = time.time()
-            if item:
-                _, raw = item
-                try:
-                    payload = json.loads(raw)
-                except Exception:
-                    payload = {}
-                refreshed = bg_refresher.refresh_now()
-                if refreshed:
-                    set_refresh_status({
-                        'status': 'done',
-                        'timestamp': datetime.now().isoformat(),
-                        'job_id': payload.get('job_id'),
-                        'trigger': payload.get('trigger', 'queue')
-                    })
-                else:
-                    set_refresh_status({
-                        'status': 'busy',
-                        'timestamp': datetime.now().isoformat(),
-                        'job_id': payload.get('job_id'),
-                        'trigger': payload.get('trigger', 'queue')
-                    })
-                # Reset periodic timer after active queue processing.
-                next_periodic = now + interval_seconds
-                now = time.time()
-
-            if keepalive_enabled and now >= next_keepalive:
-                run_ifood_keepalive_poll_once()
-                next_keepalive = now + keepalive_interval
+    if REFRESH_SCHEDULER_ENABLED:
+        print(
+            f"Refresh scheduler enabled (tick={REFRESH_SCHEDULER_TICK_SECONDS}s, "
+            f"budget={REFRESH_CYCLE_API_BUDGET} calls/cycle)"
+        )
+    lanes = build_refresh_worker_lanes(interval_seconds)
+    print("Worker lanes: " + ", ".join(f"{lane.name}x{lane.concurrency}" for lane in lanes))
+    scheduler = WorkerLaneScheduler(lanes, publish=_publish_worker_lane_metrics)
+    scheduler.run_until(lambda: stop_flag['stop'])
 
-            if now >= next_periodic:
-                refreshed = bg_refresher.refresh_now()
-                set_refresh_status({
-                    'status': 'done' if refreshed else 'busy',
-                    'timestamp': datetime.now().isoformat(),
-                    'trigger': 'periodic'
-                })
-                next_periodic = now + interval_seconds
-        except Exception as e:
-            print(f"Refresh worker error: {e}")
-            time.sleep(2)
 
+def _do_data_refresh(org_ids=None):
+    """Core refresh logic for org-scoped data.
 
-def _do_data_refresh():
-    """Core refresh logic for org-scoped data."""
+    ``org_ids`` restricts the refresh to those orgs and skips the global
+    legacy snapshot and storage maintenance, which belong to full sweeps.
+    """
     global RESTAURANTS_DATA, LAST_DATA_REFRESH
 
+    if org_ids:
+        for org_id in org_ids:
+            if not get_org_data(org_id).get('api'):
+                _init_org_ifood(org_id)
+            if not get_org_data(org_id).get('api'):
+                record_org_refresh_result(org_id, False)
+                continue
+            try:
+                _load_org_restaurants(org_id)
+                record_org_refresh_result(org_id, True)
+            except Exception as e:
+                print(f"Org {org_id} refresh error: {e}")
+                record_org_refresh_result(org_id, False)
+            invalidate_cache(org_id)
+        return
+
     refreshed_any = False
     first_org_payload = None
 
@@ -4545,10 +6058,12 @@ def _do_data_refresh():
         if od.get('api'):
             try:
                 _load_org_restaurants(org_id)
+                record_org_refresh_result(org_id, True)
                 refreshed_any = True
                 if first_org_payload is None:
                     first_org_payload = get_org_data(org_id)
             except Exception as e:
+                record_org_refresh_result(org_id, False)
                 print(f"Ã¢Å¡Â Ã¯Â¸Â Org {org_id} refresh error: {e}")
 
     if first_org_payload and isinstance(first_org_payload, dict):
@@ -4562,16 +6077,32 @@ def _do_data_refresh():
             LAST_DATA_REFRESH = datetime.now()
 
     invalidate_cache()
-    _save_data_snapshot()
+    _run_refresh_maintenance()
 
     refreshed_count = len(RESTAURANTS_DATA) if isinstance(RESTAURANTS_DATA, list) else 0
     print(f"Refreshed org data at {LAST_DATA_REFRESH.strftime('%H:%M:%S')} (legacy cache size={refreshed_count})")
 
 
+def _run_refresh_maintenance():
+    """Periodic persistence/storage work that is not tied to one org refresh."""
+    _save_data_snapshot()
+
+    # Storage maintenance: event log partitions/retention and snapshot compaction.
+    event_log_maintenance = db.maintain_ifood_event_log()
+    if event_log_maintenance.get('partitions_dropped') or event_log_maintenance.get('partitions_archived'):
+        print(
+            f"ifood_event_log retention: dropped={event_log_maintenance.get('partitions_dropped')} "
+            f"archived={event_log_maintenance.get('partitions_archived')}"
+        )
+    compacted_snapshots = db.compact_ifood_order_snapshots()
+    if compacted_snapshots:
+        print(f"ifood_order_snapshots compacted: {compacted_snapshots} terminal orders archived")
+
+
 # Track last seen order IDs per restaurant for new order detection
 _last_order_ids = {}
 
-def _detect_and_broadcast_new_orders(merchant_id: str, restaurant_name: str, orders: list):
+def _detect_and_broadcast_new_orders(merchant_id: str, restaurant_name: str, orders: list, org_id=None):
     """Compare orders with previously seen ones and broadcast new arrivals"""
     global _last_order_ids
     
@@ -4603,7 +6134,7 @@ def _detect_and_broadcast_new_orders(merchant_id: str, restaurant_name: str, ord
                     'customer_document': (order.get('customer') or {}).get('documentNumber') or (order.get('customer') or {}).get('cpf', ''),
                     'delivery_observations': (order.get('delivery') or {}).get('observations', ''),
                     'timestamp': order.get('createdAt', datetime.now().isoformat())
-                })
+                }, org_id=org_id, restaurant_id=merchant_id)
     
     _last_order_ids[merchant_id] = current_ids
 
@@ -4717,6 +6248,8 @@ def _init_org_ifood(org_id):
     try:
         use_mock_data = bool(config.get('use_mock_data')) or str(client_id).strip().upper() == 'MOCK_DATA_MODE'
         api = IFoodAPI(client_id, client_secret, use_mock_data=use_mock_data)
+        if IFOOD_ACK_BUFFER_ENABLED:
+            api.ack_sink = ifood_ack_buffer.add
         if api.authenticate():
             org['api'] = api
             print(f"Ã¢Å“â€¦ Org {org_id}: iFood API authenticated")
@@ -4959,6 +6492,10 @@ def _load_org_restaurants(org_id):
                 orders = previous_orders
 
         orders = _normalize_orders_list(orders)
+        if ANALYTICS_SQL_ENABLED and orders:
+            # Keep the snapshot table (SQL analytics source) complete beyond the
+            # persisted cache limit; unchanged orders are skipped by hash.
+            db.upsert_ifood_order_snapshots(org_id, merchant_id, orders, source='refresh', status_fn=get_order_status)
         financial_cache_context = {
             'id': merchant_id,
             'merchant_id': merchant_id,
@@ -4988,6 +6525,7 @@ def _load_org_restaurants(org_id):
         restaurant_data['merchant_id'] = normalize_merchant_id(merchant_id) or merchant_id
         if financial_sales:
             restaurant_data['_financial_sales_cache'] = financial_sales
+        restaurant_data['_time_cube'] = IFoodDataProcessor.build_time_cube(orders)
         if financial_cache_context.get('_resolved_merchant_id'):
             restaurant_data['_resolved_merchant_id'] = financial_cache_context.get('_resolved_merchant_id')
 
@@ -5086,39 +6624,56 @@ def _load_org_restaurants(org_id):
     print(f"  {org_id}: loaded {len(new_data)} restaurants")
 
 
+def _hydrate_org(org_id, org_name=None):
+    """Load one org's config and restaurant state (cache first, else iFood)."""
+    od = get_org_data(org_id)
+    org_name = org_name or org_id
+    if not isinstance(od.get('config'), dict) or not od.get('config'):
+        od['config'] = db.get_org_ifood_config(org_id) or {}
+    # Try cache first
+    cached_meta = db.load_org_data_cache_meta(org_id, 'restaurants', max_age_hours=2)
+    cached = cached_meta.get('data') if isinstance(cached_meta, dict) else None
+    if cached:
+        od['restaurants'] = cached
+        cache_created_at = cached_meta.get('created_at') if isinstance(cached_meta, dict) else None
+        od['last_refresh'] = cache_created_at if isinstance(cache_created_at, datetime) else datetime.now()
+        # Seed watermark so keepalive cannot overwrite this cache with a sparser one.
+        od['_db_cache_order_watermark'] = _count_orders_in_restaurant_list(cached)
+        _cached_orders = _count_orders_in_restaurant_list(cached)
+        _cached_revenue = _sum_revenue_in_restaurant_list(cached)
+        print(f"  [INIT-CACHE] org={org_id} loaded from DB: "
+              f"restaurants={len(cached)} orders={_cached_orders} revenue={_cached_revenue:.2f} "
+              f"cache_age={cached_meta.get('created_at')}")
+        # Prevent stale cache entries from reviving removed merchants after restart.
+        _reconcile_org_restaurants_with_config(od, od.get('config') or {})
+        print(f"  Ã¢Å¡Â¡ Org {org_id} ({org_name}): {len(cached)} restaurants from cache")
+        # Init API in background (per worker after fork in preload mode)
+        if PRELOAD_APP and not _BACKGROUND_SERVICES_STARTED:
+            _DEFERRED_ORG_REFRESH.append(org_id)
+        else:
+            threading.Thread(target=_init_and_refresh_org, args=(org_id,), daemon=True).start()
+    else:
+        api = _init_org_ifood(org_id)
+        if api:
+            _load_org_restaurants(org_id)
+
+
 def initialize_all_orgs():
     """Initialize iFood API and load data for all active orgs with credentials"""
     global RESTAURANTS_DATA, IFOOD_API, IFOOD_CONFIG, LAST_DATA_REFRESH
     orgs = db.get_all_active_orgs()
     print(f"\nÃ°Å¸ÂÂ¢ Initializing {len(orgs)} organization(s)...")
+    lazy = _org_lazy_hydration_active()
     for org_info in orgs:
         org_id = org_info['id']
-        od = get_org_data(org_id)
-        if not isinstance(od.get('config'), dict) or not od.get('config'):
-            od['config'] = db.get_org_ifood_config(org_id) or {}
-        # Try cache first
-        cached_meta = db.load_org_data_cache_meta(org_id, 'restaurants', max_age_hours=2)
-        cached = cached_meta.get('data') if isinstance(cached_meta, dict) else None
-        if cached:
-            od['restaurants'] = cached
-            cache_created_at = cached_meta.get('created_at') if isinstance(cached_meta, dict) else None
-            od['last_refresh'] = cache_created_at if isinstance(cache_created_at, datetime) else datetime.now()
-            # Seed watermark so keepalive cannot overwrite this cache with a sparser one.
-            od['_db_cache_order_watermark'] = _count_orders_in_restaurant_list(cached)
-            _cached_orders = _count_orders_in_restaurant_list(cached)
-            _cached_revenue = _sum_revenue_in_restaurant_list(cached)
-            print(f"  [INIT-CACHE] org={org_id} loaded from DB: "
-                  f"restaurants={len(cached)} orders={_cached_orders} revenue={_cached_revenue:.2f} "
-                  f"cache_age={cached_meta.get('created_at')}")
-            # Prevent stale cache entries from reviving removed merchants after restart.
-            _reconcile_org_restaurants_with_config(od, od.get('config') or {})
-            print(f"  Ã¢Å¡Â¡ Org {org_id} ({org_info['name']}): {len(cached)} restaurants from cache")
-            # Init API in background
-            threading.Thread(target=_init_and_refresh_org, args=(org_id,), daemon=True).start()
-        else:
-            api = _init_org_ifood(org_id)
-            if api:
-                _load_org_restaurants(org_id)
+        if lazy:
+            get_org_data(org_id)['name'] = org_info.get('name')
+            continue
+        with startup_profiler.org_load(org_id):
+            _hydrate_org(org_id, org_info['name'])
+        get_org_data(org_id)['_hydrated'] = True
+    if lazy:
+        print(f"  Lazy hydration: {len(orgs)} org(s) registered; state loads on first access")
     # Set legacy globals for backward compat (use first org's data)
     if orgs:
         first_org_id = orgs[0].get('id')
@@ -5131,6 +6686,75 @@ def initialize_all_orgs():
                 IFOOD_CONFIG = first.get('config', {})
 
 
+def _is_refresh_worker_process():
+    return (
+        ('--worker' in sys.argv)
+        or str(os.environ.get('RUN_REFRESH_WORKER', '')).strip().lower() in ('1', 'true', 'yes', 'on')
+    )
+
+
+def _org_lazy_hydration_active():
+    """Lazy hydration only applies where another process owns refresh/keepalive.
+
+    Without the Redis queue this process runs the background refresher and
+    (with IFOOD_KEEPALIVE_POLLING) the keepalive poller, which skip orgs that
+    have no API client yet, so every org must be loaded at boot.
+    """
+    if not ORG_LAZY_HYDRATION or _is_refresh_worker_process():
+        return False
+    return USE_REDIS_QUEUE and bool(get_redis_client())
+
+
+def ensure_org_hydrated(org_id, timeout=60.0):
+    """Load an org's state on first access; concurrent callers wait on one load.
+
+    Returns True once the org is hydrated, False if the wait timed out.
+    """
+    org = get_org_data(org_id)
+    if org.get('_hydrated'):
+        return True
+    with _ORG_DATA_LOCK:
+        if org.get('_hydrated'):
+            return True
+        event = _ORG_HYDRATION_INFLIGHT.get(org_id)
+        leader = event is None
+        if leader:
+            event = threading.Event()
+            _ORG_HYDRATION_INFLIGHT[org_id] = event
+    if not leader:
+        return event.wait(timeout) and bool(org.get('_hydrated'))
+    try:
+        _hydrate_org(org_id, org.get('name'))
+    except Exception as exc:
+        logger.warning("Org %s hydration failed: %s", org_id, exc)
+    finally:
+        # Mark hydrated even on failure: get_current_org_restaurants has its own
+        # retry path, and a failing org must not make every request reload it.
+        org['_hydrated'] = True
+        with _ORG_DATA_LOCK:
+            _ORG_HYDRATION_INFLIGHT.pop(org_id, None)
+        event.set()
+    return True
+
+
+def _warm_recent_orgs():
+    """Background: hydrate orgs whose members logged in recently."""
+    org_ids = db.get_recently_active_org_ids(hours=ORG_WARM_ACTIVE_HOURS, limit=ORG_WARM_LIMIT)
+    with _ORG_DATA_LOCK:
+        known = set(ORG_DATA.keys())
+    warmed = 0
+    for org_id in org_ids:
+        if org_id not in known:
+            continue
+        ensure_org_hydrated(org_id)
+        warmed += 1
+    logger.info("Org warmer hydrated %s recently active org(s)", warmed)
+
+
+def start_org_warmer():
+    threading.Thread(target=_warm_recent_orgs, daemon=True, name="org-warmer").start()
+
+
 def _init_and_refresh_org(org_id):
     """Background: init API and refresh data for an org"""
     api = _init_org_ifood(org_id)
@@ -5519,14 +7143,22 @@ def _table_has_org_id(cursor, table_name):
 # SQUADS API ENDPOINTS
 # ============================================================================
 
-def get_user_allowed_restaurant_ids(user_id, user_role):
-    """Helper function to get allowed restaurant IDs for a user based on squad membership"""
-    if user_role in ('admin', 'site_admin'):
-        return None  # None means all restaurants allowed
+def _authz_scope_key(org_id, user_id):
+    # Session and route values mix int and str ids; normalize so invalidation matches.
+    return (str(org_id) if org_id is not None else 'global', str(user_id))
+
+
+def _authz_scope_redis_key(org_id, user_id):
+    return f"{REDIS_AUTHZ_SCOPE_PREFIX}:{':'.join(_authz_scope_key(org_id, user_id))}"
+
+
+def _load_user_allowed_restaurant_ids(org_id, user_id):
+    """Query the visibility scope: None (all restaurants) or a frozenset of ids.
 
+    Raises on database errors so failures are not cached.
+    """
     # Owners/admins in the active org should always see all restaurants.
     try:
-        org_id = get_current_org_id()
         if org_id and user_id:
             org_role = db.get_org_member_role(org_id, user_id)
             if org_role in ('owner', 'admin'):
@@ -5534,11 +7166,9 @@ def get_user_allowed_restaurant_ids(user_id, user_role):
     except Exception:
         pass
 
+    conn = db.get_connection()
+    cursor = conn.cursor()
     try:
-        org_id = get_current_org_id()
-        conn = db.get_connection()
-        cursor = conn.cursor()
-
         if _table_has_org_id(cursor, 'squads') and org_id:
             cursor.execute("""
                 SELECT DISTINCT sr.restaurant_id
@@ -5555,19 +7185,88 @@ def get_user_allowed_restaurant_ids(user_id, user_role):
                 JOIN squad_members sm ON sr.squad_id = sm.squad_id
                 WHERE sm.user_id = %s
             """, (user_id,))
-
-        restaurant_ids = [row[0] for row in cursor.fetchall()]
-
+        restaurant_ids = frozenset(row[0] for row in cursor.fetchall())
+    finally:
         cursor.close()
         conn.close()
 
-        # Return None if user has no squad assignments (sees all by default)
-        return restaurant_ids if restaurant_ids else None
+    # None if user has no squad assignments (sees all by default)
+    return restaurant_ids or None
+
+
+def get_user_allowed_restaurant_ids(user_id, user_role):
+    """Allowed restaurant ids for a user in the current org (None means all).
+
+    Served from the per-(org, user) scope cache; only a miss queries the
+    database. Squad and membership mutations call invalidate_authorization_scope().
+    """
+    if user_role in ('admin', 'site_admin'):
+        return None  # None means all restaurants allowed
+
+    org_id = get_current_org_id()
+    key = _authz_scope_key(org_id, user_id)
+    now = time.time()
+    with _AUTHZ_SCOPE_CACHE_LOCK:
+        cached = _AUTHZ_SCOPE_CACHE.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    redis_client = get_redis_client() if USE_REDIS_CACHE and AUTHZ_SCOPE_CACHE_TTL_SECONDS else None
+    if redis_client:
+        try:
+            raw = redis_client.get(_authz_scope_redis_key(org_id, user_id))
+            if raw:
+                payload = json.loads(raw)
+                scope = None if payload.get('all') else frozenset(payload.get('ids') or ())
+                if AUTHZ_SCOPE_LOCAL_TTL_SECONDS:
+                    with _AUTHZ_SCOPE_CACHE_LOCK:
+                        _AUTHZ_SCOPE_CACHE[key] = (now + AUTHZ_SCOPE_LOCAL_TTL_SECONDS, scope)
+                return scope
+        except Exception as cache_read_error:
+            logger.debug("Redis authz scope read failed: %s", cache_read_error)
 
+    try:
+        scope = _load_user_allowed_restaurant_ids(org_id, user_id)
     except Exception as e:
         print(f"Error getting user allowed restaurants: {e}")
         return None  # Default to all on error
 
+    if not AUTHZ_SCOPE_CACHE_TTL_SECONDS:
+        return scope
+    # Always the short local TTL: without Redis an invalidation only reaches
+    # this process, so other workers must re-read the database soon.
+    if AUTHZ_SCOPE_LOCAL_TTL_SECONDS:
+        with _AUTHZ_SCOPE_CACHE_LOCK:
+            _AUTHZ_SCOPE_CACHE[key] = (now + AUTHZ_SCOPE_LOCAL_TTL_SECONDS, scope)
+    if redis_client:
+        payload = {'all': True} if scope is None else {'ids': sorted(scope)}
+        try:
+            redis_client.setex(_authz_scope_redis_key(org_id, user_id), AUTHZ_SCOPE_CACHE_TTL_SECONDS, json.dumps(payload))
+        except Exception as cache_write_error:
+            logger.debug("Redis authz scope write failed: %s", cache_write_error)
+    return scope
+
+
+def invalidate_authorization_scope(org_id=None, user_id=None):
+    """Drop cached visibility scopes for an org, a user, both, or everything."""
+    org_key, user_key = _authz_scope_key(org_id, user_id)
+    with _AUTHZ_SCOPE_CACHE_LOCK:
+        for key in list(_AUTHZ_SCOPE_CACHE.keys()):
+            if (org_id is None or key[0] == org_key) and (user_id is None or key[1] == user_key):
+                _AUTHZ_SCOPE_CACHE.pop(key, None)
+    redis_client = get_redis_client() if USE_REDIS_CACHE else None
+    if not redis_client:
+        return
+    try:
+        if org_id is not None and user_id is not None:
+            redis_client.delete(_authz_scope_redis_key(org_id, user_id))
+            return
+        pattern = f"{REDIS_AUTHZ_SCOPE_PREFIX}:{org_key if org_id is not None else '*'}:{user_key if user_id is not None else '*'}"
+        for k in redis_client.scan_iter(match=pattern):
+            redis_client.delete(k)
+    except Exception as cache_error:
+        logger.debug("Redis authz scope invalidation failed: %s", cache_error)
+
 
 def _squad_belongs_to_org(cursor, squad_id, org_id):
     """Return True when squad is visible under current org context."""
@@ -5704,118 +7403,13 @@ def check_setup():
 
 
 def initialize_database():
-    """Initialize database tables and create default users if needed"""
+    """Apply pending schema migrations and create default users if needed"""
     print("\nInitializing database...")
-    conn = None
-    cursor = None
     try:
-        if not db.setup_tables():
-            print("Database setup_tables() failed.")
+        if not db.ensure_schema():
+            print("Database schema migration failed.")
             return False
-        
-        # Create hidden stores table
-        conn = db.get_connection()
-        if not conn:
-            print("Database connection unavailable during initialization.")
-            return False
-        cursor = conn.cursor()
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS hidden_stores (
-                store_id VARCHAR(255) PRIMARY KEY,
-                store_name VARCHAR(255),
-                hidden_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                hidden_by VARCHAR(255)
-            )
-        """)
-        
-        # Create squads tables
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS squads (
-                id SERIAL PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                description TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                created_by VARCHAR(255)
-            )
-        """)
-        
-        # Migration: Add description column if it doesn't exist (for existing installations)
-        try:
-            cursor.execute("""
-                ALTER TABLE squads ADD COLUMN IF NOT EXISTS description TEXT
-            """)
-        except Exception as e:
-            # Column might already exist or DB doesn't support IF NOT EXISTS
-            print(f"   Note: description column migration: {e}")
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS squad_members (
-                id SERIAL PRIMARY KEY,
-                squad_id INTEGER NOT NULL REFERENCES squads(id) ON DELETE CASCADE,
-                user_id INTEGER NOT NULL REFERENCES dashboard_users(id) ON DELETE CASCADE,
-                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(squad_id, user_id)
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS squad_restaurants (
-                id SERIAL PRIMARY KEY,
-                squad_id INTEGER NOT NULL REFERENCES squads(id) ON DELETE CASCADE,
-                restaurant_id VARCHAR(255) NOT NULL,
-                restaurant_name VARCHAR(255),
-                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(squad_id, restaurant_id)
-            )
-        """)
 
-        # Ensure org_id exists on tenant-scoped tables created in legacy setups.
-        # Use fixed statements per table to avoid dynamic SQL interpolation.
-        org_id_migrations = {
-            'hidden_stores': """
-                DO $$ BEGIN
-                    IF NOT EXISTS (
-                        SELECT 1
-                        FROM information_schema.columns
-                        WHERE table_name = 'hidden_stores' AND column_name = 'org_id'
-                    ) THEN
-                        ALTER TABLE hidden_stores
-                        ADD COLUMN org_id INTEGER REFERENCES organizations(id) ON DELETE CASCADE;
-                    END IF;
-                END $$;
-            """,
-            'squads': """
-                DO $$ BEGIN
-                    IF NOT EXISTS (
-                        SELECT 1
-                        FROM information_schema.columns
-                        WHERE table_name = 'squads' AND column_name = 'org_id'
-                    ) THEN
-                        ALTER TABLE squads
-                        ADD COLUMN org_id INTEGER REFERENCES organizations(id) ON DELETE CASCADE;
-                    END IF;
-                END $$;
-            """,
-            'client_groups': """
-                DO $$ BEGIN
-                    IF NOT EXISTS (
-                        SELECT 1
-                        FROM information_schema.columns
-                        WHERE table_name = 'client_groups' AND column_name = 'org_id'
-                    ) THEN
-                        ALTER TABLE client_groups
-                        ADD COLUMN org_id INTEGER REFERENCES organizations(id) ON DELETE CASCADE;
-                    END IF;
-                END $$;
-            """
-        }
-        for tbl, stmt in org_id_migrations.items():
-            try:
-                cursor.execute(stmt)
-            except Exception as migration_error:
-                print(f"   Note: org_id migration for {tbl}: {migration_error}")
-        
-        conn.commit()
         # Migrations may change table columns; reset cached metadata.
         _clear_table_columns_cache()
         _prime_table_columns_cache((
@@ -5826,11 +7420,7 @@ def initialize_database():
             'squad_members',
             'squad_restaurants',
         ))
-        cursor.close()
-        cursor = None
-        conn.close()
-        conn = None
-        
+
         users = db.get_all_users()
         if not users:
             bootstrap_defaults = str(os.environ.get('BOOTSTRAP_DEFAULT_USERS', '0')).strip().lower() in ('1', 'true', 'yes', 'on')
@@ -5846,17 +7436,57 @@ def initialize_database():
     except Exception as e:
         log_exception("database_initialization_failed", e)
         return False
-    finally:
-        try:
-            if cursor:
-                cursor.close()
-        except Exception:
-            pass
-        try:
-            if conn:
-                conn.close()
-        except Exception:
-            pass
+
+
+def _start_background_services(queue_mode, is_worker_process):
+    """Threads owned by one serving process (each worker in preload mode)."""
+    global _BACKGROUND_SERVICES_STARTED
+    _BACKGROUND_SERVICES_STARTED = True
+    # Start background refresh for org-scoped data.
+    if not queue_mode:
+        bg_refresher.interval = 1800  # 30 min
+        bg_refresher.start()
+
+    # In Redis queue mode, keepalive polling runs inside the dedicated worker loop.
+    if IFOOD_KEEPALIVE_POLLING and not is_worker_process and not queue_mode:
+        start_keepalive_poller()
+
+    if ORG_WARM_LIMIT and not is_worker_process and _org_lazy_hydration_active():
+        start_org_warmer()
+
+    while _DEFERRED_ORG_REFRESH:
+        threading.Thread(target=_init_and_refresh_org, args=(_DEFERRED_ORG_REFRESH.pop(0),), daemon=True).start()
+
+
+def prepare_preload_fork():
+    """gunicorn when_ready (preload): drop master connections and freeze loaded state.
+
+    Workers then inherit no live sockets, and gc.freeze() keeps the collector
+    from touching (and so copying) the shared org state pages in every worker.
+    """
+    global _REDIS_CLIENT
+    db.close_pool()
+    _REDIS_CLIENT = None
+    for _, org_data in _org_data_items_snapshot():
+        api = org_data.get('api') if isinstance(org_data, dict) else None
+        session_obj = getattr(api, 'session', None)
+        if session_obj is not None:
+            session_obj.close()
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork_worker():
+    """gunicorn post_fork (preload): reset inherited connections and start this worker's threads."""
+    global _REDIS_CLIENT, REDIS_INSTANCE_ID
+    # Each worker needs its own id: the pub/sub listener skips its own events
+    # and keepalive shards are assigned per instance.
+    REDIS_INSTANCE_ID = str(uuid.uuid4())
+    db.reset_after_fork()
+    _REDIS_CLIENT = None
+    sse_manager.start_redis_listener()
+    queue_mode = USE_REDIS_QUEUE and bool(get_redis_client())
+    _start_background_services(queue_mode=queue_mode, is_worker_process=False)
 
 
 def initialize_app():
@@ -5873,7 +7503,8 @@ def initialize_app():
     print("="*60)
     
     # Check setup
-    setup_ok = check_setup()
+    with startup_profiler.phase('setup_check'):
+        setup_ok = check_setup()
     if not setup_ok:
         is_production = str(os.environ.get('FLASK_ENV', '')).strip().lower() == 'production'
         if is_production:
@@ -5884,12 +7515,14 @@ def initialize_app():
         print("WARNING: Setup check failed; continuing because FLASK_ENV is not production.")
     
     # Initialize database (includes SaaS tables)
-    db_ok = initialize_database()
+    with startup_profiler.phase('db_init'):
+        db_ok = initialize_database()
     if not db_ok:
         raise RuntimeError("Database initialization failed")
     
     # Try per-org initialization first (SaaS mode)
-    initialize_all_orgs()
+    with startup_profiler.phase('org_init'):
+        initialize_all_orgs()
     
     queue_mode = USE_REDIS_QUEUE and bool(get_redis_client())
     is_worker_process = (
@@ -5900,14 +7533,9 @@ def initialize_app():
     if not any((od or {}).get('restaurants') for od in org_values_snapshot):
         print("\nNo org data found; skipping legacy file fallback.")
 
-    # Start background refresh for org-scoped data.
-    if not queue_mode:
-        bg_refresher.interval = 1800  # 30 min
-        bg_refresher.start()
-
-    # In Redis queue mode, keepalive polling runs inside the dedicated worker loop.
-    if IFOOD_KEEPALIVE_POLLING and not is_worker_process and not queue_mode:
-        start_keepalive_poller()
+    if not PRELOAD_APP:
+        with startup_profiler.phase('background_services'):
+            _start_background_services(queue_mode=queue_mode, is_worker_process=is_worker_process)
     
     org_values_snapshot = _org_data_values_snapshot()
     total_restaurants = sum(len((od or {}).get('restaurants') or []) for od in org_values_snapshot) + len(RESTAURANTS_DATA)
@@ -5928,6 +7556,8 @@ def initialize_app():
     print(f"\nAccess: http://localhost:{os.environ.get('PORT', 5000)}")
     print("="*60)
     print()
+    if startup_profiler.enabled():
+        print(startup_profiler.finish(STARTUP_PROFILE_PATH))
     APP_INITIALIZED = True
 
 
@@ -5956,6 +7586,9 @@ if __name__ == '__main__':
         initialize_app()
         print("Bootstrap complete")
         sys.exit(0)
+    if '--migrate' in sys.argv:
+        # Release-phase step: apply schema migrations before web workers boot.
+        sys.exit(0 if db.ensure_schema() else 1)
 
     initialize_app()
     run_worker = ('--worker' in sys.argv) or (str(os.environ.get('RUN_REFRESH_WORKER', '')).strip().lower() in ('1', 'true', 'yes', 'on'))
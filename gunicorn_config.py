@@ -1,6 +1,9 @@
 # Gunicorn configuration file
 import multiprocessing
 
+# Preload settings and hooks (GUNICORN_PRELOAD_APP=1)
+from gunicorn_preload import preload_app, when_ready, post_fork  # noqa: F401
+
 # Server socket
 bind = "0.0.0.0:5000"
 backlog = 2048
@@ -37,4 +40,4 @@ tmp_upload_dir = None
 
 # SSL (uncomment if using HTTPS)
 # keyfile = '/path/to/keyfile'
-# certfile = '/path/to/certfile'
\ No newline at end of file
+# certfile = '/path/to/certfile'
@@ -0,0 +1,27 @@
+# Gunicorn preload hooks (passed via --config in the start commands).
+# Holds only the preload settings so the command-line flags stay in charge of
+# everything else; gunicorn_config.py reuses these hooks.
+import os
+
+# Preload: the master imports the app and loads org state once; workers inherit
+# it via fork and start their own threads/connections in post_fork.
+# Enable with GUNICORN_PRELOAD_APP=1.
+preload_app = str(os.environ.get('GUNICORN_PRELOAD_APP', '0')).strip().lower() in ('1', 'true', 'yes', 'on')
+if preload_app:
+    os.environ['TIMO_PRELOAD_APP'] = '1'
+    # The gevent worker patches after fork; patch before the master imports the
+    # app so the inherited locks, sockets and threads are cooperative.
+    from gevent import monkey
+    monkey.patch_all()
+
+
+def when_ready(server):
+    if preload_app:
+        import dashboardserver
+        dashboardserver.prepare_preload_fork()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        import dashboardserver
+        dashboardserver.post_fork_worker()
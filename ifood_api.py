@@ -13,18 +13,11 @@ from datetime import datetime, timedelta
 from typing import Optional, Dict, List
 from pathlib import Path
 import time
+import threading
 from urllib.parse import urlencode
 from urllib.request import Request, build_opener, ProxyHandler
 from urllib.error import HTTPError, URLError
 
-# Import mock data generator
-try:
-    from mock_ifood_data import MockIFoodDataGenerator
-    MOCK_AVAILABLE = True
-except ImportError:
-    MOCK_AVAILABLE = False
-    print("âš ï¸  Mock data generator not available")
-
 
 _MERCHANT_UUID_RE = re.compile(
     r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'
@@ -61,8 +54,12 @@ class IFoodAPI:
         self.token_expires_at = None
         self.last_auth_error = None
         self._last_http_error = None
+        self._trace_local = threading.local()
         self._last_poll_trace = None
         self._last_ack_trace = None
+        # Optional callable(api, events) that takes over acks after processing
+        # (the server installs a batching buffer); None acks inline.
+        self.ack_sink = None
         self._order_list_fallback_supported = True
         self._order_list_fallback_disabled_logged = False
         self._mock_orders_per_restaurant = max(
@@ -101,6 +98,15 @@ class IFoodAPI:
         # Optional fallback endpoint: unsupported scope is expected for many tenants.
         return endpoint_text == '/order/v1.0/orders' and status in (404, 405)
 
+    @property
+    def _last_poll_trace(self):
+        # Per thread: keepalive polls several merchant chunks of one client concurrently.
+        return getattr(self._trace_local, 'poll', None)
+
+    @_last_poll_trace.setter
+    def _last_poll_trace(self, value):
+        self._trace_local.poll = value
+
     def get_last_http_error(self) -> Dict:
         """Expose latest transport/API error for route-layer status mapping."""
         if isinstance(self._last_http_error, dict):
@@ -135,6 +141,8 @@ class IFoodAPI:
         if not key:
             return None
         if key not in self._mock_merchants:
+            # Imported on first use: only mock-mode clients need the generator.
+            from mock_ifood_data import MockIFoodDataGenerator
             self._mock_merchants[key] = MockIFoodDataGenerator.generate_merchant_data(
                 merchant_id=key,
                 num_orders=self._mock_orders_per_restaurant,
@@ -516,7 +524,10 @@ class IFoodAPI:
 
         if events:
             try:
-                self.acknowledge_events(events)
+                if self.ack_sink is not None:
+                    self.ack_sink(self, events)
+                else:
+                    self.acknowledge_events(events)
             except Exception:
                 pass
 
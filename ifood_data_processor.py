@@ -675,9 +675,21 @@ class IFoodDataProcessor:
         }
     
     @staticmethod
-    def generate_charts_data(orders: List[Dict]) -> Dict:
-        """Generate chart data from orders with full date information for filtering"""
+    def generate_charts_data(orders: List[Dict], time_cube: Optional[Dict] = None,
+                             start_date: Optional[str] = None, end_date: Optional[str] = None) -> Dict:
+        """Generate chart data from orders with full date information for filtering
+
+        When ``time_cube`` (see build_time_cube) is given the series are read
+        from its buckets, optionally sliced to ``start_date``/``end_date``, and
+        ``orders`` is only echoed back as ``orders_data``.
+        """
         try:
+            if time_cube is not None:
+                daily_data, monthly_data, hourly_data = IFoodDataProcessor._chart_buckets_from_time_cube(
+                    time_cube, start_date, end_date
+                )
+                return IFoodDataProcessor._build_charts_payload(daily_data, monthly_data, hourly_data, orders)
+
             daily_data = {}
             monthly_data = {}
             hourly_data = {str(h).zfill(2): {'orders': 0, 'revenue': 0} for h in range(24)}
@@ -739,77 +751,8 @@ class IFoodDataProcessor:
                 except Exception as e:
                     continue
             
-            sorted_dates = sorted(daily_data.keys(), key=lambda x: daily_data[x]['date_sort'])
-            sorted_months = sorted(monthly_data.keys())
-            
-            # Get list of available months for filter
-            available_months = []
-            for month_key in sorted_months:
-                available_months.append({
-                    'value': month_key,
-                    'label': monthly_data[month_key]['label']
-                })
-            
-            return {
-                'revenue_chart': {
-                    'labels': sorted_dates,
-                    'datasets': [{
-                        'label': 'Faturamento',
-                        'data': [daily_data[d]['revenue'] for d in sorted_dates],
-                        'borderColor': '#ef4444',
-                        'backgroundColor': 'rgba(239, 68, 68, 0.1)'
-                    }],
-                    # Include full date and month info for each data point
-                    'dates': [daily_data[d]['full_date'] for d in sorted_dates],
-                    'months': [daily_data[d]['month'] for d in sorted_dates]
-                },
-                'orders_chart': {
-                    'labels': sorted_dates,
-                    'datasets': [{
-                        'label': 'Pedidos',
-                        'data': [daily_data[d]['orders'] for d in sorted_dates],
-                        'borderColor': '#3b82f6',
-                        'backgroundColor': 'rgba(59, 130, 246, 0.1)'
-                    }],
-                    'dates': [daily_data[d]['full_date'] for d in sorted_dates],
-                    'months': [daily_data[d]['month'] for d in sorted_dates]
-                },
-                # Monthly aggregated charts
-                'monthly_revenue_chart': {
-                    'labels': [monthly_data[m]['label'] for m in sorted_months],
-                    'datasets': [{
-                        'label': 'Faturamento Mensal',
-                        'data': [monthly_data[m]['revenue'] for m in sorted_months],
-                        'borderColor': '#ef4444',
-                        'backgroundColor': 'rgba(239, 68, 68, 0.1)'
-                    }],
-                    'months': sorted_months
-                },
-                'monthly_orders_chart': {
-                    'labels': [monthly_data[m]['label'] for m in sorted_months],
-                    'datasets': [{
-                        'label': 'Pedidos Mensais',
-                        'data': [monthly_data[m]['orders'] for m in sorted_months],
-                        'borderColor': '#3b82f6',
-                        'backgroundColor': 'rgba(59, 130, 246, 0.1)'
-                    }],
-                    'months': sorted_months
-                },
-                'hourly_chart': {
-                    'labels': [f'{h}:00' for h in range(24)],
-                    'datasets': [{
-                        'label': 'Pedidos por Hora',
-                        'data': [hourly_data[str(h).zfill(2)]['orders'] for h in range(24)],
-                        'backgroundColor': '#22c55e'
-                    }],
-                    'revenue_data': [hourly_data[str(h).zfill(2)]['revenue'] for h in range(24)]
-                },
-                # Available months for filtering
-                'available_months': available_months,
-                # Include all orders data for feedback processing
-                'orders_data': orders
-            }
-            
+            return IFoodDataProcessor._build_charts_payload(daily_data, monthly_data, hourly_data, orders)
+
         except Exception as e:
             print(f"Error generating charts data: {e}")
             return {
@@ -818,11 +761,272 @@ class IFoodDataProcessor:
                 'hourly_chart': {'labels': [], 'datasets': []}
             }
     
+    @staticmethod
+    def _build_charts_payload(daily_data: Dict, monthly_data: Dict, hourly_data: Dict, orders) -> Dict:
+        sorted_dates = sorted(daily_data.keys(), key=lambda x: daily_data[x]['date_sort'])
+        sorted_months = sorted(monthly_data.keys())
+        
+        # Get list of available months for filter
+        available_months = []
+        for month_key in sorted_months:
+            available_months.append({
+                'value': month_key,
+                'label': monthly_data[month_key]['label']
+            })
+        
+        return {
+            'revenue_chart': {
+                'labels': sorted_dates,
+                'datasets': [{
+                    'label': 'Faturamento',
+                    'data': [daily_data[d]['revenue'] for d in sorted_dates],
+                    'borderColor': '#ef4444',
+                    'backgroundColor': 'rgba(239, 68, 68, 0.1)'
+                }],
+                # Include full date and month info for each data point
+                'dates': [daily_data[d]['full_date'] for d in sorted_dates],
+                'months': [daily_data[d]['month'] for d in sorted_dates]
+            },
+            'orders_chart': {
+                'labels': sorted_dates,
+                'datasets': [{
+                    'label': 'Pedidos',
+                    'data': [daily_data[d]['orders'] for d in sorted_dates],
+                    'borderColor': '#3b82f6',
+                    'backgroundColor': 'rgba(59, 130, 246, 0.1)'
+                }],
+                'dates': [daily_data[d]['full_date'] for d in sorted_dates],
+                'months': [daily_data[d]['month'] for d in sorted_dates]
+            },
+            # Monthly aggregated charts
+            'monthly_revenue_chart': {
+                'labels': [monthly_data[m]['label'] for m in sorted_months],
+                'datasets': [{
+                    'label': 'Faturamento Mensal',
+                    'data': [monthly_data[m]['revenue'] for m in sorted_months],
+                    'borderColor': '#ef4444',
+                    'backgroundColor': 'rgba(239, 68, 68, 0.1)'
+                }],
+                'months': sorted_months
+            },
+            'monthly_orders_chart': {
+                'labels': [monthly_data[m]['label'] for m in sorted_months],
+                'datasets': [{
+                    'label': 'Pedidos Mensais',
+                    'data': [monthly_data[m]['orders'] for m in sorted_months],
+                    'borderColor': '#3b82f6',
+                    'backgroundColor': 'rgba(59, 130, 246, 0.1)'
+                }],
+                'months': sorted_months
+            },
+            'hourly_chart': {
+                'labels': [f'{h}:00' for h in range(24)],
+                'datasets': [{
+                    'label': 'Pedidos por Hora',
+                    'data': [hourly_data[str(h).zfill(2)]['orders'] for h in range(24)],
+                    'backgroundColor': '#22c55e'
+                }],
+                'revenue_data': [hourly_data[str(h).zfill(2)]['revenue'] for h in range(24)]
+            },
+            # Available months for filtering
+            'available_months': available_months,
+            # Include all orders data for feedback processing
+            'orders_data': orders
+        }
+
+    # ------------------------------------------------------------------
+    # Time cube: per-store (filter date, local date, hour) buckets so chart
+    # series can be served without re-parsing every order per request.
+    # ------------------------------------------------------------------
+
+    TIME_CUBE_VERSION = 2
+
+    @staticmethod
+    def _time_cube_contribution(order: Dict):
+        """Return (cell_key, kind, amount) for one order, or None if undated.
+
+        cell_key is ``"<filter date>|<local date>|<hour>"``: the filter date
+        follows the date-range filter used by the restaurant routes (ISO date as
+        written), the local date/hour follow the chart series. kind is ``C``
+        (concluded), ``X`` (cancelled) or ``O`` (other, revenue only when the
+        selection has no concluded orders).
+        """
+        created_at = order.get('createdAt', '') or order.get('created_at', '')
+        if not created_at:
+            return None
+        local_dt = IFoodDataProcessor._parse_local_datetime(created_at)
+        if not local_dt:
+            return None
+        try:
+            filter_date = datetime.fromisoformat(str(created_at).replace('Z', '+00:00')).date().isoformat()
+        except Exception:
+            filter_date = ''
+        local_date = f"{local_dt.year:04d}-{local_dt.month:02d}-{local_dt.day:02d}"
+        cell_key = f"{filter_date}|{local_date}|{local_dt.hour:02d}"
+        status = IFoodDataProcessor._get_order_status(order)
+        kind = 'C' if status == 'CONCLUDED' else ('X' if status == 'CANCELLED' else 'O')
+        return cell_key, kind, IFoodDataProcessor._order_amount(order)
+
+    @staticmethod
+    def _time_cube_apply(cube: Dict, contribution, sign: int) -> None:
+        cell_key, kind, amount = contribution
+        # cell: [orders, concluded_orders, concluded_revenue, other_revenue]
+        cell = cube['cells'].setdefault(cell_key, [0, 0, 0.0, 0.0])
+        cell[0] += sign
+        if kind == 'C':
+            cell[1] += sign
+            cell[2] += sign * amount
+        elif kind == 'O':
+            cell[3] += sign * amount
+        if cell[0] <= 0:
+            cube['cells'].pop(cell_key, None)
+
+    @staticmethod
+    def time_cube_fingerprint(orders: List[Dict], orders_version: int = 0) -> List:
+        """Identity of the order list a cube was built from: ``[count, version]``.
+
+        ``orders_version`` is bumped by every writer of a restaurant's order
+        cache, so checking a cube costs O(1) instead of re-reading the orders.
+        """
+        return [len(orders or []), int(orders_version or 0)]
+
+    @staticmethod
+    def build_time_cube(orders: List[Dict], orders_version: int = 0) -> Dict:
+        """Build the date x hour order/revenue cube for a store's orders."""
+        cube = {
+            'version': IFoodDataProcessor.TIME_CUBE_VERSION,
+            'cells': {},
+            'index': {},
+            'fingerprint': IFoodDataProcessor.time_cube_fingerprint(orders, orders_version),
+        }
+        for order in orders or []:
+            if not isinstance(order, dict):
+                continue
+            try:
+                contribution = IFoodDataProcessor._time_cube_contribution(order)
+            except Exception:
+                continue
+            if not contribution:
+                continue
+            IFoodDataProcessor._time_cube_apply(cube, contribution, 1)
+            order_key = IFoodDataProcessor._extract_order_identifier(order)
+            if order_key:
+                cube['index'][order_key] = list(contribution)
+        return cube
+
+    @staticmethod
+    def update_time_cube(cube: Dict, changed_orders: List[Dict], orders: List[Dict],
+                         orders_version: int = 0) -> Dict:
+        """Apply added/updated orders to ``cube`` in place.
+
+        Each changed order's previous contribution (looked up by order id) is
+        removed before the new one is added, so status changes move revenue
+        between buckets. ``orders`` (the full list after the merge) and
+        ``orders_version`` only refresh the fingerprint. A cube loaded without
+        its per-order index (see persistable_time_cube) is rebuilt instead.
+        """
+        if not isinstance(cube.get('index'), dict):
+            cube.clear()
+            cube.update(IFoodDataProcessor.build_time_cube(orders, orders_version))
+            return cube
+        for order in changed_orders or []:
+            if not isinstance(order, dict):
+                continue
+            order_key = IFoodDataProcessor._extract_order_identifier(order)
+            if not order_key:
+                continue
+            previous = cube['index'].pop(order_key, None)
+            if previous:
+                IFoodDataProcessor._time_cube_apply(cube, previous, -1)
+            try:
+                contribution = IFoodDataProcessor._time_cube_contribution(order)
+            except Exception:
+                contribution = None
+            if contribution:
+                IFoodDataProcessor._time_cube_apply(cube, contribution, 1)
+                cube['index'][order_key] = list(contribution)
+        cube['fingerprint'] = IFoodDataProcessor.time_cube_fingerprint(orders, orders_version)
+        return cube
+
+    @staticmethod
+    def is_time_cube_current(cube, orders: List[Dict], orders_version: int = 0) -> bool:
+        return (
+            isinstance(cube, dict)
+            and cube.get('version') == IFoodDataProcessor.TIME_CUBE_VERSION
+            and isinstance(cube.get('cells'), dict)
+            and cube.get('fingerprint') == IFoodDataProcessor.time_cube_fingerprint(orders, orders_version)
+        )
+
+    @staticmethod
+    def persistable_time_cube(cube: Dict) -> Dict:
+        """The cube as stored with the org cache.
+
+        The per-order index is dropped (rebuilt on the first update) and the
+        fingerprint is reset to version 0, where a loaded record starts.
+        """
+        persisted = {key: value for key, value in cube.items() if key != 'index'}
+        persisted['fingerprint'] = [(cube.get('fingerprint') or [0])[0], 0]
+        return persisted
+
+    @staticmethod
+    def _chart_buckets_from_time_cube(cube: Dict, start_date: Optional[str] = None,
+                                      end_date: Optional[str] = None):
+        selected = []
+        has_concluded_orders = False
+        for cell_key, cell in (cube.get('cells') or {}).items():
+            filter_date, local_date, hour_key = cell_key.split('|')
+            if start_date or end_date:
+                if not filter_date:
+                    continue
+                if start_date and filter_date < start_date:
+                    continue
+                if end_date and filter_date > end_date:
+                    continue
+            selected.append((local_date, hour_key, cell))
+            if cell[1] > 0:
+                has_concluded_orders = True
+
+        daily_data = {}
+        monthly_data = {}
+        hourly_data = {str(h).zfill(2): {'orders': 0, 'revenue': 0} for h in range(24)}
+        for local_date, hour_key, cell in sorted(selected):
+            orders_count = cell[0]
+            revenue = cell[2] + (0 if has_concluded_orders else cell[3])
+            date_key = f"{local_date[8:10]}/{local_date[5:7]}"
+            month_key = local_date[:7]
+            if date_key not in daily_data:
+                daily_data[date_key] = {
+                    'orders': 0,
+                    'revenue': 0,
+                    'date_sort': local_date,
+                    'full_date': local_date,
+                    'month': month_key
+                }
+            daily_data[date_key]['orders'] += orders_count
+            daily_data[date_key]['revenue'] += revenue
+            if month_key not in monthly_data:
+                monthly_data[month_key] = {
+                    'orders': 0,
+                    'revenue': 0,
+                    'label': f"{local_date[5:7]}/{local_date[:4]}",
+                    'month_sort': month_key
+                }
+            monthly_data[month_key]['orders'] += orders_count
+            monthly_data[month_key]['revenue'] += revenue
+            hourly_data[hour_key]['orders'] += orders_count
+            hourly_data[hour_key]['revenue'] += revenue
+        return daily_data, monthly_data, hourly_data
+
     @staticmethod
     def generate_charts_data_with_interruptions(orders: List[Dict], 
-                                               interruptions: List[Dict] = None) -> Dict:
+                                               interruptions: List[Dict] = None,
+                                               time_cube: Optional[Dict] = None,
+                                               start_date: Optional[str] = None,
+                                               end_date: Optional[str] = None) -> Dict:
         """Generate chart data with interruption markers and total closed time"""
-        chart_data = IFoodDataProcessor.generate_charts_data(orders)
+        chart_data = IFoodDataProcessor.generate_charts_data(
+            orders, time_cube=time_cube, start_date=start_date, end_date=end_date
+        )
         
         interruption_periods = []
         total_closed_hours = 0
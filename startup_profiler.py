@@ -0,0 +1,175 @@
+"""
+Startup profiler for the server entry points.
+
+Enabled with STARTUP_PROFILE=1 or ``--profile-startup``. Records the
+import-time tree (main thread, first imports only), named boot phases and
+per-org load times, then writes a JSON report and returns a one-line summary.
+Everything is a no-op while disabled.
+"""
+
+import builtins
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+_ENABLED = False
+_STARTED_AT = None
+_MAIN_THREAD_ID = None
+_ORIGINAL_IMPORT = None
+_IMPORT_ROOT = {'children': []}
+_IMPORT_STACK = []
+_PHASES = []
+_ORGS = []
+_LOCK = threading.Lock()
+
+
+def enabled():
+    return _ENABLED
+
+
+def install_from_environment(argv=None):
+    """Install when STARTUP_PROFILE is truthy or ``--profile-startup`` was passed."""
+    argv = sys.argv if argv is None else argv
+    flag = str(os.environ.get('STARTUP_PROFILE', '')).strip().lower() in ('1', 'true', 'yes', 'on')
+    if flag or '--profile-startup' in argv:
+        install()
+    return _ENABLED
+
+
+def install():
+    global _ENABLED, _STARTED_AT, _MAIN_THREAD_ID, _ORIGINAL_IMPORT
+    if _ENABLED:
+        return
+    _ENABLED = True
+    _STARTED_AT = time.perf_counter()
+    _MAIN_THREAD_ID = threading.get_ident()
+    _ORIGINAL_IMPORT = builtins.__import__
+    builtins.__import__ = _profiled_import
+
+
+def _elapsed_ms(since=None):
+    return (time.perf_counter() - (_STARTED_AT if since is None else since)) * 1000.0
+
+
+def _resolve_import_name(name, globals_, level):
+    if level == 0:
+        return name
+    package = (globals_ or {}).get('__package__') or ''
+    try:
+        return importlib.util.resolve_name('.' * level + name, package)
+    except (ImportError, ValueError):
+        return '.' * level + name
+
+
+def _profiled_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if threading.get_ident() != _MAIN_THREAD_ID or (level == 0 and name in sys.modules):
+        return _ORIGINAL_IMPORT(name, globals, locals, fromlist, level)
+    node = {'module': _resolve_import_name(name, globals, level), 'children': []}
+    parent = _IMPORT_STACK[-1] if _IMPORT_STACK else _IMPORT_ROOT
+    modules_before = len(sys.modules)
+    started = time.perf_counter()
+    _IMPORT_STACK.append(node)
+    try:
+        return _ORIGINAL_IMPORT(name, globals, locals, fromlist, level)
+    finally:
+        _IMPORT_STACK.pop()
+        node['ms'] = round(_elapsed_ms(started), 3)
+        node['self_ms'] = round(node['ms'] - sum(child['ms'] for child in node['children']), 3)
+        if node['children'] or len(sys.modules) != modules_before:
+            parent['children'].append(node)
+
+
+@contextmanager
+def phase(name):
+    """Time one named boot phase."""
+    if not _ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _LOCK:
+            _PHASES.append({
+                'name': name,
+                'start_ms': round((started - _STARTED_AT) * 1000.0, 3),
+                'ms': round(_elapsed_ms(started), 3),
+            })
+
+
+@contextmanager
+def org_load(org_id):
+    """Time one org's load during boot."""
+    if not _ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _LOCK:
+            _ORGS.append({'org_id': org_id, 'ms': round(_elapsed_ms(started), 3)})
+
+
+def _flatten_imports(nodes):
+    for node in nodes:
+        yield node
+        yield from _flatten_imports(node['children'])
+
+
+def report():
+    """Current profile as a JSON-serializable dict."""
+    tree = list(_IMPORT_ROOT['children'])
+    slowest = sorted(_flatten_imports(tree), key=lambda node: node['self_ms'], reverse=True)[:20]
+    with _LOCK:
+        phases = list(_PHASES)
+        orgs = sorted(_ORGS, key=lambda item: item['ms'], reverse=True)
+    return {
+        'ready_ms': round(_elapsed_ms(), 3) if _STARTED_AT is not None else None,
+        'imports': {
+            'total_ms': round(sum(node['ms'] for node in tree), 3),
+            'slowest_self': [{'module': node['module'], 'self_ms': node['self_ms']} for node in slowest],
+            'tree': tree,
+        },
+        'phases': phases,
+        'orgs': {
+            'count': len(orgs),
+            'total_ms': round(sum(item['ms'] for item in orgs), 3),
+            'loads': orgs,
+        },
+    }
+
+
+def summary_line(data, path=None):
+    parts = [f"ready in {data['ready_ms']:.0f}ms", f"imports {data['imports']['total_ms']:.0f}ms"]
+    slowest = data['imports']['slowest_self']
+    if slowest:
+        parts.append(f"slowest import {slowest[0]['module']} {slowest[0]['self_ms']:.0f}ms")
+    if data['phases']:
+        parts.append(' '.join(f"{item['name']}={item['ms']:.0f}ms" for item in data['phases']))
+    if data['orgs']['count']:
+        parts.append(f"orgs={data['orgs']['count']} ({data['orgs']['total_ms']:.0f}ms)")
+    line = 'Startup profile: ' + ', '.join(parts)
+    return f"{line} -> {path}" if path else line
+
+
+def finish(path):
+    """Stop profiling, write the JSON report to ``path`` and return the summary line."""
+    global _ENABLED
+    if not _ENABLED:
+        return None
+    builtins.__import__ = _ORIGINAL_IMPORT
+    data = report()
+    _ENABLED = False
+    path = Path(path)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data, indent=2, default=str), encoding='utf-8')
+    except OSError as exc:
+        return summary_line(data) + f" (report not written: {exc})"
+    return summary_line(data, path)
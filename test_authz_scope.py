@@ -0,0 +1,62 @@
+"""Tests for the cached per-(org, user) restaurant visibility scope."""
+
+import dashboardserver
+
+
+def _use_counting_loader(monkeypatch, scopes):
+    calls = []
+
+    def _load(org_id, user_id):
+        calls.append((org_id, user_id))
+        return scopes.pop(0)
+
+    monkeypatch.setattr(dashboardserver, '_AUTHZ_SCOPE_CACHE', {})
+    monkeypatch.setattr(dashboardserver, 'USE_REDIS_CACHE', False)
+    monkeypatch.setattr(dashboardserver, 'get_current_org_id', lambda: 3)
+    monkeypatch.setattr(dashboardserver, '_load_user_allowed_restaurant_ids', _load)
+    return calls
+
+
+def test_scope_is_cached_as_frozenset(monkeypatch):
+    calls = _use_counting_loader(monkeypatch, [frozenset({'m1', 'm2'})])
+
+    first = dashboardserver.get_user_allowed_restaurant_ids(7, 'user')
+    second = dashboardserver.get_user_allowed_restaurant_ids(7, 'user')
+
+    assert first == frozenset({'m1', 'm2'}) and second is first
+    assert calls == [(3, 7)]
+    assert dashboardserver.get_user_allowed_restaurant_ids(7, 'site_admin') is None
+    assert len(calls) == 1
+
+
+def test_invalidation_matches_mixed_id_types(monkeypatch):
+    calls = _use_counting_loader(monkeypatch, [frozenset({'m1'}), None])
+    dashboardserver.get_user_allowed_restaurant_ids(7, 'user')
+
+    dashboardserver.invalidate_authorization_scope(org_id='3')
+
+    assert dashboardserver.get_user_allowed_restaurant_ids(7, 'user') is None
+    assert len(calls) == 2
+
+
+def test_load_errors_are_not_cached(monkeypatch):
+    calls = _use_counting_loader(monkeypatch, [])
+
+    assert dashboardserver.get_user_allowed_restaurant_ids(7, 'user') is None
+    assert dashboardserver.get_user_allowed_restaurant_ids(7, 'user') is None
+    assert len(calls) == 2
+
+
+def test_invalidation_in_another_process_is_seen_after_local_ttl(monkeypatch):
+    calls = _use_counting_loader(monkeypatch, [frozenset({'m1', 'm2'}), frozenset({'m1'})])
+    monkeypatch.setattr(dashboardserver, 'AUTHZ_SCOPE_CACHE_TTL_SECONDS', 300)
+    monkeypatch.setattr(dashboardserver, 'AUTHZ_SCOPE_LOCAL_TTL_SECONDS', 15)
+    clock = [1000.0]
+    monkeypatch.setattr(dashboardserver.time, 'time', lambda: clock[0])
+
+    assert dashboardserver.get_user_allowed_restaurant_ids(7, 'user') == frozenset({'m1', 'm2'})
+    # Another worker removes 'm2' and invalidates its own cache; without Redis
+    # this process is not told, so it must expire its copy on the short TTL.
+    clock[0] += 16
+    assert dashboardserver.get_user_allowed_restaurant_ids(7, 'user') == frozenset({'m1'})
+    assert len(calls) == 2
@@ -0,0 +1,54 @@
+"""Tests for SQL-aggregate helpers in the analytics service."""
+
+from datetime import datetime
+
+import dashboardserver
+from app_services import core_analytics_service
+
+
+ORDERS = [
+    {'id': '1', 'orderStatus': 'CONCLUDED', 'totalPrice': 50.0, 'createdAt': '2026-10-01T12:00:00Z',
+     'customer': {'isNewCustomer': True}, 'feedback': {'rating': 5}},
+    {'id': '2', 'orderStatus': 'CONCLUDED', 'totalPrice': 30.0, 'createdAt': '2026-10-02T12:00:00Z',
+     'feedback': {'rating': 4}},
+    {'id': '3', 'orderStatus': 'CANCELLED', 'totalPrice': 20.0, 'createdAt': '2026-10-02T13:00:00Z'},
+    {'id': '4', 'orderStatus': 'CONFIRMED', 'totalPrice': 10.0, 'createdAt': '2026-10-03T13:00:00Z'},
+]
+
+
+def test_aggregate_metrics_match_in_memory_period_metrics():
+    agg = core_analytics_service.aggregate_orders(ORDERS, dashboardserver.get_order_status)
+    assert core_analytics_service.metrics_from_aggregate(agg) == dashboardserver._calculate_period_metrics(ORDERS)
+
+
+def test_daily_from_aggregates_matches_in_memory_daily():
+    start, end = datetime(2026, 10, 1), datetime(2026, 10, 4)
+    rows = []
+    for day in ('2026-10-01', '2026-10-02', '2026-10-03'):
+        day_orders = [o for o in ORDERS if o['createdAt'].startswith(day)]
+        row = core_analytics_service.aggregate_orders(day_orders, dashboardserver.get_order_status)
+        row.update({'period': 'a', 'merchant_id': 'm1', 'day': day})
+        rows.append(row)
+
+    assert core_analytics_service.build_daily_from_aggregates(rows, start, end) == \
+        dashboardserver._aggregate_daily(ORDERS, start, end)
+
+
+def test_period_comparison_prefers_precomputed_metrics():
+    restaurant = {'id': 'm1', 'name': 'Loja', '_orders_cache': ORDERS}
+    precomputed = core_analytics_service.metrics_from_aggregate(
+        {'total_orders': 100, 'orders': 90, 'revenue': 900.0, 'cancelled': 10,
+         'new_customers': 5, 'rating_sum': 0, 'rating_count': 0}
+    )
+    comparisons, totals_a, _, _ = core_analytics_service.build_period_comparison(
+        targets=[restaurant],
+        period_a_start=datetime(2026, 10, 1),
+        period_a_end=datetime(2026, 10, 31),
+        period_b_start=datetime(2026, 11, 1),
+        period_b_end=datetime(2026, 11, 30),
+        filter_orders_by_date=dashboardserver._filter_orders_by_date,
+        calculate_period_metrics=dashboardserver._calculate_period_metrics,
+        period_metrics=lambda r: (precomputed, precomputed),
+    )
+    assert comparisons[0]['period_a']['orders'] == 90
+    assert totals_a['revenue'] == 900.0
@@ -0,0 +1,479 @@
+"""Tests for database helpers that do not need a live PostgreSQL server."""
+
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+import dashboarddb
+
+
+def test_add_months_wraps_year_boundaries():
+    assert dashboarddb._add_months(datetime(2026, 11, 1), 2) == datetime(2027, 1, 1)
+    assert dashboarddb._add_months(datetime(2026, 1, 1), -1) == datetime(2025, 12, 1)
+    assert dashboarddb._month_start(datetime(2026, 10, 18, 13, 5)) == datetime(2026, 10, 1)
+
+
+def test_event_log_partition_names_match_retention_pattern():
+    name = dashboarddb._ifood_event_log_partition_name(datetime(2026, 3, 1))
+    assert name == 'ifood_event_log_p2026_03'
+    match = dashboarddb._IFOOD_EVENT_LOG_PARTITION_RE.match(name)
+    assert match and match.groups() == ('2026', '03')
+    assert not dashboarddb._IFOOD_EVENT_LOG_PARTITION_RE.match('ifood_event_log_default')
+
+
+def test_compact_order_payload_keeps_fields_read_by_processor_and_sse():
+    payload = {
+        'id': 'ord-1',
+        'displayId': '1234',
+        'orderStatus': 'CONCLUDED',
+        'createdAt': '2026-10-01T12:00:00Z',
+        'totalPrice': 42.5,
+        'total': {'subTotal': 40, 'deliveryFee': 2.5, 'benefits': 0},
+        'payment': {'liability': 'MERCHANT'},
+        'customer': {'name': 'Ana', 'isNewCustomer': True, 'phone': {'number': '0800'}},
+        'items': [{'name': 'Pizza', 'quantity': 1, 'unitPrice': 40, 'options': [{'name': 'extra'}]}],
+        'delivery': {'pickupCode': '55', 'deliveryAddress': {'streetName': 'Rua A'}},
+        'picking': {'picker': 'x'},
+    }
+    compact = dashboarddb.compact_ifood_order_payload(payload)
+
+    assert compact['orderStatus'] == 'CONCLUDED'
+    assert compact['total'] == payload['total']
+    assert compact['customer'] == {'name': 'Ana', 'isNewCustomer': True}
+    assert compact['items'] == [{'name': 'Pizza', 'quantity': 1, 'unitPrice': 40}]
+    assert compact['delivery'] == {'pickupCode': '55'}
+    assert 'picking' not in compact
+
+
+def test_compacted_sale_keeps_nested_order_identifier_for_processor():
+    from ifood_data_processor import IFoodDataProcessor
+
+    sale = {
+        'order': {'id': 'ord-9', 'displayId': '9001', 'customer': {'name': 'Ana'}},
+        'benefits': [{'value': 7.5}],
+        'items': [{'name': 'Pizza', 'quantity': 1}],
+    }
+    compact = dashboarddb.compact_ifood_order_payload(sale)
+
+    assert compact['order'] == {'id': 'ord-9', 'displayId': '9001'}
+    assert IFoodDataProcessor._build_financial_discount_map({'sales': [compact]}) == \
+        IFoodDataProcessor._build_financial_discount_map({'sales': [sale]}) == {'ord-9': 7.5}
+
+
+def test_payload_hash_matches_server_hash():
+    import dashboardserver
+
+    payload = {'b': 1, 'a': 'ção'}
+    assert dashboarddb._payload_sha256(payload) == dashboardserver._hash_payload_sha256(payload)
+
+
+class _FakeCursor:
+    def __init__(self, state):
+        self.state = state
+
+    def execute(self, query, params=None):
+        self.state['queries'].append(' '.join(query.split()))
+        if query.startswith('INSERT INTO schema_migrations'):
+            self.state['version'] = params[0]
+
+    def fetchone(self):
+        return (self.state['version'],)
+
+    def close(self):
+        pass
+
+
+class _FakeConnection:
+    def __init__(self, state):
+        self.state = state
+
+    def cursor(self):
+        return _FakeCursor(self.state)
+
+    def commit(self):
+        self.state['commits'] += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _schema_db(monkeypatch, version):
+    state = {'version': version, 'queries': [], 'commits': 0, 'steps': []}
+    database = object.__new__(dashboarddb.DashboardDatabase)
+    monkeypatch.setattr(database, 'get_connection', lambda: _FakeConnection(state), raising=False)
+    monkeypatch.setattr(dashboarddb, 'SCHEMA_MIGRATIONS', (
+        (1, 'baseline', lambda self, cursor: state['steps'].append(1)),
+        (2, 'server_tables', lambda self, cursor: state['steps'].append(2)),
+    ))
+    monkeypatch.setattr(dashboarddb, 'SCHEMA_VERSION', 2)
+    return database, state
+
+
+def test_current_schema_is_verified_with_one_query(monkeypatch):
+    database, state = _schema_db(monkeypatch, version=2)
+
+    assert database.ensure_schema() is True
+    assert state['queries'] == ['SELECT COALESCE(MAX(version), 0) FROM schema_migrations']
+    assert state['steps'] == []
+
+
+def test_pending_steps_apply_under_advisory_lock(monkeypatch):
+    database, state = _schema_db(monkeypatch, version=1)
+
+    assert database.ensure_schema() is True
+    assert state['steps'] == [2]
+    assert state['version'] == 2
+    assert state['commits'] == 1
+    assert state['queries'][1].startswith('SELECT pg_advisory_xact_lock')
+
+
+class _FakePoolConnection:
+    closed = False
+
+    class info:
+        transaction_status = dashboarddb.psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeBlockingPool(dashboarddb._BlockingConnectionPool):
+    def _connect(self, key=None):
+        conn = _FakePoolConnection()
+        if key is not None:
+            self._used[key] = conn
+            self._rused[id(conn)] = key
+        else:
+            self._pool.append(conn)
+        return conn
+
+
+def test_exhausted_pool_waits_for_a_returned_connection():
+    pool = _FakeBlockingPool(1, 2, wait_timeout=2)
+    first = pool.getconn()
+    second = pool.getconn()
+    threading.Timer(0.05, pool.putconn, args=(first,)).start()
+
+    third = pool.getconn()
+
+    stats = pool.snapshot()
+    assert third is not second
+    assert stats['waits'] == 1
+    assert stats['wait_ms_max'] >= 40
+    assert stats['in_use'] == 2 and stats['timeouts'] == 0
+
+
+def test_exhausted_pool_times_out_with_pool_error():
+    pool = _FakeBlockingPool(1, 1, wait_timeout=0.05)
+    conn = pool.getconn()
+    with pytest.raises(dashboarddb.psycopg2_pool.PoolError):
+        pool.getconn()
+    assert pool.snapshot()['timeouts'] == 1
+
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+
+
+def test_gevent_wait_callback_only_installs_when_patched(monkeypatch):
+    installed = []
+    monkeypatch.setattr(dashboarddb.psycopg2.extensions, 'set_wait_callback', installed.append)
+    monkeypatch.setattr(dashboarddb, '_gevent_is_active', lambda: False)
+
+    assert dashboarddb.install_gevent_wait_callback('auto') is False
+    assert dashboarddb.install_gevent_wait_callback('off') is False
+    assert dashboarddb.install_gevent_wait_callback('on') is True
+    assert installed == [dashboarddb._gevent_wait_callback]
+
+
+class _FakeScopedConnection:
+    def __init__(self):
+        self.status = dashboarddb.psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        self.rollbacks = 0
+        self.sessions = []
+
+    @property
+    def info(self):
+        return type('Info', (), {'transaction_status': self.status})()
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = dashboarddb.psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def set_session(self, readonly):
+        self.sessions.append(readonly)
+
+    def cursor(self):
+        return _FakeEmptyCursor()
+
+
+class _FakeEmptyCursor:
+    def execute(self, query, params=None):
+        pass
+
+    def fetchone(self):
+        return None
+
+    def fetchall(self):
+        return []
+
+    def close(self):
+        pass
+
+
+def _scoped_database(monkeypatch):
+    database = dashboarddb.DashboardDatabase()
+    checkouts, releases = [], []
+
+    def _checkout(target='primary'):
+        conn = _FakeScopedConnection()
+        conn.target = target
+        checkouts.append(conn)
+        return conn
+
+    monkeypatch.setattr(database, '_checkout_raw_connection', _checkout)
+    monkeypatch.setattr(database, '_release_connection', lambda raw_conn, target='primary': releases.append(raw_conn))
+    return database, checkouts, releases
+
+
+def test_request_scope_reuses_one_connection(monkeypatch):
+    database, checkouts, releases = _scoped_database(monkeypatch)
+
+    with database.request_scope():
+        first = database.get_connection()
+        first.close()
+        second = database.get_connection()
+        checkouts[0].status = dashboarddb.psycopg2.extensions.TRANSACTION_STATUS_INERROR
+        second.close()
+        assert checkouts[0].rollbacks == 1
+        assert releases == []
+
+    assert len(checkouts) == 1
+    assert releases == checkouts
+    database.get_connection().close()
+    assert len(checkouts) == 2
+
+
+def test_read_only_scope_sets_and_clears_session_flag(monkeypatch):
+    database, checkouts, releases = _scoped_database(monkeypatch)
+
+    database.begin_request_scope(read_only=True)
+    database.get_connection().close()
+    database.get_connection().close()
+
+    assert database.end_request_scope() == 2
+    assert database.end_request_scope() == 0
+    assert checkouts[0].sessions == [True, False]
+    assert releases == checkouts
+
+
+def test_scope_ends_open_transaction_between_calls(monkeypatch):
+    database, checkouts, releases = _scoped_database(monkeypatch)
+
+    with database.request_scope():
+        conn = database.get_connection()
+        checkouts[0].status = dashboarddb.psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+        conn.close()
+        # Not idle in transaction while the view does other (slow) work.
+        assert checkouts[0].status == dashboarddb.psycopg2.extensions.TRANSACTION_STATUS_IDLE
+        assert checkouts[0].rollbacks == 1
+        assert releases == []
+
+    assert releases == checkouts
+
+
+def test_tagged_reads_use_replica_and_org_cache_stays_on_primary(monkeypatch):
+    database, checkouts, releases = _scoped_database(monkeypatch)
+    monkeypatch.setattr(database, 'read_config', {'host': 'replica'})
+
+    database.get_connection().close()
+    database.get_all_users()
+    database.load_org_data_cache_meta(1, 'restaurants')
+
+    assert [conn.target for conn in checkouts] == ['primary', 'replica', 'primary']
+    assert database.get_all_users.db_target == 'replica'
+    assert not hasattr(database.load_org_data_cache_meta, 'db_target')
+
+
+def test_replica_failure_falls_back_to_primary(monkeypatch):
+    database = dashboarddb.DashboardDatabase()
+    monkeypatch.setattr(database, 'read_config', {'host': 'replica'})
+    targets = []
+
+    def _checkout(target='primary'):
+        targets.append(target)
+        if target == 'replica':
+            raise dashboarddb.psycopg2.OperationalError('replica down')
+        return _FakeScopedConnection()
+
+    monkeypatch.setattr(database, '_checkout_raw_connection', _checkout)
+    monkeypatch.setattr(database, '_release_connection', lambda raw_conn, target='primary': None)
+
+    token = dashboarddb._READ_TARGET.set('replica')
+    try:
+        assert database.get_connection() is not None
+    finally:
+        dashboarddb._READ_TARGET.reset(token)
+    assert targets == ['replica', 'primary']
+
+
+def test_bcrypt_verify_and_rehash_on_low_cost_hash(monkeypatch):
+    database = dashboarddb.DashboardDatabase()
+    monkeypatch.setattr(database, 'bcrypt_rounds', 4)
+    old_hash = database.hash_password('secret')
+    monkeypatch.setattr(database, 'bcrypt_rounds', 5)
+
+    assert database.verify_password('secret', old_hash)
+    assert not database.verify_password('wrong', old_hash)
+    assert database.password_needs_rehash(old_hash)
+    assert not database.password_needs_rehash(database.hash_password('secret'))
+    assert not database.password_needs_rehash('not-a-bcrypt-hash')
+
+
+def test_saturated_bcrypt_executor_fails_fast():
+    executor = dashboarddb._BcryptExecutor(max_workers=1, max_pending=0, timeout=5)
+    started = threading.Event()
+    release = threading.Event()
+
+    def _slow():
+        started.set()
+        release.wait(5)
+        return True
+
+    worker = threading.Thread(target=executor.run, args=(_slow,))
+    worker.start()
+    assert started.wait(5)
+    try:
+        with pytest.raises(dashboarddb.PasswordVerificationBusy):
+            executor.run(lambda: True)
+    finally:
+        release.set()
+        worker.join(5)
+    # The slot is returned by the future's done callback once the work ends.
+    assert executor._slots.acquire(timeout=5)
+
+
+def test_failed_analytics_migration_is_not_recorded(monkeypatch):
+    database, state = _schema_db(monkeypatch, version=2)
+    monkeypatch.setattr(dashboarddb, 'SCHEMA_MIGRATIONS', dashboarddb.SCHEMA_MIGRATIONS + (
+        (3, 'order_analytics_utc', dashboarddb.DashboardDatabase._migrate_order_analytics_utc),
+    ))
+    monkeypatch.setattr(dashboarddb, 'SCHEMA_VERSION', 3)
+
+    def _fail(cursor):
+        raise dashboarddb.psycopg2.ProgrammingError('function replace failed')
+
+    monkeypatch.setattr(database, '_setup_ifood_order_analytics', _fail, raising=False)
+
+    assert database.ensure_schema() is False
+    assert state['version'] == 2
+    assert state['commits'] == 0
+    assert not any(q.startswith('INSERT INTO schema_migrations') for q in state['queries'])
+
+
+class _CannedCursor:
+    def __init__(self, rows):
+        self.rows = rows
+        self.params = None
+
+    def execute(self, query, params=None):
+        if isinstance(self.rows, Exception):
+            raise self.rows
+        self.params = params
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class _CannedConnection:
+    def __init__(self, rows):
+        self.cursor_obj = _CannedCursor(rows)
+        self.rollbacks = 0
+
+    def cursor(self):
+        return self.cursor_obj
+
+    def rollback(self):
+        self.rollbacks += 1
+
+    def close(self):
+        pass
+
+
+def _canned_database(monkeypatch, rows):
+    database = dashboarddb.DashboardDatabase()
+    conn = _CannedConnection(rows)
+    monkeypatch.setattr(database, 'get_connection', lambda: conn)
+    return database, conn
+
+
+def test_store_daily_metrics_aggregate_shapes_rows_per_period_and_merchant(monkeypatch):
+    database, conn = _canned_database(monkeypatch, [
+        ('a', 'm1', 5, 3, Decimal('80.50'), 2, 2, Decimal('9.0'), 2),
+        ('b', 'm2', None, None, None, None, None, None, None),
+    ])
+
+    rows = database.aggregate_store_daily_metrics(1, {
+        'a': (datetime(2026, 10, 1, 15, 30), datetime(2026, 10, 31)),
+        'b': (date(2026, 11, 1), date(2026, 11, 30)),
+    })
+
+    assert rows == [
+        {'period': 'a', 'merchant_id': 'm1', 'total_orders': 5, 'orders': 3, 'revenue': 80.5,
+         'cancelled': 2, 'new_customers': 2, 'rating_sum': 9.0, 'rating_count': 2},
+        {'period': 'b', 'merchant_id': 'm2', 'total_orders': 0, 'orders': 0, 'revenue': 0.0,
+         'cancelled': 0, 'new_customers': 0, 'rating_sum': 0.0, 'rating_count': 0},
+    ]
+    assert isinstance(rows[0]['revenue'], float)
+    assert conn.cursor_obj.params == (
+        'a', date(2026, 10, 1), date(2026, 10, 31), 'b', date(2026, 11, 1), date(2026, 11, 30), 1,
+    )
+
+
+def test_store_daily_metrics_aggregate_by_day_reads_day_column(monkeypatch):
+    database, conn = _canned_database(monkeypatch, [
+        ('a', 'm1', date(2026, 10, 2), 2, 1, 30.0, 1, 0, 5.0, 1),
+        ('a', 'm1', None, 1, 1, 10.0, 0, 1, 0, 0),
+    ])
+
+    rows = database.aggregate_store_daily_metrics(
+        1, {'a': (date(2026, 10, 1), date(2026, 10, 31))}, merchant_ids=['m1', None], by_day=True
+    )
+
+    assert [(row['day'], row['total_orders'], row['revenue'], row['rating_count']) for row in rows] == [
+        ('2026-10-02', 2, 30.0, 1),
+        (None, 1, 10.0, 0),
+    ]
+    assert conn.cursor_obj.params[-1] == ['m1']
+
+
+def test_store_daily_metrics_aggregate_returns_none_without_data(monkeypatch):
+    database, conn = _canned_database(monkeypatch, dashboarddb.psycopg2.OperationalError('gone'))
+    periods = {'a': (date(2026, 10, 1), date(2026, 10, 2))}
+
+    assert database.aggregate_store_daily_metrics(1, {}) is None
+    assert database.aggregate_store_daily_metrics(None, periods) is None
+    assert database.aggregate_store_daily_metrics(1, periods) is None
+    assert conn.rollbacks == 1
+
+
+def test_create_user_hashes_before_taking_a_connection(monkeypatch):
+    database = dashboarddb.DashboardDatabase()
+    checkouts = []
+
+    def _busy(password):
+        raise dashboarddb.PasswordVerificationBusy('password verification queue is full')
+
+    monkeypatch.setattr(database, 'hash_password', _busy)
+    monkeypatch.setattr(database, 'get_connection', lambda: checkouts.append(1))
+
+    with pytest.raises(dashboarddb.PasswordVerificationBusy):
+        database.create_user('ana', 'secret', 'Ana')
+    assert checkouts == []
@@ -0,0 +1,88 @@
+"""Tests for batched iFood event acknowledgment."""
+
+import dashboardserver
+
+
+class _FakeAckApi:
+    def __init__(self, client_id='client-a', fail=False):
+        self.client_id = client_id
+        self.fail = fail
+        self.batches = []
+
+    def acknowledge_events(self, events):
+        self.batches.append([event['id'] for event in events])
+        return {'success': not self.fail, 'acknowledged': 0 if self.fail else len(events)}
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.hashes = {}
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        return []
+
+    def expire(self, key, seconds):
+        return True
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+
+
+def _buffer(monkeypatch, redis_client=None):
+    monkeypatch.setattr(dashboardserver, '_append_ifood_evidence_entry', lambda entry: None)
+    monkeypatch.setattr(dashboardserver, 'get_redis_client', lambda: redis_client)
+    buffer = dashboardserver.IFoodAckBuffer(batch_size=2, flush_interval=60)
+    monkeypatch.setattr(buffer, '_ensure_thread', lambda: None)
+    return buffer
+
+
+def test_orgs_sharing_a_credential_are_acked_in_full_batches(monkeypatch):
+    buffer = _buffer(monkeypatch)
+    org_a_api = _FakeAckApi()
+    org_b_api = _FakeAckApi()
+
+    buffer.add(org_a_api, [{'id': 'e1'}, {'id': 'e2'}, {'id': 'e1'}])
+    buffer.add(org_b_api, [{'id': 'e3'}])
+
+    assert buffer.flush() == 3
+    assert org_a_api.batches + org_b_api.batches == [['e1', 'e2'], ['e3']]
+    assert buffer.pending_count() == 0
+
+
+def test_failed_batch_backs_off_and_reports_lag(monkeypatch):
+    buffer = _buffer(monkeypatch)
+    api = _FakeAckApi(fail=True)
+    buffer.add(api, [{'id': 'e1'}])
+
+    assert buffer.flush() == 0
+    assert buffer.flush() == 0
+    assert len(api.batches) == 1
+    assert dashboardserver._snapshot_ifood_ingestion_metrics()['ack_pending'] == 1
+
+    api.fail = False
+    assert buffer.flush(force=True) == 1
+    assert dashboardserver._snapshot_ifood_ingestion_metrics()['ack_pending'] == 0
+
+
+def test_pending_acks_survive_a_restart(monkeypatch):
+    redis_client = _FakeRedis()
+    crashed = _buffer(monkeypatch, redis_client)
+    crashed.add(_FakeAckApi(fail=True), [{'id': 'e1'}, {'id': 'e2'}])
+
+    restarted = _buffer(monkeypatch, redis_client)
+    api = _FakeAckApi()
+    restarted.add(api, [{'id': 'e3'}])
+
+    assert restarted.flush() == 3
+    assert sorted(sum(api.batches, [])) == ['e1', 'e2', 'e3']
+    assert redis_client.hgetall(dashboardserver.IFoodAckBuffer._redis_key(crashed.credential_key(api))) == {}
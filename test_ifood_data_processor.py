@@ -0,0 +1,97 @@
+"""Tests for the precomputed chart time cube."""
+
+from datetime import datetime
+
+from app_services import restaurants_service
+from ifood_data_processor import IFoodDataProcessor
+
+
+ORDERS = [
+    {'id': '1', 'orderStatus': 'CONCLUDED', 'totalPrice': 50.0, 'createdAt': '2026-10-01T12:00:00Z'},
+    {'id': '2', 'orderStatus': 'CONCLUDED', 'totalPrice': 30.0, 'createdAt': '2026-10-02T02:30:00Z'},
+    {'id': '3', 'orderStatus': 'CANCELLED', 'totalPrice': 20.0, 'createdAt': '2026-10-02T13:00:00Z'},
+    {'id': '4', 'orderStatus': 'CONFIRMED', 'totalPrice': 10.0, 'createdAt': '2026-11-03T13:00:00Z'},
+    {'id': '5', 'orderStatus': 'CONCLUDED', 'totalPrice': 25.0, 'createdAt': '2026-11-03T22:15:00Z'},
+]
+
+
+def _charts(orders, **kwargs):
+    data = IFoodDataProcessor.generate_charts_data(orders, **kwargs)
+    data.pop('orders_data', None)
+    return data
+
+
+def test_time_cube_charts_match_order_scan():
+    cube = IFoodDataProcessor.build_time_cube(ORDERS)
+    assert _charts(ORDERS, time_cube=cube) == _charts(ORDERS)
+
+
+def test_time_cube_charts_match_filtered_order_scan():
+    cube = IFoodDataProcessor.build_time_cube(ORDERS)
+    filtered = restaurants_service.filter_orders_by_date_range(
+        ORDERS, '2026-10-02', '2026-11-03', datetime_mod=datetime
+    )
+    cube_charts = _charts(filtered, time_cube=cube, start_date='2026-10-02', end_date='2026-11-03')
+    assert cube_charts == _charts(filtered)
+
+
+def test_update_time_cube_moves_changed_orders():
+    cube = IFoodDataProcessor.build_time_cube(ORDERS[:3])
+    changed = [
+        dict(ORDERS[2], orderStatus='CONCLUDED'),
+        ORDERS[3],
+    ]
+    merged = ORDERS[:2] + changed
+    IFoodDataProcessor.update_time_cube(cube, changed, merged)
+
+    assert IFoodDataProcessor.is_time_cube_current(cube, merged)
+    assert cube['cells'] == IFoodDataProcessor.build_time_cube(merged)['cells']
+
+
+def test_cube_is_stale_after_orders_version_bump():
+    cube = IFoodDataProcessor.build_time_cube(ORDERS, orders_version=3)
+
+    assert IFoodDataProcessor.is_time_cube_current(cube, ORDERS, 3)
+    assert not IFoodDataProcessor.is_time_cube_current(cube, ORDERS, 4)
+    assert not IFoodDataProcessor.is_time_cube_current(cube, ORDERS[:4], 3)
+
+
+def test_restaurant_writers_bump_version_and_merge_keeps_cube_current():
+    import dashboardserver
+
+    restaurant = {}
+    dashboardserver._set_restaurant_orders(restaurant, [dict(order) for order in ORDERS[:3]])
+    cube = dashboardserver.get_restaurant_time_cube(restaurant, restaurant['_orders_cache'])
+
+    dashboardserver._merge_orders_into_restaurant_cache(
+        restaurant, [dict(ORDERS[2], orderStatus='CONCLUDED'), ORDERS[3]]
+    )
+    orders = restaurant['_orders_cache']
+    assert restaurant['_orders_version'] == 2
+    assert dashboardserver.get_restaurant_time_cube(restaurant, orders) is cube
+    assert cube['cells'] == IFoodDataProcessor.build_time_cube(orders)['cells']
+
+    dashboardserver._set_restaurant_orders(restaurant, orders, changed=False)
+    assert dashboardserver.get_restaurant_time_cube(restaurant, orders) is cube
+
+    orders[1]['totalPrice'] = 31.0
+    dashboardserver._set_restaurant_orders(restaurant, orders)
+    rebuilt = dashboardserver.get_restaurant_time_cube(restaurant, orders)
+    assert rebuilt is not cube
+    assert rebuilt['cells'] == IFoodDataProcessor.build_time_cube(orders)['cells']
+
+
+def test_persisted_cube_omits_index_and_rebuilds_it_on_update():
+    cube = IFoodDataProcessor.build_time_cube(ORDERS[:3], orders_version=5)
+    persisted = IFoodDataProcessor.persistable_time_cube(cube)
+    assert 'index' not in persisted
+    # A loaded restaurant has no orders version yet, i.e. version 0.
+    assert IFoodDataProcessor.is_time_cube_current(persisted, ORDERS[:3])
+    assert _charts(ORDERS[:3], time_cube=persisted) == _charts(ORDERS[:3])
+
+    changed = [dict(ORDERS[2], orderStatus='CONCLUDED')]
+    merged = ORDERS[:2] + changed
+    IFoodDataProcessor.update_time_cube(persisted, changed, merged)
+
+    assert persisted['cells'] == IFoodDataProcessor.build_time_cube(merged)['cells']
+    assert set(persisted['index']) == {'1', '2', '3'}
@@ -0,0 +1,77 @@
+"""Tests for sharded keepalive polling."""
+
+import dashboardserver
+from app_services import keepalive_shard_service
+
+
+class _FakeApi:
+    def __init__(self):
+        self.polled = []
+
+    def poll_events(self, merchant_ids):
+        self.polled.append(list(merchant_ids))
+        return []
+
+
+def test_removing_a_worker_only_moves_its_orgs():
+    keys = [str(org_id) for org_id in range(200)]
+    workers = ['w1', 'w2', 'w3']
+    before = {key: keepalive_shard_service.shard_owner(key, workers) for key in keys}
+    after = {key: keepalive_shard_service.shard_owner(key, ['w1', 'w3']) for key in keys}
+
+    assert set(before.values()) == set(workers)
+    for key in keys:
+        if before[key] != 'w2':
+            assert after[key] == before[key]
+        else:
+            assert after[key] in ('w1', 'w3')
+
+
+def test_live_workers_drop_stale_heartbeats():
+    heartbeats = {'w1': 100.0, 'w2': 10.0, 'w3': 95.0}
+    assert keepalive_shard_service.live_workers(heartbeats, now=100.0, ttl=30) == ['w1', 'w3']
+
+
+def test_keepalive_polls_only_owned_orgs(monkeypatch):
+    me = dashboardserver.REDIS_INSTANCE_ID
+    workers = (me, 'other-worker')
+    apis = {org_id: _FakeApi() for org_id in range(1, 21)}
+    org_items = [
+        (org_id, {'api': api, 'config': {'merchants': [{'merchant_id': f'm-{org_id}'}]}})
+        for org_id, api in apis.items()
+    ]
+    monkeypatch.setattr(dashboardserver, 'IFOOD_KEEPALIVE_POLLING', True)
+    monkeypatch.setattr(dashboardserver, 'keepalive_shard_workers', lambda: list(workers))
+    monkeypatch.setattr(dashboardserver, '_KEEPALIVE_SHARD_WORKERS', workers)
+    monkeypatch.setattr(dashboardserver, '_org_data_items_snapshot', lambda: list(org_items))
+    monkeypatch.setattr(dashboardserver, '_process_ifood_events_for_merchant', lambda **kwargs: {})
+    monkeypatch.setattr(dashboardserver, '_append_ifood_evidence_entry', lambda entry: None)
+
+    summary = dashboardserver.run_ifood_keepalive_poll_once()
+
+    owned = {
+        org_id for org_id in apis
+        if keepalive_shard_service.shard_owner(str(org_id), workers) == me
+    }
+    assert 0 < len(owned) < len(apis)
+    assert {org_id for org_id, api in apis.items() if api.polled} == owned
+    assert summary['orgs_checked'] == len(owned)
+
+
+def test_large_org_is_polled_in_concurrent_chunks(monkeypatch):
+    me = dashboardserver.REDIS_INSTANCE_ID
+    api = _FakeApi()
+    merchants = [{'merchant_id': f'm-{index}'} for index in range(5)]
+    monkeypatch.setattr(dashboardserver, 'IFOOD_KEEPALIVE_POLLING', True)
+    monkeypatch.setattr(dashboardserver, 'IFOOD_POLL_MAX_MERCHANTS_PER_REQUEST', 2)
+    monkeypatch.setattr(dashboardserver, 'keepalive_shard_workers', lambda: [me])
+    monkeypatch.setattr(dashboardserver, '_KEEPALIVE_SHARD_WORKERS', (me,))
+    monkeypatch.setattr(dashboardserver, '_org_data_items_snapshot', lambda: [(1, {'api': api, 'config': {'merchants': merchants}})])
+    monkeypatch.setattr(dashboardserver, '_process_ifood_events_for_merchant', lambda **kwargs: {})
+    monkeypatch.setattr(dashboardserver, '_append_ifood_evidence_entry', lambda entry: None)
+
+    summary = dashboardserver.run_ifood_keepalive_poll_once()
+
+    assert sorted(len(chunk) for chunk in api.polled) == [1, 2, 2]
+    assert summary['orgs_checked'] == 1
+    assert summary['merchants_polled'] == 5
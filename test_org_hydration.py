@@ -0,0 +1,92 @@
+"""Tests for lazy, single-flighted org hydration."""
+
+import threading
+import time
+
+import dashboardserver
+
+
+def _isolate_org_state(monkeypatch):
+    monkeypatch.setattr(dashboardserver, 'ORG_DATA', {})
+    monkeypatch.setattr(dashboardserver, '_ORG_HYDRATION_INFLIGHT', {})
+
+
+def test_concurrent_first_access_runs_one_load(monkeypatch):
+    _isolate_org_state(monkeypatch)
+    loads = []
+
+    def _slow_hydrate(org_id, org_name=None):
+        loads.append(org_id)
+        time.sleep(0.05)
+        dashboardserver.get_org_data(org_id)['restaurants'] = [{'id': 'm1'}]
+
+    monkeypatch.setattr(dashboardserver, '_hydrate_org', _slow_hydrate)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(dashboardserver.ensure_org_hydrated(9)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert loads == [9]
+    assert results == [True] * 5
+    assert dashboardserver.get_org_data(9)['restaurants'] == [{'id': 'm1'}]
+    assert dashboardserver.ensure_org_hydrated(9) is True
+    assert loads == [9]
+
+
+def test_lazy_boot_registers_orgs_without_loading(monkeypatch):
+    _isolate_org_state(monkeypatch)
+    monkeypatch.setattr(dashboardserver, 'ORG_LAZY_HYDRATION', True)
+    monkeypatch.setattr(dashboardserver, 'USE_REDIS_QUEUE', True)
+    monkeypatch.setattr(dashboardserver, 'get_redis_client', lambda: object())
+    monkeypatch.setattr(dashboardserver, '_is_refresh_worker_process', lambda: False)
+    monkeypatch.setattr(dashboardserver.db, 'get_all_active_orgs', lambda: [{'id': 1, 'name': 'A'}, {'id': 2, 'name': 'B'}])
+
+    def _unexpected(*args, **kwargs):
+        raise AssertionError('boot must not load org state in lazy mode')
+
+    monkeypatch.setattr(dashboardserver, '_hydrate_org', _unexpected)
+
+    dashboardserver.initialize_all_orgs()
+
+    assert dashboardserver.get_org_data(1)['name'] == 'A'
+    assert not dashboardserver.get_org_data(2).get('_hydrated')
+
+
+def test_in_process_keepalive_keeps_eager_boot(monkeypatch):
+    _isolate_org_state(monkeypatch)
+    monkeypatch.setattr(dashboardserver, 'ORG_LAZY_HYDRATION', True)
+    monkeypatch.setattr(dashboardserver, 'IFOOD_KEEPALIVE_POLLING', True)
+    monkeypatch.setattr(dashboardserver, 'USE_REDIS_QUEUE', False)
+    monkeypatch.setattr(dashboardserver, '_is_refresh_worker_process', lambda: False)
+    monkeypatch.setattr(dashboardserver.db, 'get_all_active_orgs', lambda: [{'id': 1, 'name': 'A'}, {'id': 2, 'name': 'B'}])
+    loaded = []
+
+    def _hydrate(org_id, org_name=None):
+        loaded.append(org_id)
+        dashboardserver.get_org_data(org_id)['api'] = object()
+
+    monkeypatch.setattr(dashboardserver, '_hydrate_org', _hydrate)
+
+    dashboardserver.initialize_all_orgs()
+
+    # Keepalive/refresh run in this process and only see orgs with an API client.
+    assert loaded == [1, 2]
+    assert all(dashboardserver.get_org_data(org_id).get('api') for org_id in (1, 2))
+
+
+def test_warmer_only_hydrates_known_recent_orgs(monkeypatch):
+    _isolate_org_state(monkeypatch)
+    dashboardserver.get_org_data(1)
+    dashboardserver.get_org_data(2)
+    hydrated = []
+    monkeypatch.setattr(dashboardserver.db, 'get_recently_active_org_ids', lambda hours, limit: [2, 99])
+    monkeypatch.setattr(dashboardserver, 'ensure_org_hydrated', hydrated.append)
+
+    dashboardserver._warm_recent_orgs()
+
+    assert hydrated == [2]
@@ -0,0 +1,19 @@
+"""Tests for polling request chunking."""
+
+from app_services.polling_planner_service import chunk_merchant_ids
+
+
+def test_chunks_respect_merchant_limit_and_dedupe():
+    merchant_ids = [f'm{index}' for index in range(250)] + ['m0', ' ', 'm1']
+    chunks = chunk_merchant_ids(merchant_ids, max_merchants=100)
+
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+    assert sum(chunks, []) == [f'm{index}' for index in range(250)]
+
+
+def test_chunks_respect_header_length():
+    merchant_ids = ['a' * 36] + [f'{index:036d}' for index in range(9)]
+    chunks = chunk_merchant_ids(merchant_ids, max_merchants=100, max_header_chars=36 * 3 + 2)
+
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    assert all(len(','.join(chunk)) <= 36 * 3 + 2 for chunk in chunks)
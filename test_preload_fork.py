@@ -0,0 +1,54 @@
+"""Tests for gunicorn preload/post_fork startup."""
+
+import dashboardserver
+from app_routes import ops_routes
+
+
+class _FakePool:
+    def __init__(self):
+        self.closed = False
+
+    def closeall(self):
+        self.closed = True
+
+
+def test_preload_defers_threads_until_post_fork(monkeypatch):
+    started = []
+    monkeypatch.setattr(dashboardserver, 'PRELOAD_APP', True)
+    monkeypatch.setattr(dashboardserver, 'USE_REDIS_QUEUE', False)
+    monkeypatch.setattr(dashboardserver, 'IFOOD_KEEPALIVE_POLLING', True)
+    monkeypatch.setattr(dashboardserver, 'get_redis_client', lambda: None)
+    monkeypatch.setattr(dashboardserver.bg_refresher, 'start', lambda: started.append('refresher'))
+    monkeypatch.setattr(dashboardserver, 'start_keepalive_poller', lambda: started.append('keepalive'))
+    monkeypatch.setattr(dashboardserver, '_init_and_refresh_org', lambda org_id: started.append(org_id))
+    monkeypatch.setattr(dashboardserver, '_DEFERRED_ORG_REFRESH', [3, 4])
+
+    manager = dashboardserver.SSEManager(coalesce_ms=0)
+    assert manager._redis_thread is None
+    monkeypatch.setattr(dashboardserver, 'REDIS_INSTANCE_ID', dashboardserver.REDIS_INSTANCE_ID)
+    master_instance_id = dashboardserver.REDIS_INSTANCE_ID
+
+    dashboardserver.post_fork_worker()
+    assert dashboardserver.REDIS_INSTANCE_ID != master_instance_id
+    # Routes bound at import (in the master) must report the worker's id.
+    assert ops_routes.get_redis_instance_id() == dashboardserver.REDIS_INSTANCE_ID
+    for thread in list(dashboardserver.threading.enumerate()):
+        if thread is not dashboardserver.threading.current_thread() and thread.daemon:
+            thread.join(timeout=0.1)
+
+    assert started[:2] == ['refresher', 'keepalive']
+    assert sorted(started[2:]) == [3, 4]
+    assert dashboardserver._DEFERRED_ORG_REFRESH == []
+
+
+def test_fork_resets_inherited_db_pool(monkeypatch):
+    pool = _FakePool()
+    monkeypatch.setattr(dashboardserver.db, '_pool', pool)
+
+    dashboardserver.db.reset_after_fork()
+    assert dashboardserver.db._pool is None
+    assert pool.closed is False
+
+    monkeypatch.setattr(dashboardserver.db, '_pool', pool)
+    dashboardserver.db.close_pool()
+    assert pool.closed is True
@@ -0,0 +1,88 @@
+"""Tests for the sliding-window rate limiter."""
+
+import dashboardserver
+
+
+class _FakeScript:
+    """Runs the limiter script's logic against a dict, counting round trips."""
+
+    def __init__(self, store):
+        self.store = store
+        self.calls = []
+
+    def __call__(self, keys, args):
+        self.calls.append((tuple(keys), tuple(args)))
+        limit, weight, ttl = int(args[0]), float(args[1]), int(args[2])
+        if int(self.store.get(keys[1], 0)) * weight + int(self.store.get(keys[0], 0)) >= limit:
+            return 0
+        self.store[keys[0]] = int(self.store.get(keys[0], 0)) + 1
+        return 1
+
+
+class _FakeRedis:
+    def __init__(self):
+        self.store = {}
+        self.scripts = []
+
+    def register_script(self, source):
+        script = _FakeScript(self.store)
+        self.scripts.append((source, script))
+        return script
+
+
+def _check(scope='login', limit=3, window_seconds=60, ip='10.0.0.1'):
+    with dashboardserver.app.test_request_context('/', environ_base={'REMOTE_ADDR': ip}):
+        return dashboardserver._check_rate_limit(scope, limit, window_seconds)
+
+
+def test_redis_limiter_uses_one_registered_script(monkeypatch):
+    fake = _FakeRedis()
+    monkeypatch.setattr(dashboardserver, 'get_redis_client', lambda: fake)
+    monkeypatch.setattr(dashboardserver, '_RATE_LIMIT_SCRIPT', None)
+    monkeypatch.setattr(dashboardserver.time, 'time', lambda: 6000.0)
+
+    assert [_check() for _ in range(4)] == [True, True, True, False]
+    assert len(fake.scripts) == 1
+    script = fake.scripts[0][1]
+    assert len(script.calls) == 4
+    current, previous = script.calls[0][0]
+    assert current == '{rl:login:10.0.0.1}:100'
+    assert previous == '{rl:login:10.0.0.1}:99'
+
+
+def test_previous_window_is_weighted_by_overlap(monkeypatch):
+    fake = _FakeRedis()
+    fake.store['{rl:login:10.0.0.1}:99'] = 4
+    monkeypatch.setattr(dashboardserver, 'get_redis_client', lambda: fake)
+    monkeypatch.setattr(dashboardserver, '_RATE_LIMIT_SCRIPT', None)
+    # Three quarters into window 100: a quarter of the previous 4 hits still counts.
+    monkeypatch.setattr(dashboardserver.time, 'time', lambda: 6045.0)
+
+    assert [_check(limit=3) for _ in range(3)] == [True, True, False]
+
+
+def test_redis_error_falls_back_to_local_limiter(monkeypatch):
+    class _BrokenRedis:
+        def register_script(self, source):
+            raise ConnectionError('redis down')
+
+    monkeypatch.setattr(dashboardserver, 'get_redis_client', lambda: _BrokenRedis())
+    monkeypatch.setattr(dashboardserver, '_RATE_LIMIT_SCRIPT', None)
+    monkeypatch.setattr(dashboardserver, '_RATE_LIMIT_LOCAL', dashboardserver.OrderedDict())
+    monkeypatch.setattr(dashboardserver.time, 'time', lambda: 6000.0)
+
+    assert [_check(limit=2) for _ in range(3)] == [True, True, False]
+
+
+def test_local_limiter_stays_bounded_and_evicts_expired(monkeypatch):
+    local = dashboardserver.OrderedDict()
+    monkeypatch.setattr(dashboardserver, '_RATE_LIMIT_LOCAL', local)
+    monkeypatch.setattr(dashboardserver, 'RATE_LIMIT_LOCAL_MAX_KEYS', 100)
+
+    for index in range(250):
+        assert dashboardserver._check_local_rate_limit(f"rl:scan:{index}", 5, 60, 6000.0)
+    assert len(local) == 100
+    assert 'rl:scan:249' in local and 'rl:scan:0' not in local
+
+    dashboardserver._check_local_rate_limit('rl:scan:late', 5, 60, 6000.0 + 180)
+    assert list(local) == ['rl:scan:late']
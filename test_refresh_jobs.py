@@ -0,0 +1,156 @@
+"""Tests for org-scoped, coalescing refresh jobs."""
+
+import dashboardserver
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self._client = client
+        self._calls = []
+
+    def __getattr__(self, name):
+        def _queue(*args, **kwargs):
+            self._calls.append((name, args, kwargs))
+            return self
+        return _queue
+
+    def execute(self):
+        return [getattr(self._client, name)(*args, **kwargs) for name, args, kwargs in self._calls]
+
+
+class _FakeRedis:
+    """Just enough of redis-py for the refresh job helpers."""
+
+    def __init__(self):
+        self.strings = {}
+        self.hashes = {}
+        self.zsets = {}
+
+    def pipeline(self):
+        return _FakePipeline(self)
+
+    def set(self, key, value, ex=None):
+        self.strings[key] = value
+
+    def get(self, key):
+        return self.strings.get(key)
+
+    def hsetnx(self, key, field, value):
+        bucket = self.hashes.setdefault(key, {})
+        if field in bucket:
+            return 0
+        bucket[field] = value
+        return 1
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    def hdel(self, key, field):
+        return 1 if self.hashes.get(key, {}).pop(field, None) is not None else 0
+
+    def zadd(self, key, mapping, nx=False):
+        zset = self.zsets.setdefault(key, {})
+        added = 0
+        for member, score in mapping.items():
+            if nx and member in zset:
+                continue
+            zset[member] = score
+            added += 1
+        return added
+
+    def register_script(self, source):
+        assert 'ZPOPMIN' in source
+
+        def _claim(keys):
+            # Same steps as _CLAIM_REFRESH_LUA, run atomically here.
+            zset = self.zsets.get(keys[0]) or {}
+            if not zset:
+                return None
+            member = min(zset, key=zset.get)
+            score = zset.pop(member)
+            return [member, str(score), self.hashes.get(keys[1], {}).pop(member, None)]
+        return _claim
+
+
+def _use_fake_redis(monkeypatch):
+    fake = _FakeRedis()
+    monkeypatch.setattr(dashboardserver, 'USE_REDIS_QUEUE', True)
+    monkeypatch.setattr(dashboardserver, 'get_redis_client', lambda: fake)
+    return fake
+
+
+def test_duplicate_org_requests_collapse_into_one_job(monkeypatch):
+    _use_fake_redis(monkeypatch)
+    monkeypatch.setattr(dashboardserver, '_CLAIM_REFRESH_SCRIPT', None)
+
+    first = dashboardserver.enqueue_refresh_job(trigger='api', org_id=5)
+    second = dashboardserver.enqueue_refresh_job(trigger='api', org_id=5)
+    other = dashboardserver.enqueue_refresh_job(trigger='api', org_id=6)
+
+    assert first == second
+    assert other != first
+    assert dashboardserver.get_refresh_status(5)['job_id'] == first
+
+    claimed = dashboardserver.claim_refresh_job()
+    assert claimed['org_ids'] == [5]
+    assert claimed['job_id'] == first
+    assert dashboardserver.claim_refresh_job()['org_ids'] == [6]
+    assert dashboardserver.claim_refresh_job(timeout_seconds=0) is None
+
+
+def test_full_refresh_request_is_pending_once(monkeypatch):
+    _use_fake_redis(monkeypatch)
+    monkeypatch.setattr(dashboardserver, '_CLAIM_REFRESH_SCRIPT', None)
+
+    job_id = dashboardserver.enqueue_refresh_job(trigger='periodic')
+    assert dashboardserver.enqueue_refresh_job(trigger='api') == job_id
+
+    claimed = dashboardserver.claim_refresh_job()
+    assert claimed['org_ids'] is None
+    assert claimed['trigger'] == 'periodic'
+
+
+def test_request_after_claim_queues_a_fresh_job(monkeypatch):
+    fake = _use_fake_redis(monkeypatch)
+    monkeypatch.setattr(dashboardserver, '_CLAIM_REFRESH_SCRIPT', None)
+
+    first = dashboardserver.enqueue_refresh_job(trigger='api', org_id=5)
+    assert dashboardserver.claim_refresh_job()['job_id'] == first
+    second = dashboardserver.enqueue_refresh_job(trigger='api', org_id=5)
+
+    assert second != first
+    assert fake.hget(dashboardserver.REDIS_REFRESH_PENDING_JOBS_KEY, '5') is not None
+    assert dashboardserver.claim_refresh_job()['job_id'] == second
+
+
+def test_ops_summary_counts_pending_zset_and_legacy_list():
+    from app_services.ops_service import build_ops_summary
+
+    class _OpsRedis(_FakeRedis):
+        def zcard(self, key):
+            return len(self.zsets.get(key) or {})
+
+        def llen(self, key):
+            return 2 if key == dashboardserver.REDIS_REFRESH_QUEUE else 0
+
+    class _Stub:
+        is_refreshing = False
+        client_count = 0
+
+        def __getattr__(self, name):
+            return lambda *args, **kwargs: {}
+
+    fake = _OpsRedis()
+    fake.zadd(dashboardserver.REDIS_REFRESH_PENDING_KEY, {'5': 1.0, '6': 2.0, 'all': 3.0})
+    payload = build_ops_summary(
+        org_id=5, db=_Stub(), get_refresh_status=lambda org_id: {}, get_redis_client=lambda: fake,
+        redis_refresh_queue=dashboardserver.REDIS_REFRESH_QUEUE,
+        redis_refresh_pending_key=dashboardserver.REDIS_REFRESH_PENDING_KEY,
+        redis_refresh_lock_key='lock', org_data={}, last_data_refresh=None,
+        get_current_org_restaurants=lambda: [], build_data_quality_payload=lambda *a, **k: {},
+        instance_id='i-1', app_started_at=dashboardserver.datetime.utcnow(), datetime_mod=dashboardserver.datetime,
+        bg_refresher=_Stub(), use_redis_queue=True, use_redis_cache=False, use_redis_pubsub=False,
+        api_cache={}, sse_manager=_Stub(),
+    )
+
+    assert payload['ops']['queue']['pending_jobs'] == 5
@@ -0,0 +1,31 @@
+"""Tests for staleness-driven refresh scheduling."""
+
+from app_services import refresh_scheduler_service as scheduler
+
+
+def test_interval_follows_plan_viewers_and_event_activity():
+    assert scheduler.refresh_interval_seconds('pro') == 900
+    assert scheduler.refresh_interval_seconds('pro', viewers=3) == 450
+    assert scheduler.refresh_interval_seconds('pro', last_event_age=60) == 1800
+    assert scheduler.refresh_interval_seconds('unknown') == scheduler.DEFAULT_REFRESH_INTERVAL_SECONDS
+    assert scheduler.refresh_interval_seconds('enterprise', viewers=1) == 300
+
+
+def test_failures_back_off_from_last_attempt():
+    assert scheduler.next_due_at(last_success_at=None, interval=900) == 0.0
+    assert scheduler.next_due_at(last_success_at=1000, interval=900) == 1900
+    assert scheduler.next_due_at(
+        last_success_at=1000, interval=900, failures=3, last_attempt_at=5000
+    ) == 5240
+
+
+def test_pick_due_orgs_is_most_overdue_first_within_budget():
+    candidates = [
+        {'org_id': 'fresh', 'due_at': 500, 'cost': 4},
+        {'org_id': 'big', 'due_at': 10, 'cost': 200},
+        {'org_id': 'small', 'due_at': 50, 'cost': 8},
+        {'org_id': 'medium', 'due_at': 20, 'cost': 40},
+    ]
+    assert scheduler.pick_due_orgs(candidates, now=100, budget=30) == ['big']
+    assert scheduler.pick_due_orgs(candidates[2:], now=100, budget=30) == ['medium']
+    assert scheduler.pick_due_orgs(candidates[2:], now=100, budget=60) == ['medium', 'small']
@@ -0,0 +1,115 @@
+"""Tests for org/restaurant scoped SSE fan-out."""
+
+import queue
+
+import dashboardserver
+
+
+def _drain(client_queue):
+    messages = []
+    while True:
+        try:
+            messages.append(client_queue.get_nowait())
+        except queue.Empty:
+            return messages
+
+
+def test_org_events_only_reach_that_org():
+    manager = dashboardserver.SSEManager(coalesce_ms=0)
+    org_a = manager.register(org_id=1)
+    org_b = manager.register(org_id='2')
+
+    manager.broadcast('new_order', {'order_id': 'x'}, org_id='1')
+
+    assert len(_drain(org_a)) == 1
+    assert _drain(org_b) == []
+
+
+def test_restaurant_scope_and_global_events():
+    manager = dashboardserver.SSEManager(coalesce_ms=0)
+    scoped = manager.register(org_id=1, restaurant_ids=['M-1'])
+    whole_org = manager.register(org_id=1)
+
+    manager.broadcast('new_order', {'order_id': 'x'}, org_id=1, restaurant_id='m-2')
+    assert _drain(scoped) == []
+    assert len(_drain(whole_org)) == 1
+
+    manager.broadcast('refresh_status', {'status': 'complete'})
+    assert len(_drain(scoped)) == 1
+    assert len(_drain(whole_org)) == 1
+
+
+def test_unregister_drops_org_topic():
+    manager = dashboardserver.SSEManager(coalesce_ms=0)
+    client_queue = manager.register(org_id=7)
+    assert manager.subscribed_org_keys() == {'7'}
+
+    manager.unregister(client_queue)
+
+    assert manager.subscribed_org_keys() == set()
+    assert manager.client_count == 0
+
+
+def test_replay_returns_only_missed_events_for_scope():
+    manager = dashboardserver.SSEManager(coalesce_ms=0)
+    first = manager.register(org_id=1)
+    manager.broadcast('new_order', {'order_id': 'a'}, org_id=1)
+    manager.broadcast('new_order', {'order_id': 'b'}, org_id=1)
+    manager.broadcast('new_order', {'order_id': 'other'}, org_id=2)
+    seen = _drain(first)
+    last_seen_id = seen[0].split('\n', 1)[0][len('id: '):]
+
+    reconnected = manager.register(org_id=1)
+    replayed = manager.replay(reconnected, last_seen_id)
+
+    assert replayed == seen[1:]
+    assert '"b"' in replayed[0]
+
+
+def test_replay_signals_resync_when_buffer_overflowed():
+    manager = dashboardserver.SSEManager(replay_size=10, coalesce_ms=0)
+    client_queue = manager.register(org_id=1)
+    manager.broadcast('new_order', {'order_id': 0}, org_id=1)
+    first_id = _drain(client_queue)[0].split('\n', 1)[0][len('id: '):]
+    for index in range(1, 15):
+        manager.broadcast('new_order', {'order_id': index}, org_id=1)
+
+    replayed = manager.replay(client_queue, first_id)
+
+    assert replayed[0].startswith('event: resync')
+    assert len(replayed) == 11
+
+
+def test_coalescing_merges_state_events_and_batches_orders():
+    manager = dashboardserver.SSEManager(coalesce_ms=60000)
+    client_queue = manager.register(org_id=1)
+    manager.broadcast('refresh_status', {'status': 'refreshing'})
+    manager.broadcast('refresh_status', {'status': 'complete'})
+    manager.broadcast('new_order', {'order_id': 'a'}, org_id=1, restaurant_id='m1')
+    manager.broadcast('new_order', {'order_id': 'b'}, org_id=1, restaurant_id='m1')
+    assert _drain(client_queue) == []
+
+    manager.flush()
+    messages = _drain(client_queue)
+
+    assert len(messages) == 2
+    assert '"complete"' in messages[0] and '"refreshing"' not in messages[0]
+    assert '[{"order_id": "a"}, {"order_id": "b"}]' in messages[1]
+
+
+def test_slow_client_keeps_newest_events_and_gets_resync():
+    manager = dashboardserver.SSEManager(coalesce_ms=0, client_buffer=3)
+    slow = manager.register(org_id=1)
+    for index in range(5):
+        manager.broadcast('new_order', {'order_id': index}, org_id=1)
+
+    metrics = manager.lag_summary()
+    assert metrics['clients'] == 1
+    assert metrics['dropped_total'] == 2
+    assert metrics['resync_pending'] == 1
+
+    messages = _drain(slow)
+    assert messages[0].startswith('event: resync')
+    assert '"order_id": 2' in messages[1]
+    assert '"order_id": 4' in messages[3]
+    assert manager.client_count == 1
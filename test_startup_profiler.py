@@ -0,0 +1,55 @@
+"""Tests for the startup profiler."""
+
+import builtins
+import json
+import sys
+
+import pytest
+
+import startup_profiler
+
+
+@pytest.fixture
+def profiler(monkeypatch):
+    monkeypatch.setattr(startup_profiler, '_IMPORT_ROOT', {'children': []})
+    monkeypatch.setattr(startup_profiler, '_IMPORT_STACK', [])
+    monkeypatch.setattr(startup_profiler, '_PHASES', [])
+    monkeypatch.setattr(startup_profiler, '_ORGS', [])
+    original_import = builtins.__import__
+    yield startup_profiler
+    builtins.__import__ = original_import
+    startup_profiler._ENABLED = False
+
+
+def test_disabled_by_default(profiler, monkeypatch):
+    monkeypatch.delenv('STARTUP_PROFILE', raising=False)
+    assert profiler.install_from_environment(argv=['wsgi']) is False
+    with profiler.phase('noop'):
+        pass
+    assert profiler._PHASES == []
+
+
+def test_report_records_imports_phases_and_orgs(profiler, tmp_path, monkeypatch):
+    (tmp_path / 'profiled_parent_mod.py').write_text('import profiled_child_mod\n')
+    (tmp_path / 'profiled_child_mod.py').write_text('VALUE = 1\n')
+    monkeypatch.syspath_prepend(str(tmp_path))
+    for name in ('profiled_parent_mod', 'profiled_child_mod'):
+        monkeypatch.delitem(sys.modules, name, raising=False)
+
+    assert profiler.install_from_environment(argv=['dashboardserver.py', '--profile-startup'])
+    import profiled_parent_mod  # noqa: F401
+    with profiler.phase('db_init'):
+        pass
+    with profiler.org_load(7):
+        pass
+    report_path = tmp_path / 'profile.json'
+    line = profiler.finish(report_path)
+
+    assert builtins.__import__ is not profiler._profiled_import
+    assert line.startswith('Startup profile: ready in ')
+    assert 'db_init=' in line and 'orgs=1' in line
+    data = json.loads(report_path.read_text())
+    parent = next(node for node in data['imports']['tree'] if node['module'] == 'profiled_parent_mod')
+    assert [child['module'] for child in parent['children']] == ['profiled_child_mod']
+    assert [item['name'] for item in data['phases']] == ['db_init']
+    assert data['orgs']['loads'][0]['org_id'] == 7
@@ -0,0 +1,73 @@
+"""Tests for the refresh worker's independent lanes."""
+
+import threading
+import time
+
+import dashboardserver
+from dashboardserver import WorkerLane, WorkerLaneScheduler
+
+
+def test_slow_refresh_does_not_delay_keepalive():
+    release = threading.Event()
+    keepalive_runs = []
+
+    def slow_refresh():
+        release.wait(2)
+        return 0.0
+
+    keepalive = WorkerLane('keepalive', lambda: keepalive_runs.append(time.time()), interval=0.05, priority=1)
+    refresh = WorkerLane('refresh', slow_refresh)
+    scheduler = WorkerLaneScheduler([keepalive, refresh], guard_seconds=0)
+    scheduler.start()
+    try:
+        time.sleep(0.4)
+    finally:
+        release.set()
+        scheduler.stop()
+
+    assert len(keepalive_runs) >= 4
+    assert scheduler.metrics()['refresh']['running'] == 1
+
+
+def test_missed_deadlines_are_skipped_not_replayed():
+    lane = WorkerLane('keepalive', lambda: None, interval=30)
+    lane.next_deadline = 1000.0
+
+    assert lane.claim_deadline(now=999.0) is None
+    assert lane.claim_deadline(now=1095.0) == 95.0
+    assert lane.next_deadline == 1120.0
+    assert lane.metrics()['skipped_deadlines'] == 3
+
+
+def test_lag_alarm_and_idle_queue_runs():
+    lane = WorkerLane('refresh', lambda: 120.0, lag_alarm_seconds=60)
+    assert lane.run_once() is True
+    assert lane.metrics()['lag_alarms'] == 1
+
+    idle = WorkerLane('refresh', lambda: None)
+    assert idle.run_once() is False
+    assert idle.metrics()['runs'] == 0
+
+
+def test_lower_priority_lane_defers_to_due_keepalive():
+    keepalive = WorkerLane('keepalive', lambda: None, interval=30, priority=1)
+    refresh = WorkerLane('refresh', lambda: None)
+    scheduler = WorkerLaneScheduler([keepalive, refresh], guard_seconds=5)
+
+    keepalive.next_deadline = 1003.0
+    assert scheduler.should_defer(refresh, now=1000.0)
+    assert not scheduler.should_defer(keepalive, now=1000.0)
+    keepalive.next_deadline = 1030.0
+    assert not scheduler.should_defer(refresh, now=1000.0)
+
+
+def test_worker_lanes_follow_settings(monkeypatch):
+    monkeypatch.setattr(dashboardserver, 'IFOOD_KEEPALIVE_POLLING', True)
+    monkeypatch.setattr(dashboardserver, 'REFRESH_SCHEDULER_ENABLED', False)
+
+    lanes = {lane.name: lane for lane in dashboardserver.build_refresh_worker_lanes(600)}
+
+    assert set(lanes) == {'keepalive', 'refresh', 'periodic'}
+    assert lanes['keepalive'].priority > lanes['refresh'].priority
+    assert lanes['refresh'].concurrency == 1
+    assert lanes['periodic'].seconds_until_due() > 500